@@ -1,6 +1,9 @@
 import sqlite3
 from database import create_connection
+from menu_cache import menu_cache
 from models import Coffee
+from order_loader import OrderLoader
+from order_status import bulk_update_status, current_state, update_status
 
 class AdminOperations:
     def __init__(self, conn):
@@ -15,6 +18,7 @@ class AdminOperations:
             VALUES (?, ?, ?, ?)
             ''', (name, description, price, category))
             self.conn.commit()
+            menu_cache.invalidate()
             print(f"Coffee '{name}' added successfully!")
             return True
         except Exception as e:
@@ -50,6 +54,7 @@ class AdminOperations:
                 query = f"UPDATE coffees SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, values)
                 self.conn.commit()
+                menu_cache.invalidate()
                 print(f"Coffee ID {coffee_id} updated successfully!")
                 return True
             else:
@@ -65,6 +70,7 @@ class AdminOperations:
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM coffees WHERE id = ?", (coffee_id,))
             self.conn.commit()
+            menu_cache.invalidate()
             print(f"Coffee ID {coffee_id} deleted successfully!")
             return True
         except Exception as e:
@@ -99,38 +105,24 @@ class AdminOperations:
     def view_all_orders(self):
         """View all orders"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            SELECT o.*, u.first_name, u.last_name, u.email 
-            FROM orders o 
-            JOIN users u ON o.user_id = u.id 
-            ORDER BY o.created_at DESC
-            ''')
-            
-            orders = cursor.fetchall()
+            loader = OrderLoader(self.conn)
+            orders = []
             
             print("\n" + "="*60)
             print("ALL ORDERS")
             print("="*60)
             
-            for order in orders:
-                print(f"Order ID: {order[0]}")
-                print(f"Customer: {order[5]} {order[6]} ({order[7]})")
-                print(f"Total: ${order[2]:.2f}")
-                print(f"Status: {order[3]}")
-                print(f"Date: {order[4]}")
+            for order in loader.iter_orders():
+                orders.append(order)
                 
-                # Get order items
-                cursor.execute('''
-                SELECT c.name, oi.quantity, oi.price 
-                FROM order_items oi 
-                JOIN coffees c ON oi.coffee_id = c.id 
-                WHERE oi.order_id = ?
-                ''', (order[0],))
+                print(f"Order ID: {order['id']}")
+                print(f"Customer: {order['first_name']} {order['last_name']} ({order['email']})")
+                print(f"Total: ${order['total_amount']:.2f}")
+                print(f"Status: {order['status']}")
+                print(f"Date: {order['created_at']}")
                 
-                items = cursor.fetchall()
-                for item in items:
-                    print(f"  - {item[0]} x{item[1]}: ${item[2]:.2f}")
+                for item in order['items']:
+                    print(f"  - {item['name']} x{item['quantity']}: ${item['price']:.2f}")
                 
                 print("-" * 40)
             
@@ -139,16 +131,36 @@ class AdminOperations:
             print(f"Error viewing orders: {e}")
             return []
     
-    def update_order_status(self, order_id, status):
-        """Update order status"""
+    def update_order_status(self, order_id, status, expected_version=None):
+        """Update order status if it is still at expected_version (default: the current one)"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            UPDATE orders SET status = ? WHERE id = ?
-            ''', (status, order_id))
-            self.conn.commit()
+            if expected_version is None:
+                state = current_state(self.conn, order_id)
+                if state is None:
+                    print(f"Order ID {order_id} not found!")
+                    return False
+                expected_version = state[1]
+            
+            version, state = update_status(self.conn, order_id, status, expected_version)
+            if version is None:
+                if state is None:
+                    print(f"Order ID {order_id} not found!")
+                else:
+                    print(f"Order ID {order_id} is now '{state[0]}' (version {state[1]}); "
+                          f"cannot move it to '{status}' from version {expected_version}")
+                return False
             print(f"Order ID {order_id} status updated to '{status}'!")
             return True
         except Exception as e:
             print(f"Error updating order status: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def bulk_update_order_status(self, status, from_status=None, order_ids=None):
+        """Move a whole queue (or a list of orders) to a new status in one statement"""
+        try:
+            updated = bulk_update_status(self.conn, status, from_status=from_status, order_ids=order_ids)
+            print(f"{len(updated)} order(s) updated to '{status}'!")
+            return updated
+        except Exception as e:
+            print(f"Error updating order status: {e}")
+            return []
@@ -2,6 +2,8 @@ from flask import Flask, render_template, request, redirect, url_for, session, f
 import sqlite3
 import os
 
+from credentials import hash_password, verifier
+
 app = Flask(__name__)
 app.secret_key = 'coffee-shop-secret-key-2024'
 
@@ -43,7 +45,7 @@ def init_db():
         cursor.execute('''
         INSERT INTO users (first_name, last_name, email, password, contact_number, is_admin)
         VALUES (?, ?, ?, ?, ?, ?)
-        ''', ('Admin', 'User', 'admin@coffee.com', 'admin123', '1234567890', 1))
+        ''', ('Admin', 'User', 'admin@coffee.com', hash_password('admin123'), '1234567890', 1))
     
     # Add sample coffees
     cursor.execute("SELECT COUNT(*) FROM coffees")
@@ -86,9 +88,7 @@ def login():
             return redirect('/login')
         
         conn = sqlite3.connect('coffee.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password))
-        user = cursor.fetchone()
+        user = verifier.authenticate(conn, email, password)
         conn.close()
         
         if user:
@@ -136,7 +136,7 @@ def register():
             cursor.execute('''
             INSERT INTO users (first_name, last_name, email, contact_number, password)
             VALUES (?, ?, ?, ?, ?)
-            ''', (first_name, last_name, email, contact, password))
+            ''', (first_name, last_name, email, contact, verifier.hash(password)))
             conn.commit()
             conn.close()
             flash('Registration successful! Please login.', 'success')
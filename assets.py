@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import os
+import re
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+MINIFY_ASSETS = os.environ.get('COFFEE_SHOP_MINIFY_ASSETS', '1') == '1'
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+
+# Fingerprinted files never change, so browsers may keep them for a year
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Each encoding is a different representation, so it gets its own ETag
+ETAG_SUFFIXES = {'identity': '', 'gzip': '-gz', 'br': '-br'}
+
+
+def minify_css(css):
+    """Strip comments and the whitespace CSS does not need"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """Conservative JS minifier: drops indentation, blank and comment-only lines"""
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def extract_tag_body(html, tag):
+    """Return the text inside the first inline <tag>...</tag> block"""
+    match = re.search(rf'<{tag}>(.*?)</{tag}>', html, flags=re.S)
+    if not match:
+        raise ValueError(f"No inline <{tag}> block found")
+    return match.group(1)
+
+
+class AssetPipeline:
+    """Writes shared CSS/JS to static/dist under content-hash filenames.
+
+    Each asset is served from memory at /assets/<name>.<hash>.<ext> with a
+    long-lived Cache-Control header and an ETag, preferring a precompressed
+    brotli or gzip variant when the client accepts it. The same files are
+    written to disk so a front-end server can serve them directly.
+    """
+
+    def __init__(self, app=None, output_dir=ASSET_DIR, url_prefix='/assets', minify=MINIFY_ASSETS):
+        self.output_dir = output_dir
+        self.url_prefix = url_prefix
+        self.minify = minify
+        self.manifest = {}
+        self.files = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.add_url_rule(f'{self.url_prefix}/<filename>', 'asset', self.serve)
+        app.add_template_global(self.url, 'asset_url')
+
+    def add(self, name, content):
+        """Build one asset (e.g. 'main.css') and return its fingerprinted URL"""
+        stem, ext = os.path.splitext(name)
+        if self.minify:
+            content = minify_css(content) if ext == '.css' else minify_js(content)
+
+        body = content.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        filename = f'{stem}.{digest}{ext}'
+
+        variants = {'identity': body, 'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        for encoding, data in variants.items():
+            path = os.path.join(self.output_dir, filename + suffixes[encoding])
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+
+        self.manifest[name] = filename
+        self.files[filename] = {
+            'content_type': CONTENT_TYPES.get(ext, 'application/octet-stream'),
+            'digest': digest,
+            'variants': variants,
+        }
+        return self.url(name)
+
+    def url(self, name):
+        return f'{self.url_prefix}/{self.manifest[name]}'
+
+    def serve(self, filename):
+        asset = self.files.get(filename)
+        if asset is None:
+            abort(404)
+
+        accepted = request.headers.get('Accept-Encoding', '')
+        for encoding in ('br', 'gzip'):
+            if encoding in asset['variants'] and encoding in accepted:
+                break
+        else:
+            encoding = 'identity'
+
+        etag = asset['digest'] + ETAG_SUFFIXES[encoding]
+        headers = {
+            'Cache-Control': CACHE_CONTROL,
+            'ETag': f'"{etag}"',
+            'Vary': 'Accept-Encoding',
+        }
+        # Parsed list of tags: handles several tags, "*" and W/ prefixes
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(asset['variants'][encoding], content_type=asset['content_type'], headers=headers)
+
+    def sizes(self, name):
+        """Byte size of each encoded variant of an asset"""
+        variants = self.files[self.manifest[name]]['variants']
+        return {encoding: len(data) for encoding, data in variants.items()}
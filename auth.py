@@ -1,4 +1,5 @@
 import sqlite3
+from credentials import verifier
 from database import create_connection
 from models import User
 
@@ -14,7 +15,7 @@ class AuthSystem:
             cursor.execute('''
             INSERT INTO users (first_name, last_name, email, contact_number, password, is_admin)
             VALUES (?, ?, ?, ?, ?, ?)
-            ''', (first_name, last_name, email, contact_number, password, 1 if is_admin else 0))
+            ''', (first_name, last_name, email, contact_number, verifier.hash(password), 1 if is_admin else 0))
             self.conn.commit()
             print(f"✓ User {email} registered successfully!")
             return cursor.lastrowid
@@ -28,12 +29,7 @@ class AuthSystem:
     def login(self, email, password):
         """Login user"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            SELECT * FROM users WHERE email = ? AND password = ?
-            ''', (email, password))
-            
-            row = cursor.fetchone()
+            row = verifier.authenticate(self.conn, email, password)
             if row:
                 user = User.from_db_row(row)
                 user_type = "Admin" if user.is_admin else "Customer"
@@ -0,0 +1,55 @@
+"""Bytes saved per page by linking the fingerprinted CSS/JS instead of inlining it.
+
+Renders every page through the Flask test client against a scratch database
+and compares the response with what it would weigh with MAIN_STYLES and
+MAIN_SCRIPT inlined, raw and gzipped. Usage:
+
+    python bench_assets.py
+"""
+import gzip
+import os
+import tempfile
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import coffee_shop  # noqa: E402
+
+PAGES = {
+    None: ['/', '/about', '/menu', '/contact', '/login', '/register'],
+    ('user@coffee.com', 'user123'): ['/cart', '/orders', '/profile'],
+    ('admin@coffee.com', 'admin123'): ['/admin', '/admin/coffees', '/admin/users', '/admin/orders'],
+}
+
+
+def main():
+    linked_tags = coffee_shop.STYLES_TAG + coffee_shop.SCRIPT_TAGS
+    inline_tags = coffee_shop.MAIN_STYLES + coffee_shop.MAIN_SCRIPT
+
+    print("="*78)
+    print("ASSET SAVINGS PER PAGE VIEW (bytes)")
+    print("="*78)
+    print(f"{'page':<18}{'inline':>12}{'linked':>12}{'saved':>12}{'inline gz':>12}{'linked gz':>12}")
+    for credentials, paths in PAGES.items():
+        client = coffee_shop.app.test_client()
+        if credentials:
+            client.post('/login', data={'email': credentials[0], 'password': credentials[1]})
+        for path in paths:
+            linked = client.get(path).get_data(as_text=True)
+            inline = linked.replace(coffee_shop.STYLES_TAG, coffee_shop.MAIN_STYLES, 1)
+            # Jinja drops the template's final newline, so match without it
+            inline = inline.replace(coffee_shop.SCRIPT_TAGS.rstrip('\n'), coffee_shop.MAIN_SCRIPT.rstrip('\n'), 1)
+            linked_bytes, inline_bytes = linked.encode(), inline.encode()
+            print(f"{path:<18}{len(inline_bytes):>12}{len(linked_bytes):>12}"
+                  f"{len(inline_bytes) - len(linked_bytes):>12}"
+                  f"{len(gzip.compress(inline_bytes)):>12}{len(gzip.compress(linked_bytes)):>12}")
+
+    print("-"*78)
+    for name in ('main.css', 'main.js'):
+        sizes = coffee_shop.assets.sizes(name)
+        variants = ', '.join(f"{encoding} {size}" for encoding, size in sizes.items())
+        print(f"{coffee_shop.assets.url(name)}: {variants} (fetched once, then cached)")
+    print(f"Inline CSS+JS per view: {len(inline_tags.encode())} bytes; link tags: {len(linked_tags.encode())} bytes")
+
+
+if __name__ == '__main__':
+    main()
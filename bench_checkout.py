@@ -0,0 +1,122 @@
+"""Checkout throughput in orders per second, with retried submits.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB). Each
+client thread logs in as its own seeded user, then repeatedly fills its cart
+with one /api/cart/batch call and POSTs /checkout with a fresh idempotency
+key, resubmitting the same key --retries times as a double click would.
+Reports orders per second for the whole cart + checkout flow, checkout and
+replay latency, and checks that retries never created a second order. Usage:
+
+    python bench_checkout.py [--orders 2000] [--threads 4] [--items 3] [--coffees 20] [--retries 1]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+import seed_data  # noqa: E402
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def client(email, coffee_ids, orders, items, retries, seed, results, lock):
+    rng = random.Random(seed)
+    http = coffee_shop.app.test_client()
+    http.post('/login', data={'email': email, 'password': seed_data.SEED_PASSWORD})
+
+    checkout_times, replay_times, order_ids, failures = [], [], [], 0
+    for _ in range(orders):
+        operations = [{'op': 'add', 'coffee_id': coffee_id, 'quantity': rng.randint(1, 3)}
+                      for coffee_id in rng.sample(coffee_ids, items)]
+        http.post('/api/cart/batch', json={'operations': operations})
+
+        headers = {'Idempotency-Key': uuid.uuid4().hex}
+        start = time.perf_counter()
+        data = http.post('/checkout', json={}, headers=headers).get_json()
+        checkout_times.append(time.perf_counter() - start)
+        if not data.get('success'):
+            failures += 1
+            continue
+        order_ids.append(data['order_id'])
+
+        for _ in range(retries):
+            start = time.perf_counter()
+            replay = http.post('/checkout', json={}, headers=headers).get_json()
+            replay_times.append(time.perf_counter() - start)
+            if replay.get('order_id') != data['order_id'] or not replay.get('replayed'):
+                failures += 1
+
+    with lock:
+        results['checkout'].extend(checkout_times)
+        results['replay'].extend(replay_times)
+        results['order_ids'].extend(order_ids)
+        results['failures'] += failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000, help='orders in total, split across threads')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--items', type=int, default=3, help='distinct coffees per order')
+    parser.add_argument('--coffees', type=int, default=20, help='extra coffees to seed')
+    parser.add_argument('--retries', type=int, default=1, help='duplicate submits per order')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    with coffee_shop.db_pool.pool.connection() as conn:
+        _, user_ids = seed_data.seed(conn, users=args.threads, coffees=args.coffees, seed=args.seed)
+        coffee_ids = [row[0] for row in conn.execute("SELECT id FROM coffees WHERE is_available = 1")]
+        orders_before = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    results = {'checkout': [], 'replay': [], 'order_ids': [], 'failures': 0}
+    lock = threading.Lock()
+    per_thread = args.orders // args.threads
+    threads = [threading.Thread(target=client, args=(
+        seed_data.user_email(user_id), coffee_ids, per_thread, min(args.items, len(coffee_ids)),
+        args.retries, args.seed + number, results, lock))
+        for number, user_id in enumerate(user_ids)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    with coffee_shop.db_pool.pool.connection() as conn:
+        created = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] - orders_before
+
+    checkout = sorted(results['checkout'])
+    replay = sorted(results['replay'])
+    placed = len(results['order_ids'])
+    print("="*72)
+    print(f"CHECKOUT BENCHMARK ({args.threads} threads, {args.items} items per order, "
+          f"{args.retries} retries per order)")
+    print("="*72)
+    print(f"{'orders placed':<28}{placed:>12,}")
+    print(f"{'orders/s (cart + checkout)':<28}{placed / wall:>12.0f}")
+    print(f"{'checkout p50 / p95 ms':<28}{percentile(checkout, 0.5) * 1000:>12.2f}"
+          f"{percentile(checkout, 0.95) * 1000:>10.2f}")
+    if replay:
+        print(f"{'replay p50 / p95 ms':<28}{percentile(replay, 0.5) * 1000:>12.2f}"
+              f"{percentile(replay, 0.95) * 1000:>10.2f}")
+    duplicates = created - len(set(results['order_ids']))
+    print(f"{'duplicate orders':<28}{duplicates:>12}")
+    print(f"{'failed requests':<28}{results['failures']:>12}")
+    print("✓ Every retry returned the original order" if not duplicates and not results['failures']
+          else "✗ Retries were not deduplicated")
+
+
+if __name__ == '__main__':
+    main()
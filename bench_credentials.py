@@ -0,0 +1,92 @@
+"""Logins per second for each PBKDF2 work factor.
+
+Fills a scratch database with users hashed at the given work factor, then
+runs CredentialVerifier.authenticate from several client threads, once with
+the success cache disabled (every login pays the KDF) and once with it on
+(repeat logins). ms/verify includes the wait for a free pool worker. The
+plaintext row is the old SQL password comparison, for reference. Usage:
+
+    python bench_credentials.py [--iterations 100000 310000 600000] [--logins 200] [--threads 8]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from credentials import VERIFY_WORKERS, CredentialVerifier, hash_password
+from database import create_tables
+
+PASSWORD = 'bench123'
+
+
+def prepare(path, users, iterations):
+    conn = sqlite3.connect(path)
+    with redirect_stdout(StringIO()):
+        create_tables(conn)
+    conn.execute("DELETE FROM users")
+    stored = hash_password(PASSWORD, iterations) if iterations else PASSWORD
+    conn.executemany(
+        "INSERT INTO users (first_name, last_name, email, contact_number, password) VALUES (?, ?, ?, ?, ?)",
+        (('Bench', str(i), f'bench{i}@coffee.com', '0000000000', stored) for i in range(users)))
+    conn.commit()
+    conn.close()
+
+
+def plaintext_login(conn, email, password):
+    """The pre-hashing login query, kept as the baseline"""
+    return conn.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password)).fetchone()
+
+
+def logins_per_second(path, authenticate, logins, threads, users):
+    def client(number):
+        conn = sqlite3.connect(path)
+        for i in range(number, logins, threads):
+            assert authenticate(conn, f'bench{i % users}@coffee.com', PASSWORD)
+        conn.close()
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, nargs='*', default=[100000, 310000, 600000])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=VERIFY_WORKERS, help='verification pool size')
+    args = parser.parse_args()
+
+    print("="*72)
+    print(f"LOGIN BENCHMARK ({args.logins} logins, {args.threads} client threads, {args.workers} KDF workers)")
+    print("="*72)
+    print(f"{'work factor':<14}{'ms/verify':>12}{'uncached/s':>14}{'cached/s':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        prepare(path, args.users, 0)
+        rate = logins_per_second(path, plaintext_login, args.logins, args.threads, args.users)
+        print(f"{'plaintext':<14}{'-':>12}{rate:>14.0f}{'-':>14}")
+
+        for iterations in args.iterations:
+            # Same work factor as the rows, so nothing is rehashed mid-run
+            prepare(path, args.users, iterations)
+            uncached = CredentialVerifier(iterations, workers=args.workers, cache_size=0)
+            rate = logins_per_second(path, uncached.authenticate, args.logins, args.threads, args.users)
+            per_verify = uncached.stats()['verify_time_mean'] * 1000
+
+            cached = CredentialVerifier(iterations, workers=args.workers)
+            cached_rate = logins_per_second(path, cached.authenticate, args.logins, args.threads, args.users)
+            print(f"{iterations:<14,}{per_verify:>12.2f}{rate:>14.0f}{cached_rate:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Checkout latency with after-order work inline vs on the job workers.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB) with a
+simulated kitchen printer that takes --printer-ms per ticket. Client threads
+fill their cart and POST /checkout as in bench_checkout.py. In inline mode
+the request itself runs the queued jobs before returning, as it did before
+the job queue; in queued mode it only wakes the workers. Reports checkout
+throughput and latency, and how long a ticket takes from order to printer.
+Usage:
+
+    python bench_jobs.py [--orders 400] [--threads 4] [--workers 2] [--printer-ms 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+# Measure only the queues this benchmark starts
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+
+import coffee_shop  # noqa: E402
+import job_queue  # noqa: E402
+import seed_data  # noqa: E402
+import user_operations  # noqa: E402
+from bench_checkout import percentile  # noqa: E402
+from kitchen_tickets import print_ticket  # noqa: E402
+
+
+class InlineQueue(job_queue.JobQueue):
+    """Runs every due job on the thread that wakes it, inside the request"""
+
+    def __init__(self):
+        super().__init__(workers=0)
+        self._local = threading.local()
+
+    def wake(self):
+        if not hasattr(self._local, 'conn'):
+            self._local.conn = job_queue.connect()
+        while self.run_next(self._local.conn):
+            pass
+
+
+def client(email, coffee_ids, orders, seed, results, lock):
+    rng = random.Random(seed)
+    http = coffee_shop.app.test_client()
+    http.post('/login', data={'email': email, 'password': seed_data.SEED_PASSWORD})
+
+    times = []
+    for _ in range(orders):
+        operations = [{'op': 'add', 'coffee_id': coffee_id, 'quantity': 1}
+                      for coffee_id in rng.sample(coffee_ids, 2)]
+        http.post('/api/cart/batch', json={'operations': operations})
+        start = time.perf_counter()
+        http.post('/checkout', json={}, headers={'Idempotency-Key': uuid.uuid4().hex})
+        times.append(time.perf_counter() - start)
+    with lock:
+        results.extend(times)
+
+
+def run(mode, args, emails, coffee_ids):
+    queue = InlineQueue() if mode == 'inline' else job_queue.JobQueue(workers=args.workers)
+    user_operations.job_queue = queue
+    queue.start()
+    with coffee_shop.db_pool.pool.connection() as conn:
+        first_job = conn.execute("SELECT COALESCE(MAX(id), 0) FROM jobs").fetchone()[0]
+
+    results = []
+    lock = threading.Lock()
+    threads = [threading.Thread(target=client, args=(email, coffee_ids, args.orders // len(emails),
+                                                     args.seed + number, results, lock))
+               for number, email in enumerate(emails)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    # Wait for the workers to print every ticket
+    with coffee_shop.db_pool.pool.connection() as conn:
+        while conn.execute("SELECT COUNT(*) FROM jobs WHERE id > ? AND status != 'done'",
+                           (first_job,)).fetchone()[0]:
+            time.sleep(0.05)
+        delays = sorted(row[0] for row in conn.execute(
+            "SELECT finished_at - enqueued_at FROM jobs WHERE id > ?", (first_job,)))
+    queue.stop()
+    results.sort()
+    return (len(results) / wall, percentile(results, 0.5), percentile(results, 0.95),
+            percentile(delays, 0.5), percentile(delays, 0.95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=400, help='orders per mode, split across threads')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2, help='job worker threads in queued mode')
+    parser.add_argument('--printer-ms', type=float, default=20.0, help='simulated time to print one ticket')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    def slow_printer(conn, payload):
+        time.sleep(args.printer_ms / 1000)
+        print_ticket(conn, payload)
+
+    job_queue.HANDLERS['kitchen_ticket'] = slow_printer
+
+    with coffee_shop.db_pool.pool.connection() as conn:
+        _, user_ids = seed_data.seed(conn, users=args.threads, seed=args.seed)
+        coffee_ids = [row[0] for row in conn.execute("SELECT id FROM coffees WHERE is_available = 1")]
+    emails = [seed_data.user_email(user_id) for user_id in user_ids]
+
+    print("="*72)
+    print(f"AFTER-ORDER WORK ({args.threads} threads, {args.printer_ms:g} ms per ticket, "
+          f"{args.workers} job workers)")
+    print("="*72)
+    print(f"{'mode':<10}{'orders/s':>10}{'checkout p50':>15}{'p95 ms':>9}{'ticket p50':>13}{'p95 ms':>9}")
+    for mode in ('inline', 'queued'):
+        rate, p50, p95, ticket_p50, ticket_p95 = run(mode, args, emails, coffee_ids)
+        print(f"{mode:<10}{rate:>10.0f}{p50 * 1000:>15.2f}{p95 * 1000:>9.2f}"
+              f"{ticket_p50 * 1000:>13.2f}{ticket_p95 * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""End-to-end load test: latency percentiles and throughput per route.
+
+Seeds a scratch database (COFFEE_SHOP_DB) with the requested number of
+users, coffees and orders, then runs a pool of simulated visitors against
+coffee_shop.app, either in-process through Flask's test client or over HTTP
+against a real threaded WSGI server on localhost. Each visitor draws its
+next request from a weighted customer or admin mix. Results (p50/p95/p99,
+mean, max, requests per second and errors per route) are printed as a table
+and written as JSON so runs can be compared across commits. Usage:
+
+    python bench_load.py [--users 1000] [--orders 20000] [--coffees 50]
+                         [--target test-client|wsgi|both] [--mix customer|admin|mixed]
+                         [--workers 8] [--duration 10] [--output load.json]
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import coffee_shop  # noqa: E402
+import seed_data  # noqa: E402
+
+# (weight, route name, method, path, body); '{coffee}' is filled per request
+CUSTOMER_MIX = [
+    (10, 'GET /', 'GET', '/', None),
+    (35, 'GET /menu', 'GET', '/menu', None),
+    (25, 'POST /api/cart/add', 'POST', '/api/cart/add', {'coffee_id': '{coffee}'}),
+    (15, 'GET /cart', 'GET', '/cart', None),
+    (10, 'GET /orders', 'GET', '/orders', None),
+    (5, 'POST /login', 'LOGIN', '/login', None),
+]
+ADMIN_MIX = [
+    (30, 'GET /admin', 'GET', '/admin', None),
+    (20, 'GET /admin/orders', 'GET', '/admin/orders', None),
+    (15, 'GET /admin/users', 'GET', '/admin/users', None),
+    (15, 'GET /admin/coffees', 'GET', '/admin/coffees', None),
+    (20, 'GET /api/admin/orders', 'GET', '/api/admin/orders', None),
+]
+# Share of visitors that are admins in the mixed workload
+ADMIN_SHARE = 0.1
+
+
+def seed(users, orders, coffees, random_seed):
+    """Bulk-load the scratch database; the demo accounts come from init_db()"""
+    with coffee_shop.db_pool.pool.connection() as conn:
+        _, user_ids = seed_data.seed(conn, users=users, orders=orders, coffees=coffees, seed=random_seed)
+        coffee_ids = [row[0] for row in conn.execute("SELECT id FROM coffees")]
+    coffee_shop.menu_cache.invalidate()
+    return [seed_data.user_email(user_id) for user_id in user_ids], coffee_ids
+
+
+class TestClientSession:
+    """One visitor talking to the app in-process"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        response.close()
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession:
+    """One visitor talking to the WSGI server over a cookie-keeping opener"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def visitor(make_session, mix, credentials, coffee_ids, deadline, seed, samples, lock):
+    rng = random.Random(seed)
+    session = make_session()
+    form = {'email': credentials[0], 'password': credentials[1]}
+    session.request('POST', '/login', form=form)
+
+    weights = [entry[0] for entry in mix]
+    local = {}
+    while time.perf_counter() < deadline:
+        _, name, method, path, body = rng.choices(mix, weights)[0]
+        start = time.perf_counter()
+        if method == 'LOGIN':
+            status = session.request('POST', path, form=form)
+        elif body is not None:
+            payload = {key: rng.choice(coffee_ids) if value == '{coffee}' else value for key, value in body.items()}
+            status = session.request(method, path, json_body=payload)
+        else:
+            status = session.request(method, path)
+        elapsed = time.perf_counter() - start
+        latencies, errors = local.setdefault(name, ([], [0]))
+        latencies.append(elapsed)
+        if status >= 400:
+            errors[0] += 1
+
+    with lock:
+        for name, (latencies, errors) in local.items():
+            entry = samples.setdefault(name, {'latencies': [], 'errors': 0})
+            entry['latencies'].extend(latencies)
+            entry['errors'] += errors[0]
+
+
+def run(make_session, mix_name, workers, duration, coffee_ids, emails, seed):
+    samples = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = []
+    for number in range(workers):
+        if mix_name == 'admin' or (mix_name == 'mixed' and number < max(1, round(workers * ADMIN_SHARE))):
+            mix, credentials = ADMIN_MIX, ('admin@coffee.com', 'admin123')
+        else:
+            mix, credentials = CUSTOMER_MIX, (emails[number % len(emails)], seed_data.SEED_PASSWORD)
+        thread = threading.Thread(target=visitor, args=(
+            make_session, mix, credentials, coffee_ids, deadline, seed + number, samples, lock))
+        threads.append(thread)
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    routes = {}
+    total = 0
+    for name, entry in sorted(samples.items()):
+        latencies = sorted(entry['latencies'])
+        total += len(latencies)
+        routes[name] = {
+            'requests': len(latencies),
+            'errors': entry['errors'],
+            'rps': len(latencies) / wall,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+    return {'wall_s': wall, 'requests': total, 'rps': total / wall, 'routes': routes}
+
+
+def serve(app):
+    """Start a threaded WSGI server on a free local port"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(target, result):
+    print("="*100)
+    print(f"{target.upper()}: {result['requests']:,} requests in {result['wall_s']:.1f}s "
+          f"({result['rps']:.0f} req/s)")
+    print("="*100)
+    print(f"{'route':<26}{'reqs':>8}{'errors':>8}{'req/s':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>8}")
+    for name, route in result['routes'].items():
+        print(f"{name:<26}{route['requests']:>8}{route['errors']:>8}{route['rps']:>10.1f}{route['mean_ms']:>10.2f}"
+              f"{route['p50_ms']:>10.2f}{route['p95_ms']:>10.2f}{route['p99_ms']:>10.2f}{route['max_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--coffees', type=int, default=50)
+    parser.add_argument('--target', choices=('test-client', 'wsgi', 'both'), default='both')
+    parser.add_argument('--mix', choices=('customer', 'admin', 'mixed'), default='mixed')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per target')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    emails, coffee_ids = seed(max(1, args.users), args.orders, args.coffees, args.seed)
+    print(f"Seeded {args.users:,} users, {args.coffees:,} coffees and {args.orders:,} orders "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    report = {
+        'revision': git_revision(),
+        'config': {key: getattr(args, key) for key in ('users', 'orders', 'coffees', 'mix', 'workers', 'duration', 'seed')},
+        'targets': {},
+    }
+    app = coffee_shop.app
+
+    if args.target in ('test-client', 'both'):
+        result = run(lambda: TestClientSession(app), args.mix, args.workers, args.duration,
+                     coffee_ids, emails, args.seed)
+        report['targets']['test-client'] = result
+        print_table('test client', result)
+
+    if args.target in ('wsgi', 'both'):
+        server, base_url = serve(app)
+        try:
+            result = run(lambda: HTTPSession(base_url), args.mix, args.workers, args.duration,
+                         coffee_ids, emails, args.seed)
+        finally:
+            server.shutdown()
+        report['targets']['wsgi'] = result
+        print_table(f'wsgi {base_url}', result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ JSON report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
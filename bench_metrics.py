@@ -0,0 +1,117 @@
+"""Overhead of request timing: middleware, histogram recording and timed queries.
+
+Calls a minimal WSGI app and a one-route Flask app bare and through
+RequestTimer (init_app for Flask, so the tagging hook is included),
+records into a RequestMetrics directly, and runs the same primary-key lookup on a plain
+sqlite3 connection and on a TimedConnection, outside a request and inside
+one where query_profiler counts every statement. Reports the added cost in
+microseconds per request or per query, each the best of --rounds runs so
+that other load on the machine does not count as overhead. Usage:
+
+    python bench_metrics.py [--requests 100000] [--queries 100000] [--rounds 5]
+"""
+import argparse
+import sqlite3
+import time
+
+from flask import Flask
+from werkzeug.test import EnvironBuilder
+
+import request_metrics
+from query_profiler import profiler
+from request_metrics import RequestMetrics, RequestTimer, TimedConnection
+
+
+def hello_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    # What tag_response leaves behind in a Flask app
+    environ[request_metrics.RESPONSE_KEY] = ('hello', 200, False)
+    return [b'ok']
+
+
+def flask_app(metrics=None):
+    app = Flask(__name__)
+    app.add_url_rule('/menu', 'menu', lambda: 'ok')
+    if metrics is not None:
+        request_metrics.init_app(app, metrics)
+    return app
+
+
+def start_response(status, headers, exc_info=None):
+    return None
+
+
+def serve(app, requests):
+    environ = EnvironBuilder(path='/menu').get_environ()
+    start = time.perf_counter()
+    for _ in range(requests):
+        body = app(environ, start_response)
+        for _ in body:
+            pass
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+    return (time.perf_counter() - start) / requests
+
+
+def query(factory, queries):
+    conn = sqlite3.connect(':memory:', factory=factory)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO items VALUES (?, ?)", [(n, f'item {n}') for n in range(1000)])
+    start = time.perf_counter()
+    for n in range(queries):
+        conn.execute("SELECT name FROM items WHERE id = ?", (n % 1000,)).fetchone()
+    return (time.perf_counter() - start) / queries
+
+
+def record(metrics, requests):
+    start = time.perf_counter()
+    for n in range(requests):
+        metrics.record('menu', 200, 250000 + n % 1000 * 1000, 50000, 100000)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    def best(measure, *measure_args):
+        return min(measure(*measure_args) for _ in range(args.rounds))
+
+    metrics = RequestMetrics()
+    bare = best(serve, hello_app, args.requests)
+    timed = best(serve, RequestTimer(hello_app, metrics), args.requests)
+    # A Flask request takes ~100 us, so fewer of them
+    flask_requests = max(1, args.requests // 20)
+    flask_bare = best(serve, flask_app(), flask_requests)
+    flask_timed = best(serve, flask_app(RequestMetrics()), flask_requests)
+    recorded = RequestMetrics()
+    record_time = best(record, recorded, args.requests)
+
+    plain = best(query, sqlite3.Connection, args.queries)
+    timed_query = best(query, TimedConnection, args.queries)
+    profiler.begin('/bench')
+    profiled_query = best(query, TimedConnection, args.queries)
+    profiler.end('bench', 200, 0)
+
+    print("="*72)
+    print("REQUEST TIMING OVERHEAD")
+    print("="*72)
+    print(f"{'':<28}{'bare us':>12}{'timed us':>12}{'added us':>12}")
+    print(f"{'request (middleware)':<28}{bare * 1e6:>12.2f}{timed * 1e6:>12.2f}{(timed - bare) * 1e6:>12.2f}")
+    print(f"{'request (Flask app)':<28}{flask_bare * 1e6:>12.2f}{flask_timed * 1e6:>12.2f}"
+          f"{(flask_timed - flask_bare) * 1e6:>12.2f}")
+    print(f"{'query (execute + fetchone)':<28}{plain * 1e6:>12.2f}{timed_query * 1e6:>12.2f}"
+          f"{(timed_query - plain) * 1e6:>12.2f}")
+    print(f"{'query (profiled)':<28}{plain * 1e6:>12.2f}{profiled_query * 1e6:>12.2f}"
+          f"{(profiled_query - plain) * 1e6:>12.2f}")
+    print(f"{'record() alone':<28}{'':>12}{'':>12}{record_time * 1e6:>12.2f}")
+    summary = recorded.summary()['menu']
+    print(f"recorded p50 / p99 of 250-1249 us inputs: {summary['p50'] * 1e6:.0f} / {summary['p99'] * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Live order queue: page refresh polling vs the server-sent events feed.
+
+Starts coffee_shop on a local threaded WSGI server over a scratch database
+(COFFEE_SHOP_DB) and opens N barista screens while a writer places orders
+at a steady rate. In poll mode every screen reloads /admin/orders every
+--interval seconds; in push mode it loads the page once and then follows
+/admin/orders/stream. Reports database connection checkouts per second
+(a proxy for query load) and how long a new order takes to reach a screen,
+counted from the moment every screen is logged in and connected. Usage:
+
+    python bench_order_feed.py [--screens 1 4 12] [--interval 2] [--rate 5] [--duration 5]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+from bench_load import HTTPSession, percentile, seed, serve  # noqa: E402
+from user_operations import UserOperations  # noqa: E402
+
+ADMIN_LOGIN = {'email': 'admin@coffee.com', 'password': 'admin123'}
+
+
+def poll_screen(base_url, interval, ready, timing, seen, lock):
+    session = HTTPSession(base_url)
+    session.request('POST', '/login', form=ADMIN_LOGIN)
+    ready.wait()
+    while time.perf_counter() < timing['deadline']:
+        session.request('GET', '/admin/orders')
+        with lock:
+            seen.append(time.perf_counter())
+        time.sleep(interval)
+
+
+def push_screen(base_url, ready, timing, placed, latencies, lock):
+    session = HTTPSession(base_url)
+    session.request('POST', '/login', form=ADMIN_LOGIN)
+    session.request('GET', '/admin/orders')
+    with session.opener.open(base_url + '/admin/orders/stream') as stream:
+        ready.wait()
+        for raw in stream:
+            if not raw.startswith(b'data: '):
+                continue
+            received = time.perf_counter()
+            orders = json.loads(raw[len(b'data: '):])
+            with lock:
+                latencies.extend(received - placed[order['id']] for order in orders if order['id'] in placed)
+            if timing.get('done'):
+                return
+
+
+def place_orders(rate, deadline, user_ids, coffee_ids, placed, lock):
+    rng = random.Random(7)
+    with coffee_shop.db_pool.pool.connection() as conn:
+        operations = UserOperations(conn)
+        while True:
+            with redirect_stdout(StringIO()):
+                order_id = operations.place_order(rng.choice(user_ids), {rng.choice(coffee_ids): 1})
+            with lock:
+                placed[order_id] = time.perf_counter()
+            if time.perf_counter() >= deadline:
+                return
+            time.sleep(1 / rate)
+
+
+def run(mode, base_url, screens, args, user_ids, coffee_ids):
+    """Measure one mode once every screen has logged in (and, for push, connected)"""
+    placed, latencies, seen = {}, [], []
+    lock = threading.Lock()
+    timing = {}
+
+    def begin():
+        # Runs once, just before the barrier lets everybody go
+        timing['start'] = time.perf_counter()
+        timing['deadline'] = timing['start'] + args.duration
+        timing['acquired'] = coffee_shop.db_pool.pool.stats()['acquired']
+
+    ready = threading.Barrier(screens + 1, action=begin)
+    if mode == 'poll':
+        threads = [threading.Thread(target=poll_screen, args=(base_url, args.interval, ready, timing, seen, lock))
+                   for _ in range(screens)]
+    else:
+        threads = [threading.Thread(target=push_screen, args=(base_url, ready, timing, placed, latencies, lock))
+                   for _ in range(screens)]
+    for thread in threads:
+        thread.start()
+
+    ready.wait()
+    place_orders(args.rate, timing['deadline'], user_ids, coffee_ids, placed, lock)
+    checkouts = coffee_shop.db_pool.pool.stats()['acquired'] - timing['acquired']
+    elapsed = time.perf_counter() - timing['start']
+    # One last order wakes every stream so the screens see the run is over
+    timing['done'] = True
+    place_orders(args.rate, 0, user_ids, coffee_ids, {}, lock)
+    for thread in threads:
+        thread.join()
+
+    if mode == 'poll':
+        # A new order shows up on the next reload: half an interval on average
+        latencies = [args.interval / 2] * len(placed)
+    latencies.sort()
+    return checkouts / elapsed, len(seen) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--screens', type=int, nargs='*', default=[1, 4, 12])
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between reloads in poll mode')
+    parser.add_argument('--rate', type=float, default=5.0, help='orders placed per second')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per run')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=20000, help='order history to seed')
+    args = parser.parse_args()
+
+    emails, coffee_ids = seed(args.users, args.orders, 20, 7)
+    with coffee_shop.db_pool.pool.connection() as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    server, base_url = serve(coffee_shop.app)
+
+    print("="*72)
+    print(f"LIVE ORDER QUEUE ({args.rate:g} orders/s, reload every {args.interval:g}s, {args.duration:g}s per run)")
+    print("="*72)
+    print(f"{'mode':<8}{'screens':>8}{'db checkouts/s':>16}{'requests/s':>12}{'p50 ms':>12}{'p95 ms':>12}")
+    try:
+        for screens in args.screens:
+            for mode in ('poll', 'push'):
+                checkouts, requests, p50, p95 = run(mode, base_url, screens, args, user_ids, coffee_ids)
+                print(f"{mode:<8}{screens:>8}{checkouts:>16.1f}{requests:>12.1f}{p50 * 1000:>12.1f}{p95 * 1000:>12.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
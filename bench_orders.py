@@ -0,0 +1,143 @@
+"""Order placement throughput in orders per second.
+
+Compares the old per-item statement loop with UserOperations.place_order
+(one IN-list price lookup, executemany, one BEGIN IMMEDIATE transaction)
+and UserOperations.place_orders_bulk on a scratch database, each the best
+of --rounds runs. Usage:
+
+    python bench_orders.py [--orders 2000] [--items 4] [--batch 100] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Jobs are still queued with each order, but nothing runs them here
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+
+import migrations  # noqa: E402
+from database import apply_storage_profile, create_tables, add_sample_coffees  # noqa: E402
+from job_queue import enqueue_after_order, job_queue  # noqa: E402
+from order_feed import order_feed  # noqa: E402
+from user_operations import UserOperations  # noqa: E402
+
+
+def prepare_database(path, profile):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    apply_storage_profile(conn, profile)
+    with redirect_stdout(StringIO()):
+        create_tables(conn)
+        migrations.migrate(conn)
+        add_sample_coffees(conn)
+    conn.execute('''
+    INSERT INTO users (first_name, last_name, email, contact_number, password)
+    VALUES ('Bench', 'User', 'bench@coffee.com', '0000000000', 'bench')
+    ''')
+    conn.commit()
+    return conn
+
+
+def place_order_per_statement(conn, user_id, coffee_quantities):
+    """The original 2N+2 statement order path, kept as the baseline.
+
+    It also queues the after-order jobs and refreshes the live feed, as every
+    order path now has to, so it compares like for like with place_order.
+    """
+    cursor = conn.cursor()
+    total_amount = 0
+    order_items = []
+    for coffee_id, quantity in coffee_quantities.items():
+        cursor.execute("SELECT price FROM coffees WHERE id = ? AND is_available = 1", (coffee_id,))
+        result = cursor.fetchone()
+        if result:
+            total_amount += result[0] * quantity
+            order_items.append((coffee_id, quantity, result[0]))
+
+    cursor.execute("INSERT INTO orders (user_id, total_amount, status) VALUES (?, ?, ?)",
+                   (user_id, total_amount, 'pending'))
+    order_id = cursor.lastrowid
+    for coffee_id, quantity, price in order_items:
+        cursor.execute("INSERT INTO order_items (order_id, coffee_id, quantity, price) VALUES (?, ?, ?, ?)",
+                       (order_id, coffee_id, quantity, price))
+    enqueue_after_order(conn, [order_id])
+    conn.commit()
+    order_feed.refresh(conn)
+    job_queue.wake()
+    cursor.execute('''
+    SELECT c.name, oi.quantity, oi.price
+    FROM order_items oi JOIN coffees c ON oi.coffee_id = c.id
+    WHERE oi.order_id = ?
+    ''', (order_id,))
+    cursor.fetchall()
+    return order_id
+
+
+def make_orders(count, items, seed=42):
+    rng = random.Random(seed)
+    return [(1, {coffee_id: rng.randint(1, 3) for coffee_id in rng.sample(range(1, 8), items)})
+            for _ in range(count)]
+
+
+def timed(fn, orders, profile):
+    """(orders/s, orders placed) of one run on a fresh database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = prepare_database(os.path.join(tmp, 'bench.db'), profile)
+        # A fresh database, so the live feed starts over from its empty log
+        order_feed.__init__()
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            fn(conn, orders)
+        elapsed = time.perf_counter() - start
+        placed = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        conn.close()
+    return len(orders) / elapsed, placed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--items', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--profile', default='throughput')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, min(args.items, 7))
+
+    def per_statement(conn, orders):
+        for user_id, quantities in orders:
+            place_order_per_statement(conn, user_id, quantities)
+
+    def single(conn, orders):
+        ops = UserOperations(conn)
+        for user_id, quantities in orders:
+            ops.place_order(user_id, quantities)
+
+    def bulk(conn, orders):
+        ops = UserOperations(conn)
+        for start in range(0, len(orders), args.batch):
+            ops.place_orders_bulk(orders[start:start + args.batch])
+
+    print("="*56)
+    print(f"ORDER PLACEMENT BENCHMARK ({args.orders} orders x {args.items} items)")
+    print("="*56)
+    print(f"{'strategy':<28}{'orders/s':>14}{'placed':>14}")
+    strategies = [('per-statement (old)', per_statement),
+                  ('place_order', single),
+                  (f'place_orders_bulk ({args.batch})', bulk)]
+    # Rounds alternate between strategies so drift on a busy machine hits them all alike
+    best = {}
+    for _ in range(args.rounds):
+        for label, fn in strategies:
+            best[label] = max(best.get(label, (0, 0)), timed(fn, orders, args.profile))
+    for label, _ in strategies:
+        rate, placed = best[label]
+        print(f"{label:<28}{rate:>14.0f}{placed:>14}")
+
+
+if __name__ == '__main__':
+    main()
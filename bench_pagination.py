@@ -0,0 +1,87 @@
+"""Keyset vs OFFSET pagination latency at page 1, 100 and 10,000.
+
+Seeds a scratch database with synthetic orders (1M by default), then times
+OrderLoader.load_page at the cursor that starts each target page, next to
+the equivalent LIMIT/OFFSET query. Usage:
+
+    python bench_pagination.py [--orders 1000000] [--items 3] [--page-size 50] [--pages 1 100 10000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+import seed_data
+from database import apply_storage_profile, create_tables, add_sample_coffees
+from migrations import migrate
+from order_loader import ORDER_SELECT, OrderLoader
+from pagination import encode_cursor
+
+
+def seed(conn, orders, items, users=1000):
+    with redirect_stdout(StringIO()):
+        create_tables(conn)
+        add_sample_coffees(conn)
+    migrate(conn)
+    seed_data.seed(conn, users=users, orders=orders, items=items)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--items', type=int, default=3, help='average line items per order')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--pages', type=int, nargs='*', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        apply_storage_profile(conn, 'throughput')
+
+        start = time.perf_counter()
+        seed(conn, args.orders, args.items)
+        print(f"Seeded {args.orders:,} orders in {time.perf_counter() - start:.1f}s")
+
+        loader = OrderLoader(conn)
+        print("="*64)
+        print(f"PAGINATION LATENCY ({args.page_size} orders per page, best of {args.repeat}, ms)")
+        print("="*64)
+        print(f"{'page':>8}{'keyset':>14}{'keyset+items':>16}{'offset':>14}")
+        for number in args.pages:
+            offset = (number - 1) * args.page_size
+            if offset >= args.orders:
+                continue
+
+            # Cursor for the row just before the page (setup, not timed)
+            cursor = None
+            if offset:
+                created_at, order_id = conn.execute(
+                    "SELECT created_at, id FROM orders ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+                    (offset - 1,)).fetchone()
+                cursor = encode_cursor(created_at, order_id)
+
+            keyset = best_of(lambda: loader.load_page(cursor=cursor, limit=args.page_size, with_items=False),
+                             args.repeat)
+            with_items = best_of(lambda: loader.load_page(cursor=cursor, limit=args.page_size), args.repeat)
+            offset_ms = best_of(lambda: conn.execute(
+                ORDER_SELECT + "\nORDER BY o.created_at DESC, o.id DESC LIMIT ? OFFSET ?",
+                (args.page_size, offset)).fetchall(), args.repeat)
+            print(f"{number:>8}{keyset:>14.3f}{with_items:>16.3f}{offset_ms:>14.3f}")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
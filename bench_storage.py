@@ -0,0 +1,117 @@
+"""Concurrent read/write throughput of coffee_shop.db under each storage profile.
+
+Readers run the /menu query while writers insert orders with their line
+items, all against a scratch database, for every profile in
+database.STORAGE_PROFILES. Usage:
+
+    python bench_storage.py [--seconds 5] [--readers 8] [--writers 2]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from database import STORAGE_PROFILES, apply_storage_profile, create_tables, add_sample_coffees
+
+MENU_QUERY = "SELECT * FROM coffees WHERE is_available=1 ORDER BY category, name"
+
+
+def prepare_database(path, profile):
+    conn = sqlite3.connect(path)
+    apply_storage_profile(conn, profile)
+    with redirect_stdout(StringIO()):
+        create_tables(conn)
+        add_sample_coffees(conn)
+    conn.execute('''
+    INSERT INTO users (first_name, last_name, email, contact_number, password)
+    VALUES ('Bench', 'User', 'bench@coffee.com', '0000000000', 'bench')
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def reader(path, profile, stop, counts):
+    conn = sqlite3.connect(path)
+    apply_storage_profile(conn, profile)
+    done = busy = 0
+    while not stop.is_set():
+        try:
+            conn.execute(MENU_QUERY).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            busy += 1
+    conn.close()
+    counts.append(('read', done, busy))
+
+
+def writer(path, profile, stop, counts):
+    conn = sqlite3.connect(path)
+    apply_storage_profile(conn, profile)
+    done = busy = 0
+    while not stop.is_set():
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO orders (user_id, total_amount, status) VALUES (1, 8.25, 'pending')")
+            order_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, coffee_id, quantity, price) VALUES (?, ?, ?, ?)",
+                [(order_id, 1, 1, 3.50), (order_id, 3, 1, 4.75)])
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            busy += 1
+    conn.close()
+    counts.append(('write', done, busy))
+
+
+def run_profile(profile, seconds, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        prepare_database(path, profile)
+
+        stop = threading.Event()
+        counts = []
+        threads = [threading.Thread(target=reader, args=(path, profile, stop, counts)) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(path, profile, stop, counts)) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    totals = {'read': [0, 0], 'write': [0, 0]}
+    for kind, done, busy in counts:
+        totals[kind][0] += done
+        totals[kind][1] += busy
+    return {
+        'reads_per_sec': totals['read'][0] / seconds,
+        'writes_per_sec': totals['write'][0] / seconds,
+        'busy_errors': totals['read'][1] + totals['write'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--profiles', nargs='*', default=list(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    print("="*70)
+    print(f"STORAGE PROFILE BENCHMARK ({args.readers} readers, {args.writers} writers, {args.seconds:g}s each)")
+    print("="*70)
+    print(f"{'profile':<12}{'reads/s':>14}{'orders/s':>14}{'busy errors':>14}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.seconds, args.readers, args.writers)
+        print(f"{profile:<12}{result['reads_per_sec']:>14.0f}{result['writes_per_sec']:>14.0f}{result['busy_errors']:>14}")
+
+
+if __name__ == '__main__':
+    main()
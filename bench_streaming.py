@@ -0,0 +1,100 @@
+"""Time to first byte and peak memory of the admin orders listing against row count.
+
+Each measurement runs in a fresh child process against a scratch database
+seeded with the given number of orders. It renders the whole table through
+the admin orders template, comparing TemplateRegistry.stream() over a lazy
+cursor with a buffered render (fetchall + render). Usage:
+
+    python bench_streaming.py [--rows 1000 10000 100000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ORDERS_QUERY = '''
+SELECT o.id, u.email, o.total_amount, o.status, o.created_at
+FROM orders o
+JOIN users u ON o.user_id = u.id
+ORDER BY o.created_at DESC
+'''
+COLUMNS = ('id', 'email', 'total_amount', 'status', 'created_at')
+
+
+def seed(conn, rows):
+    conn.execute("DELETE FROM orders")
+    conn.executemany(
+        "INSERT INTO orders (user_id, total_amount, status, created_at) VALUES (?, ?, ?, ?)",
+        ((2, 4.5 + i % 7, ('pending', 'preparing', 'ready', 'completed')[i % 4],
+          f"2024-01-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00") for i in range(rows)))
+    conn.commit()
+
+
+def child(mode, rows):
+    os.environ['COFFEE_SHOP_DB'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    import coffee_shop
+    from db_pool import get_db
+
+    with coffee_shop.db_pool.pool.connection() as conn:
+        seed(conn, rows)
+
+    tracemalloc.start()
+    with coffee_shop.app.test_request_context('/admin/orders'):
+        coffee_shop.session['user_id'] = 1
+        coffee_shop.session['is_admin'] = True
+        start = time.perf_counter()
+        if mode == 'stream':
+            orders = (dict(zip(COLUMNS, row)) for row in get_db().execute(ORDERS_QUERY))
+            response = coffee_shop.templates.stream('pages/admin/orders.html', orders=orders)
+            body = iter(response.response)
+            size = len(next(body).encode())
+            first_byte = time.perf_counter() - start
+            for chunk in body:
+                size += len(chunk.encode())
+        else:
+            orders = [dict(zip(COLUMNS, row)) for row in get_db().execute(ORDERS_QUERY).fetchall()]
+            html = coffee_shop.templates.render('pages/admin/orders.html', orders=orders)
+            size = len(html.encode())
+            first_byte = time.perf_counter() - start
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+
+    print(json.dumps({
+        'ttfb_ms': first_byte * 1000,
+        'total_ms': total * 1000,
+        'bytes': size,
+        'peak_python_kb': peak / 1024,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='*', default=[1000, 10000, 100000])
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print("="*84)
+    print("STREAMING BENCHMARK: admin orders template, whole table")
+    print("="*84)
+    print(f"{'rows':>9}{'mode':>10}{'ttfb ms':>12}{'total ms':>12}{'MB sent':>10}{'peak py KB':>14}{'max RSS KB':>14}")
+    for rows in args.rows:
+        for mode in ('buffered', 'stream'):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, str(rows)],
+                                 capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{rows:>9}{mode:>10}{result['ttfb_ms']:>12.1f}{result['total_ms']:>12.1f}"
+                  f"{result['bytes'] / 1e6:>10.1f}{result['peak_python_kb']:>14.0f}{result['max_rss_kb']:>14}")
+
+
+if __name__ == '__main__':
+    main()
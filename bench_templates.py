@@ -0,0 +1,81 @@
+"""Per-template render time: render_template_string vs the compiled registry.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB) and renders
+every registered page inside a test request context. Usage:
+
+    python bench_templates.py [--iterations 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from flask import render_template_string  # noqa: E402
+
+import coffee_shop  # noqa: E402
+
+COFFEE = (1, 'Espresso', 'Strong and concentrated coffee', 3.50, 'Hot', 1, '2024-01-01 08:00:00')
+ORDER = {
+    'id': 42, 'user_id': 7, 'total_amount': 14.0, 'status': 'pending', 'created_at': '2024-01-01 08:00:00',
+    'version': 0, 'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'user@coffee.com',
+    'contact_number': '555-0100',
+    'items': [{'coffee_id': 1, 'name': 'Espresso', 'description': 'Strong and concentrated coffee',
+               'quantity': 2, 'price': 3.50}] * 2,
+}
+
+SAMPLE_CONTEXT = {
+    'pages/menu.html': {'coffee_by_category': {'Hot': [COFFEE] * 8, 'Cold': [COFFEE] * 4}},
+    'pages/admin/dashboard.html': {
+        'stats': {'total_users': 120, 'total_coffees': 12, 'total_revenue': 5321.5, 'total_orders': 987},
+        'recent_orders': [(i, 'user@coffee.com', 8.25, 'pending', '2024-01-01 08:00:00') for i in range(5)],
+    },
+    'pages/admin/coffees.html': {'coffees': [COFFEE] * 12},
+    'pages/admin/edit_coffee.html': {'coffee': COFFEE},
+    'pages/checkout.html': {
+        'cart_items': [{'id': 1, 'name': 'Espresso', 'price': 3.50, 'quantity': 2, 'total': 7.0}] * 4,
+        'total': 28.0,
+        'idempotency_key': '0' * 32,
+    },
+    'pages/admin/order_detail.html': {
+        'order': ORDER,
+        'next_statuses': ('preparing', 'cancelled'),
+        'history': [
+            {'type': 'created', 'status': 'pending', 'previous_status': None, 'created_at': '2024-01-01 08:00:00'},
+            {'type': 'status', 'status': 'preparing', 'previous_status': 'pending',
+             'created_at': '2024-01-01 08:02:00'},
+        ],
+    },
+}
+
+
+def time_renders(render, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    app = coffee_shop.app
+    registry = coffee_shop.templates
+
+    print("="*72)
+    print(f"TEMPLATE RENDER BENCHMARK ({args.iterations} renders each, ms per render)")
+    print("="*72)
+    print(f"{'template':<32}{'string':>12}{'registry':>12}{'speedup':>12}")
+    with app.test_request_context('/'):
+        for name, source in registry.sources.items():
+            context = SAMPLE_CONTEXT.get(name, {})
+            adhoc = time_renders(lambda: render_template_string(source, **context), args.iterations)
+            compiled = time_renders(lambda: registry.render(name, **context), args.iterations)
+            print(f"{name:<32}{adhoc:>12.3f}{compiled:>12.3f}{adhoc / compiled:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+from database import transaction
+
+CART_OPERATIONS = ('add', 'update', 'remove', 'clear')
+
+# Largest batch /api/cart/batch accepts in one request
+MAX_BATCH_OPERATIONS = 100
+
+# Most of one coffee a cart line may hold, and the largest change one operation may make
+MAX_QUANTITY = 99
+# SQLite INTEGER is 64-bit; larger Python ints overflow when bound
+MAX_COFFEE_ID = 2 ** 63 - 1
+
+
+class CartStore:
+    """Server-side shopping carts in the cart_items table, keyed by user_id.
+
+    Every change is a single UPSERT or DELETE, so concurrent requests from
+    the same user cannot lose an increment. Only count() - the number of
+    lines load() shows - travels in the session cookie (for the header badge).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _add(self, user_id, coffee_id, quantity):
+        cursor = self.conn.execute('''
+        INSERT INTO cart_items (user_id, coffee_id, quantity)
+        SELECT ?, id, ? FROM coffees WHERE id = ? AND is_available = 1
+        ON CONFLICT (user_id, coffee_id) DO UPDATE SET
+            quantity = MIN(quantity + excluded.quantity, ?),
+            updated_at = CURRENT_TIMESTAMP
+        ''', (user_id, quantity, coffee_id, MAX_QUANTITY))
+        self.conn.execute("DELETE FROM cart_items WHERE user_id = ? AND coffee_id = ? AND quantity <= 0",
+                          (user_id, coffee_id))
+        return cursor.rowcount > 0
+
+    def _set(self, user_id, coffee_id, quantity):
+        if quantity <= 0:
+            return self._remove(user_id, coffee_id)
+        cursor = self.conn.execute('''
+        INSERT INTO cart_items (user_id, coffee_id, quantity)
+        SELECT ?, id, ? FROM coffees WHERE id = ? AND is_available = 1
+        ON CONFLICT (user_id, coffee_id) DO UPDATE SET
+            quantity = excluded.quantity,
+            updated_at = CURRENT_TIMESTAMP
+        ''', (user_id, quantity, coffee_id))
+        return cursor.rowcount > 0
+
+    def _remove(self, user_id, coffee_id):
+        cursor = self.conn.execute("DELETE FROM cart_items WHERE user_id = ? AND coffee_id = ?",
+                                   (user_id, coffee_id))
+        return cursor.rowcount > 0
+
+    def add(self, user_id, coffee_id, quantity=1):
+        """Add quantity (may be negative) of an available coffee; returns False if unknown"""
+        added = self._add(user_id, coffee_id, quantity)
+        self.conn.commit()
+        return added
+
+    def set_quantity(self, user_id, coffee_id, quantity):
+        """Set an item's quantity outright; zero or less removes it"""
+        updated = self._set(user_id, coffee_id, quantity)
+        self.conn.commit()
+        return updated
+
+    def remove(self, user_id, coffee_id):
+        removed = self._remove(user_id, coffee_id)
+        self.conn.commit()
+        return removed
+
+    def clear(self, user_id):
+        self.conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,))
+        self.conn.commit()
+
+    def apply(self, user_id, operations):
+        """Apply a batch of operations in one transaction.
+
+        Each operation is {'op': 'add'|'update'|'remove'|'clear',
+        'coffee_id': ..., 'quantity': ...}. The whole batch is validated
+        first and raises ValueError without touching the cart if any entry
+        is malformed. Returns the coffee ids that could not be applied
+        because the coffee is unknown or unavailable.
+        """
+        if not isinstance(operations, list) or len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"operations must be a list of at most {MAX_BATCH_OPERATIONS} entries")
+
+        parsed = []
+        for operation in operations:
+            if not isinstance(operation, dict) or operation.get('op') not in CART_OPERATIONS:
+                raise ValueError(f"Invalid cart operation: {operation!r}")
+            op = operation['op']
+            if op == 'clear':
+                parsed.append((op, None, None))
+                continue
+            try:
+                coffee_id = int(operation.get('coffee_id'))
+                quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid cart operation: {operation!r}") from None
+            if not 0 < coffee_id <= MAX_COFFEE_ID:
+                raise ValueError(f"Invalid cart operation: {operation!r}")
+            if abs(quantity) > MAX_QUANTITY:
+                raise ValueError(f"quantity must be between -{MAX_QUANTITY} and {MAX_QUANTITY}")
+            parsed.append((op, coffee_id, quantity))
+
+        rejected = []
+        with transaction(self.conn):
+            for op, coffee_id, quantity in parsed:
+                if op == 'clear':
+                    self.conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,))
+                elif op == 'remove':
+                    self._remove(user_id, coffee_id)
+                elif op == 'add' and not self._add(user_id, coffee_id, quantity):
+                    rejected.append(coffee_id)
+                elif op == 'update' and not self._set(user_id, coffee_id, quantity) and quantity > 0:
+                    rejected.append(coffee_id)
+        return rejected
+
+    def count(self, user_id):
+        """Number of cart lines load() returns: distinct coffees still available"""
+        return self.conn.execute('''
+        SELECT COUNT(*)
+        FROM cart_items ci
+        JOIN coffees c ON c.id = ci.coffee_id
+        WHERE ci.user_id = ? AND c.is_available = 1
+        ''', (user_id,)).fetchone()[0]
+
+    def quantities(self, user_id):
+        """{coffee_id: quantity} for every item in the cart"""
+        return dict(self.conn.execute(
+            "SELECT coffee_id, quantity FROM cart_items WHERE user_id = ?", (user_id,)).fetchall())
+
+    def load(self, user_id):
+        """Cart lines with current prices in one join; returns (items, total)"""
+        rows = self.conn.execute('''
+        SELECT c.id, c.name, c.price, ci.quantity
+        FROM cart_items ci
+        JOIN coffees c ON c.id = ci.coffee_id
+        WHERE ci.user_id = ? AND c.is_available = 1
+        ORDER BY ci.coffee_id
+        ''', (user_id,)).fetchall()
+
+        items = [{
+            'id': coffee_id,
+            'name': name,
+            'price': price,
+            'quantity': quantity,
+            'total': price * quantity,
+        } for coffee_id, name, price, quantity in rows]
+        return items, sum(item['total'] for item in items)
+
+    def merge(self, user_id, quantities):
+        """Fold a legacy {coffee_id: quantity} session cart into the store"""
+        self.conn.executemany('''
+        INSERT INTO cart_items (user_id, coffee_id, quantity)
+        SELECT ?, id, ? FROM coffees WHERE id = ? AND is_available = 1
+        ON CONFLICT (user_id, coffee_id) DO UPDATE SET
+            quantity = MIN(quantity + excluded.quantity, ?),
+            updated_at = CURRENT_TIMESTAMP
+        ''', [(user_id, min(int(quantity), MAX_QUANTITY), int(coffee_id), MAX_QUANTITY)
+              for coffee_id, quantity in quantities.items()
+              if int(quantity) > 0 and 0 < int(coffee_id) <= MAX_COFFEE_ID])
+        self.conn.commit()
@@ -1,9 +1,35 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Response, request, redirect, url_for, session, flash, jsonify, stream_with_context
 import sqlite3
 import os
+import hashlib
+import hmac
+import uuid
+from datetime import datetime, timezone
+
+import db_pool
+import migrations
+import request_metrics
+from credentials import hash_password, verifier
+from dashboard_stats import daily, read_dashboard
+from db_pool import get_db
+from job_queue import job_queue, retry_failed
+from menu_cache import menu_cache
+from order_history import history_version
+from order_events import EVENTS_PAGE_SIZE, events_since, history
+from order_feed import LONG_POLL_SECONDS, order_feed
+from order_loader import OrderLoader
+from order_status import bulk_update_status, next_statuses, update_status
+from pagination import clamp_page_size, fetch_page
+from query_profiler import profiler
+from cart_store import CartStore
+from user_operations import UserOperations
+from assets import AssetPipeline, extract_tag_body
+from template_registry import TemplateRegistry
 
 app = Flask(__name__)
 app.secret_key = 'coffee-shop-secret-key-2024'
+db_pool.init_app(app)
+request_metrics.init_app(app)
 
 # ============ SHARED TEMPLATES ============
 HEADER = '''
@@ -41,7 +67,7 @@ HEADER = '''
                         {% else %}
                             <a href="/cart" class="nav-link">
                                 <i class="fas fa-shopping-cart"></i> Cart
-                                <span class="cart-badge">{{ session.cart|length if session.cart else 0 }}</span>
+                                <span class="cart-badge">{{ session.get('cart_count', 0) }}</span>
                             </a>
                             <a href="/orders" class="nav-link">
                                 <i class="fas fa-history"></i> Orders
@@ -896,6 +922,181 @@ MAIN_SCRIPT = '''
             });
         }
         
+        // Cart updates are queued per coffee and sent as one batch once the
+        // clicks stop for CART_FLUSH_DELAY ms, so a burst of +/- clicks costs
+        // a single round trip. Batches are sent one at a time, in order.
+        const CART_FLUSH_DELAY = 250;
+        window.cartQueue = {
+            pending: new Map(),
+            waiters: [],
+            timer: null,
+            inflight: Promise.resolve(),
+            
+            enqueue(coffeeId, change) {
+                const current = this.pending.get(coffeeId);
+                if (change.op === 'add' && current && current.op === 'add') {
+                    current.quantity += change.quantity;
+                } else if (change.op === 'add' && current && current.op === 'update') {
+                    current.quantity = Math.max(0, current.quantity + change.quantity);
+                } else if (change.op === 'add' && current && current.op === 'remove') {
+                    this.pending.set(coffeeId, { op: 'update', quantity: Math.max(0, change.quantity) });
+                } else {
+                    this.pending.set(coffeeId, change);
+                }
+                clearTimeout(this.timer);
+                this.timer = setTimeout(() => this.flush(), CART_FLUSH_DELAY);
+                return new Promise((resolve, reject) => this.waiters.push({ resolve, reject }));
+            },
+            
+            add(coffeeId, quantity) {
+                return this.enqueue(String(coffeeId), { op: 'add', quantity: quantity });
+            },
+            
+            update(coffeeId, quantity) {
+                return this.enqueue(String(coffeeId), { op: 'update', quantity: quantity });
+            },
+            
+            remove(coffeeId) {
+                return this.enqueue(String(coffeeId), { op: 'remove' });
+            },
+            
+            flush() {
+                const operations = [];
+                this.pending.forEach((change, coffeeId) => {
+                    if (change.op !== 'add' || change.quantity !== 0) {
+                        operations.push(Object.assign({ coffee_id: coffeeId }, change));
+                    }
+                });
+                const waiters = this.waiters;
+                this.pending = new Map();
+                this.waiters = [];
+                
+                this.inflight = this.inflight.then(() => fetch('/api/cart/batch', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({ operations: operations })
+                }))
+                .then(response => response.json())
+                .then(data => {
+                    renderCart(data);
+                    waiters.forEach(waiter => waiter.resolve(data));
+                })
+                .catch(error => {
+                    waiters.forEach(waiter => waiter.reject(error));
+                });
+            }
+        };
+        
+        // Bring the badge and the cart table in line with the server's cart
+        function renderCart(data) {
+            if (typeof data.cart_count !== 'number') {
+                return;
+            }
+            document.querySelectorAll('.cart-badge').forEach(badge => {
+                badge.textContent = data.cart_count;
+            });
+            
+            const table = document.querySelector('[data-cart-table]');
+            if (!table) {
+                return;
+            }
+            if (data.items.length === 0) {
+                location.reload();
+                return;
+            }
+            const lines = new Map(data.items.map(item => [String(item.id), item]));
+            table.querySelectorAll('[data-cart-item]').forEach(row => {
+                const item = lines.get(row.dataset.cartItem);
+                if (!item) {
+                    row.remove();
+                    return;
+                }
+                row.querySelector('[data-cart-quantity]').textContent = item.quantity;
+                row.querySelector('[data-cart-line-total]').textContent = '$' + item.total.toFixed(2);
+            });
+            const total = document.querySelector('#cart-total');
+            if (total) {
+                total.textContent = '$' + data.total.toFixed(2);
+            }
+        }
+        
+        window.changeQuantity = function(coffeeId, delta) {
+            const quantity = document.querySelector(`[data-cart-item="${coffeeId}"] [data-cart-quantity]`);
+            if (quantity) {
+                // Show the new quantity straight away; the batch reply confirms it
+                const next = Math.max(0, parseInt(quantity.textContent, 10) + delta);
+                quantity.textContent = next;
+                cartQueue.update(coffeeId, next);
+            } else {
+                cartQueue.add(coffeeId, delta);
+            }
+        };
+        
+        // One idempotency key per checkout attempt: double clicks and network
+        // retries reuse it, so the server places the order only once.
+        let checkoutKey = null;
+        window.checkout = function() {
+            const button = document.querySelector('[onclick="checkout()"]');
+            if (button) {
+                button.disabled = true;
+            }
+            checkoutKey = checkoutKey || (window.crypto && crypto.randomUUID ? crypto.randomUUID()
+                                          : Date.now().toString(36) + Math.random().toString(36).slice(2));
+            
+            // Send any queued quantity changes first
+            clearTimeout(cartQueue.timer);
+            if (cartQueue.pending.size) {
+                cartQueue.flush();
+            }
+            cartQueue.inflight
+                .then(() => fetch('/checkout', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': checkoutKey
+                    },
+                    body: JSON.stringify({})
+                }))
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        checkoutKey = null;
+                        if (data.rejected && data.rejected.length) {
+                            // Let the customer read what was left out before leaving the cart
+                            showFlashMessage(data.message, 'error');
+                            setTimeout(() => { location.href = '/orders'; }, 2500);
+                        } else {
+                            location.href = '/orders';
+                        }
+                    } else {
+                        showFlashMessage(data.message || 'Checkout failed', 'error');
+                        if (button) {
+                            button.disabled = false;
+                        }
+                    }
+                })
+                .catch(() => {
+                    // Keep the key: retrying must not place a second order
+                    showFlashMessage('Network error. Please try again.', 'error');
+                    if (button) {
+                        button.disabled = false;
+                    }
+                });
+        };
+        
+        window.removeFromCart = function(coffeeId) {
+            const row = document.querySelector(`[data-cart-item="${coffeeId}"]`);
+            if (row) {
+                row.style.opacity = '0.5';
+            }
+            cartQueue.remove(coffeeId)
+                .then(data => showFlashMessage(data.success ? 'Item removed from cart' : data.message,
+                                               data.success ? 'success' : 'error'))
+                .catch(() => showFlashMessage('Network error. Please try again.', 'error'));
+        };
+        
         // Add to Cart functionality
         document.querySelectorAll('.btn-add-cart').forEach(button => {
             button.addEventListener('click', function() {
@@ -907,18 +1108,8 @@ MAIN_SCRIPT = '''
                 this.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Adding...';
                 this.disabled = true;
                 
-                // Add to cart via AJAX
-                fetch('/api/cart/add', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        coffee_id: coffeeId,
-                        name: coffeeName
-                    })
-                })
-                .then(response => response.json())
+                // Rapid clicks are coalesced into one batched request
+                cartQueue.add(coffeeId, 1)
                 .then(data => {
                     if (data.success) {
                         // Update cart badge
@@ -963,6 +1154,71 @@ MAIN_SCRIPT = '''
             });
         });
         
+        // Live order queue: new orders and status changes are pushed over
+        // server-sent events, so staff screens never need a reload
+        const orderQueue = document.querySelector('[data-order-queue]');
+        if (orderQueue && window.EventSource) {
+            const STATUS_COLORS = {
+                pending: '#FFC107', preparing: '#2196F3', ready: '#4CAF50', completed: '#666', cancelled: '#f44336'
+            };
+            const titleCase = text => text.charAt(0).toUpperCase() + text.slice(1);
+            
+            const setStatus = (row, order) => {
+                if (Number(row.dataset.orderVersion) >= order.version) {
+                    return;
+                }
+                row.dataset.orderVersion = order.version;
+                const badge = row.querySelector('[data-order-status]');
+                badge.textContent = titleCase(order.status);
+                badge.style.background = STATUS_COLORS[order.status] || '#666';
+            };
+            
+            const addRow = order => {
+                const row = document.createElement('tr');
+                row.dataset.orderRow = order.id;
+                row.dataset.orderVersion = order.version;
+                const cells = [`#${order.id}`, order.email, `$${order.total_amount.toFixed(2)}`, '', order.created_at];
+                cells.forEach(text => {
+                    const cell = document.createElement('td');
+                    cell.textContent = text;
+                    row.appendChild(cell);
+                });
+                const badge = document.createElement('span');
+                badge.dataset.orderStatus = '';
+                badge.style.cssText = 'padding: 5px 12px; color: white; border-radius: 20px; font-size: 12px;';
+                badge.textContent = titleCase(order.status);
+                badge.style.background = STATUS_COLORS[order.status] || '#666';
+                row.children[3].appendChild(badge);
+                const actions = document.createElement('td');
+                actions.innerHTML = `<a href="/admin/edit-order/${Number(order.id)}" class="btn-action btn-edit">
+                    <i class="fas fa-edit"></i> Update</a>`;
+                row.appendChild(actions);
+                orderQueue.prepend(row);
+            };
+            
+            const source = new EventSource(`/admin/orders/stream?since=${orderQueue.dataset.feedSeq}`);
+            source.addEventListener('created', event => {
+                if (!orderQueue.hasAttribute('data-prepend-new')) {
+                    return;
+                }
+                JSON.parse(event.data).forEach(order => {
+                    if (!orderQueue.querySelector(`[data-order-row="${order.id}"]`)) {
+                        addRow(order);
+                    }
+                });
+            });
+            source.addEventListener('status', event => {
+                JSON.parse(event.data).forEach(order => {
+                    const row = orderQueue.querySelector(`[data-order-row="${order.id}"]`);
+                    if (row) {
+                        setStatus(row, order);
+                    }
+                });
+            });
+            // Missed more events than the server keeps: start over from the page
+            source.addEventListener('reset', () => location.reload());
+        }
+        
         // Flash message system
         window.showFlashMessage = function(message, type = 'success') {
             const container = document.querySelector('.flash-container');
@@ -1034,9 +1290,23 @@ MAIN_SCRIPT = '''
 </script>
 '''
 
+# ============ STATIC ASSETS ============
+# The shared CSS and JS are published as fingerprinted, cacheable files and
+# every page links to them instead of inlining them.
+assets = AssetPipeline(app)
+MAIN_CSS_URL = assets.add('main.css', extract_tag_body(MAIN_STYLES, 'style'))
+MAIN_JS_URL = assets.add('main.js', extract_tag_body(MAIN_SCRIPT, 'script'))
+
+STYLES_TAG = f'''
+<link rel="stylesheet" href="{MAIN_CSS_URL}">
+'''
+
+SCRIPT_TAGS = MAIN_SCRIPT[:MAIN_SCRIPT.index('<script>')] + f'''<script src="{MAIN_JS_URL}"></script>
+'''
+
 # ============ PAGE TEMPLATES ============
 
-HOME_TEMPLATE = HEADER + MAIN_STYLES + '''
+HOME_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section">
     <div class="container">
         <h1 class="hero-title">Welcome to Coffee Shop</h1>
@@ -1094,9 +1364,9 @@ HOME_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-ABOUT_TEMPLATE = HEADER + MAIN_STYLES + '''
+ABOUT_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1447933601403-0c6688de566e?ixlib=rb-1.2.1&auto=format&fit=crop&w=1350&q=80');">
     <div class="container">
         <h1 class="hero-title">Our Story</h1>
@@ -1160,9 +1430,9 @@ ABOUT_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-MENU_TEMPLATE = HEADER + MAIN_STYLES + '''
+MENU_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1498804103079-a6351b050096?ixlib=rb-1.2.1&auto=format&fit=crop&w=1350&q=80');">
     <div class="container">
         <h1 class="hero-title">Our Coffee Menu</h1>
@@ -1250,9 +1520,9 @@ MENU_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-LOGIN_TEMPLATE = HEADER + MAIN_STYLES + '''
+LOGIN_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1558618666-fcd25c85cd64?ixlib=rb-1.2.1&auto=format&fit=crop&w=1350&q=80');">
     <div class="container">
         <h1 class="hero-title">Welcome Back</h1>
@@ -1297,9 +1567,9 @@ LOGIN_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-REGISTER_TEMPLATE = HEADER + MAIN_STYLES + '''
+REGISTER_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1554118811-1e0d58224f24?ixlib=rb-1.2.1&auto=format&fit=crop&w=1350&q=80');">
     <div class="container">
         <h1 class="hero-title">Join Our Community</h1>
@@ -1354,9 +1624,9 @@ REGISTER_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-CONTACT_TEMPLATE = HEADER + MAIN_STYLES + '''
+CONTACT_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1517248135467-4c7edcad34c4?ixlib=rb-1.2.1&auto=format&fit=crop&w=1350&q=80');">
     <div class="container">
         <h1 class="hero-title">Contact Us</h1>
@@ -1453,10 +1723,10 @@ CONTACT_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
 # ============ ADMIN TEMPLATES ============
-ADMIN_DASHBOARD_TEMPLATE = HEADER + MAIN_STYLES + '''
+ADMIN_DASHBOARD_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
     <div class="container">
         <h1 class="hero-title"><i class="fas fa-crown"></i> Admin Dashboard</h1>
@@ -1582,9 +1852,9 @@ ADMIN_DASHBOARD_TEMPLATE = HEADER + MAIN_STYLES + '''
         {% endif %}
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-ADMIN_COFFEES_TEMPLATE = HEADER + MAIN_STYLES + '''
+ADMIN_COFFEES_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
     <div class="container">
         <h1 class="hero-title"><i class="fas fa-coffee"></i> Manage Coffees</h1>
@@ -1640,6 +1910,7 @@ ADMIN_COFFEES_TEMPLATE = HEADER + MAIN_STYLES + '''
             </div>
             {% endfor %}
         </div>
+        {% include 'pages/pager.html' %}
         {% else %}
         <div class="auth-card" style="text-align: center; padding: 60px 20px;">
             <i class="fas fa-coffee" style="font-size: 64px; color: var(--coffee-light); margin-bottom: 20px;"></i>
@@ -1652,9 +1923,9 @@ ADMIN_COFFEES_TEMPLATE = HEADER + MAIN_STYLES + '''
         {% endif %}
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-ADD_COFFEE_TEMPLATE = HEADER + MAIN_STYLES + '''
+ADD_COFFEE_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
     <div class="container">
         <h1 class="hero-title"><i class="fas fa-plus-circle"></i> Add New Coffee</h1>
@@ -1714,9 +1985,9 @@ ADD_COFFEE_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
+''' + FOOTER + SCRIPT_TAGS
 
-EDIT_COFFEE_TEMPLATE = HEADER + MAIN_STYLES + '''
+EDIT_COFFEE_TEMPLATE = HEADER + STYLES_TAG + '''
 <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
     <div class="container">
         <h1 class="hero-title"><i class="fas fa-edit"></i> Edit Coffee</h1>
@@ -1775,157 +2046,700 @@ EDIT_COFFEE_TEMPLATE = HEADER + MAIN_STYLES + '''
         </div>
     </div>
 </div>
-''' + FOOTER + MAIN_SCRIPT
-
-# ============ DATABASE INITIALIZATION ============
-def init_db():
-    conn = sqlite3.connect('coffee_shop.db')
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        first_name TEXT,
-        last_name TEXT,
-        email TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        contact_number TEXT,
-        is_admin BOOLEAN DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS coffees (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        description TEXT,
-        price REAL NOT NULL,
-        category TEXT,
-        is_available BOOLEAN DEFAULT 1,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        total_amount REAL,
-        status TEXT DEFAULT 'pending',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS order_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_id INTEGER,
-        coffee_id INTEGER,
-        quantity INTEGER,
-        price REAL,
-        FOREIGN KEY (order_id) REFERENCES orders(id),
-        FOREIGN KEY (coffee_id) REFERENCES coffees(id)
-    )
-    ''')
-    
-    # Add admin if not exists
-    cursor.execute("SELECT * FROM users WHERE email='admin@coffee.com'")
-    if not cursor.fetchone():
-        cursor.execute('''
-        INSERT INTO users (first_name, last_name, email, password, contact_number, is_admin)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', ('Admin', 'User', 'admin@coffee.com', 'admin123', '1234567890', 1))
-    
-    # Add test user if not exists
-    cursor.execute("SELECT * FROM users WHERE email='user@coffee.com'")
-    if not cursor.fetchone():
-        cursor.execute('''
-        INSERT INTO users (first_name, last_name, email, password, contact_number, is_admin)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', ('John', 'Doe', 'user@coffee.com', 'user123', '0987654321', 0))
-    
-    # Add sample coffees if none exist
-    cursor.execute("SELECT COUNT(*) FROM coffees")
-    if cursor.fetchone()[0] == 0:
-        coffees = [
-            ('Espresso', 'Strong and concentrated coffee', 3.50, 'Hot', 1),
-            ('Cappuccino', 'Espresso with steamed milk foam', 4.50, 'Hot', 1),
-            ('Latte', 'Espresso with steamed milk', 4.75, 'Hot', 1),
-            ('Americano', 'Espresso with hot water', 3.75, 'Hot', 1),
-            ('Mocha', 'Chocolate-flavored latte', 5.00, 'Hot', 1),
-            ('Macchiato', 'Espresso with a dash of milk', 4.25, 'Hot', 1),
-            ('Iced Coffee', 'Chilled coffee with ice', 4.00, 'Cold', 1),
-            ('Cold Brew', 'Slow-steeped cold coffee', 4.50, 'Cold', 1),
-            ('Flat White', 'Smooth espresso with microfoam', 4.75, 'Hot', 1),
-            ('Turkish Coffee', 'Traditional finely ground coffee', 4.25, 'Hot', 1)
-        ]
-        cursor.executemany('''
-        INSERT INTO coffees (name, description, price, category, is_available)
-        VALUES (?, ?, ?, ?, ?)
-        ''', coffees)
-    
-    conn.commit()
-    conn.close()
-
-# Initialize database
-init_db()
+''' + FOOTER + SCRIPT_TAGS
 
-# ============ ROUTES ============
+CART_TEMPLATE = HEADER + STYLES_TAG + '''
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-shopping-cart"></i> Shopping Cart</h1>
+        <p class="hero-subtitle">Review your order</p>
+    </div>
+</div>
 
-# Public Pages
-@app.route('/')
-def home():
-    return render_template_string(HOME_TEMPLATE)
+<div class="container">
+    <div class="page-content">
+        {% if cart_items %}
+        <div class="auth-card">
+            <table class="admin-table" data-cart-table>
+                <thead>
+                    <tr>
+                        <th>Coffee</th>
+                        <th>Price</th>
+                        <th>Quantity</th>
+                        <th>Total</th>
+                        <th>Action</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {% for item in cart_items %}
+                    <tr data-cart-item="{{ item.id }}">
+                        <td><strong>{{ item.name }}</strong></td>
+                        <td>${{ "%.2f"|format(item.price) }}</td>
+                        <td>
+                            <button class="btn-action" onclick="changeQuantity({{ item.id }}, -1)" aria-label="One less">
+                                <i class="fas fa-minus"></i>
+                            </button>
+                            <span data-cart-quantity>{{ item.quantity }}</span>
+                            <button class="btn-action" onclick="changeQuantity({{ item.id }}, 1)" aria-label="One more">
+                                <i class="fas fa-plus"></i>
+                            </button>
+                        </td>
+                        <td data-cart-line-total>${{ "%.2f"|format(item.total) }}</td>
+                        <td>
+                            <button class="btn-action btn-delete" onclick="removeFromCart({{ item.id }})">
+                                <i class="fas fa-trash"></i> Remove
+                            </button>
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            
+            <div style="margin-top: 30px; text-align: right;">
+                <h3 style="color: var(--coffee-dark);">Total: <span id="cart-total">${{ "%.2f"|format(total) }}</span></h3>
+                <div style="display: flex; gap: 15px; justify-content: flex-end; margin-top: 20px;">
+                    <a href="/menu" class="btn" style="background: var(--text-light);">
+                        <i class="fas fa-arrow-left"></i> Continue Shopping
+                    </a>
+                    <button class="btn btn-primary" onclick="checkout()">
+                        <i class="fas fa-check"></i> Checkout
+                    </button>
+                </div>
+            </div>
+        </div>
+        {% else %}
+        <div class="auth-card" style="text-align: center; padding: 60px 20px;">
+            <i class="fas fa-shopping-cart" style="font-size: 64px; color: var(--coffee-light); margin-bottom: 20px;"></i>
+            <h3 style="color: var(--text-light); margin-bottom: 20px;">Your cart is empty</h3>
+            <p>Add some delicious coffee to your cart!</p>
+            <a href="/menu" class="btn btn-primary" style="margin-top: 20px;">
+                <i class="fas fa-coffee"></i> Browse Menu
+            </a>
+        </div>
+        {% endif %}
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
 
-@app.route('/about')
-def about():
-    return render_template_string(ABOUT_TEMPLATE)
+CHECKOUT_TEMPLATE = HEADER + STYLES_TAG + '''
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-check"></i> Checkout</h1>
+        <p class="hero-subtitle">Confirm your order</p>
+    </div>
+</div>
 
-@app.route('/menu')
-def menu():
-    conn = sqlite3.connect('coffee_shop.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM coffees WHERE is_available=1 ORDER BY category, name")
-    coffees = cursor.fetchall()
-    conn.close()
-    
-    coffee_by_category = {}
-    for coffee in coffees:
-        category = coffee[4]
-        if category not in coffee_by_category:
-            coffee_by_category[category] = []
-        coffee_by_category[category].append(coffee)
-    
-    return render_template_string(MENU_TEMPLATE, coffee_by_category=coffee_by_category)
+<div class="container">
+    <div class="page-content">
+        <div class="auth-card">
+            <table class="admin-table">
+                <thead>
+                    <tr>
+                        <th>Coffee</th>
+                        <th>Quantity</th>
+                        <th>Total</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {% for item in cart_items %}
+                    <tr>
+                        <td><strong>{{ item.name }}</strong></td>
+                        <td>{{ item.quantity }}</td>
+                        <td>${{ "%.2f"|format(item.total) }}</td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            
+            <form method="POST" action="/checkout" style="margin-top: 30px; text-align: right;">
+                <input type="hidden" name="idempotency_key" value="{{ idempotency_key }}">
+                <h3 style="color: var(--coffee-dark);">Total: ${{ "%.2f"|format(total) }}</h3>
+                <div style="display: flex; gap: 15px; justify-content: flex-end; margin-top: 20px;">
+                    <a href="/cart" class="btn" style="background: var(--text-light);">
+                        <i class="fas fa-arrow-left"></i> Back to Cart
+                    </a>
+                    <button type="submit" class="btn btn-primary" onclick="this.disabled = true; this.form.submit();">
+                        <i class="fas fa-check"></i> Place Order
+                    </button>
+                </div>
+            </form>
+        </div>
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
 
-@app.route('/contact', methods=['GET', 'POST'])
-def contact():
-    if request.method == 'POST':
-        flash('Thank you for your message! We will get back to you soon.', 'success')
-        return redirect('/contact')
-    return render_template_string(CONTACT_TEMPLATE)
+ORDERS_TEMPLATE = HEADER + STYLES_TAG + '''
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-history"></i> My Orders</h1>
+        <p class="hero-subtitle">Track your coffee orders</p>
+    </div>
+</div>
 
-# Authentication
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
+{% set status_colors = {'pending': '#FFC107', 'preparing': '#2196F3', 'ready': '#4CAF50', 'completed': '#666', 'cancelled': '#f44336'} %}
+<div class="container">
+    <div class="page-content">
+        {% for order in orders %}
+        <div class="auth-card" style="margin-bottom: 25px;">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
+                <h3 style="color: var(--coffee-dark);">Order #{{ order.id }}</h3>
+                <span style="padding: 5px 12px; background: {{ status_colors.get(order.status, '#666') }};
+                      color: white; border-radius: 20px; font-size: 12px;">
+                    {{ order.status|title }}
+                </span>
+            </div>
+            <p style="color: var(--text-light); margin-bottom: 15px;">{{ order.created_at }}</p>
+            <table class="admin-table">
+                <tbody>
+                    {% for item in order['items'] %}
+                    <tr>
+                        <td>{{ item.name }}</td>
+                        <td>x{{ item.quantity }}</td>
+                        <td>${{ "%.2f"|format(item.price * item.quantity) }}</td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            <p style="text-align: right; margin-top: 15px; font-weight: bold; color: var(--coffee-dark);">
+                Total: ${{ "%.2f"|format(order.total_amount) }}
+            </p>
+        </div>
+        {% else %}
+        <div class="auth-card">
+            <p style="text-align: center; color: var(--text-light); padding: 40px;">
+                You haven't placed any orders yet. Start ordering from our menu!
+            </p>
+            <div style="text-align: center;">
+                <a href="/menu" class="btn btn-primary">
+                    <i class="fas fa-coffee"></i> Browse Menu
+                </a>
+            </div>
+        </div>
+        {% endfor %}
+        {% include 'pages/pager.html' %}
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
+
+PROFILE_TEMPLATE = HEADER + STYLES_TAG + '''
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-user"></i> My Profile</h1>
+        <p class="hero-subtitle">Manage your account details</p>
+    </div>
+</div>
+
+<div class="container">
+    <div class="page-content">
+        <div class="auth-card">
+            <div style="text-align: center; margin-bottom: 30px;">
+                <div style="width: 100px; height: 100px; background: var(--coffee-light); 
+                          border-radius: 50%; display: flex; align-items: center; 
+                          justify-content: center; margin: 0 auto 20px; font-size: 40px; color: var(--coffee-dark);">
+                    <i class="fas fa-user-circle"></i>
+                </div>
+                <h3 style="color: var(--coffee-dark);">{{ session.first_name }} {{ session.last_name }}</h3>
+                <p style="color: var(--text-light);">{{ session.email }}</p>
+            </div>
+            
+            <div style="background: var(--coffee-cream); padding: 25px; border-radius: 15px; margin-bottom: 30px;">
+                <h4 style="color: var(--coffee-dark); margin-bottom: 15px;">Account Information</h4>
+                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px;">
+                    <div>
+                        <label style="font-weight: 500; color: var(--text-light);">First Name</label>
+                        <p style="color: var(--coffee-dark);">{{ session.first_name }}</p>
+                    </div>
+                    <div>
+                        <label style="font-weight: 500; color: var(--text-light);">Last Name</label>
+                        <p style="color: var(--coffee-dark);">{{ session.last_name }}</p>
+                    </div>
+                </div>
+            </div>
+            
+            <div style="display: flex; gap: 15px; justify-content: center;">
+                <a href="/menu" class="btn btn-primary">
+                    <i class="fas fa-coffee"></i> Order Coffee
+                </a>
+                <a href="/orders" class="btn" style="background: var(--text-light);">
+                    <i class="fas fa-history"></i> View Orders
+                </a>
+            </div>
+        </div>
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
+
+ADMIN_USERS_TEMPLATE = HEADER + STYLES_TAG + '''
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-users"></i> Manage Users</h1>
+        <p class="hero-subtitle">View and manage user accounts</p>
+    </div>
+</div>
+
+<div class="container">
+    <div class="admin-container">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 30px; flex-wrap: wrap; gap: 15px;">
+            <a href="/admin" class="btn" style="background: var(--text-light);">
+                <i class="fas fa-arrow-left"></i> Back to Dashboard
+            </a>
+            <a href="/admin/add-user" class="btn btn-primary">
+                <i class="fas fa-user-plus"></i> Add New User
+            </a>
+        </div>
+        
+        <div class="auth-card">
+            <table class="admin-table">
+                <thead>
+                    <tr>
+                        <th>ID</th>
+                        <th>Name</th>
+                        <th>Email</th>
+                        <th>Contact</th>
+                        <th>Role</th>
+                        <th>Joined</th>
+                        <th>Actions</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {% for user in users %}
+                    <tr>
+                        <td>{{ user[0] }}</td>
+                        <td>{{ user[1] }} {{ user[2] }}</td>
+                        <td>{{ user[3] }}</td>
+                        <td>{{ user[4] }}</td>
+                        <td>
+                            <span style="padding: 5px 12px; background: {% if user[5] %}#C9A769{% else %}#6F4E37{% endif %}; 
+                                  color: white; border-radius: 20px; font-size: 12px;">
+                                {% if user[5] %}Admin{% else %}User{% endif %}
+                            </span>
+                        </td>
+                        <td>{{ user[6] }}</td>
+                        <td>
+                            <a href="/admin/edit-user/{{ user[0] }}" class="btn-action btn-edit">
+                                <i class="fas fa-edit"></i>
+                            </a>
+                            <a href="/admin/delete-user/{{ user[0] }}" 
+                               class="btn-action btn-delete"
+                               onclick="return confirm('Delete this user?')">
+                                <i class="fas fa-trash"></i>
+                            </a>
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            {% include 'pages/pager.html' %}
+        </div>
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
+
+ADMIN_ORDERS_TEMPLATE = HEADER + STYLES_TAG + '''
+{% set status_colors = {'pending': '#FFC107', 'preparing': '#2196F3', 'ready': '#4CAF50', 'completed': '#666', 'cancelled': '#f44336'} %}
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-clipboard-list"></i> Manage Orders</h1>
+        <p class="hero-subtitle">View and update order status</p>
+    </div>
+</div>
+
+<div class="container">
+    <div class="admin-container">
+        <div style="margin-bottom: 30px;">
+            <a href="/admin" class="btn" style="background: var(--text-light);">
+                <i class="fas fa-arrow-left"></i> Back to Dashboard
+            </a>
+        </div>
+        
+        <div style="display: flex; gap: 15px; margin-bottom: 30px;">
+            <form method="POST" action="/admin/orders/bulk-status">
+                <input type="hidden" name="from_status" value="pending">
+                <input type="hidden" name="status" value="preparing">
+                <button type="submit" class="btn btn-primary">
+                    <i class="fas fa-mug-hot"></i> Start All Pending
+                </button>
+            </form>
+            <form method="POST" action="/admin/orders/bulk-status">
+                <input type="hidden" name="from_status" value="ready">
+                <input type="hidden" name="status" value="completed">
+                <button type="submit" class="btn btn-primary">
+                    <i class="fas fa-check-double"></i> Complete All Ready
+                </button>
+            </form>
+        </div>
+        
+        <div class="auth-card">
+            <table class="admin-table">
+                <thead>
+                    <tr>
+                        <th>Order ID</th>
+                        <th>Customer</th>
+                        <th>Amount</th>
+                        <th>Status</th>
+                        <th>Date</th>
+                        <th>Actions</th>
+                    </tr>
+                </thead>
+                <tbody data-order-queue data-feed-seq="{{ feed_seq }}" {% if not request.args.get('cursor') %}data-prepend-new{% endif %}>
+                    {% for order in orders %}
+                    <tr data-order-row="{{ order.id }}" data-order-version="{{ order.version }}">
+                        <td>#{{ order.id }}</td>
+                        <td>{{ order.email }}</td>
+                        <td>${{ "%.2f"|format(order.total_amount) }}</td>
+                        <td>
+                            <span data-order-status style="padding: 5px 12px; background: {{ status_colors.get(order.status, '#666') }}; 
+                                  color: white; border-radius: 20px; font-size: 12px;">
+                                {{ order.status|title }}
+                            </span>
+                        </td>
+                        <td>{{ order.created_at }}</td>
+                        <td>
+                            <a href="/admin/edit-order/{{ order.id }}" class="btn-action btn-edit">
+                                <i class="fas fa-edit"></i> Update
+                            </a>
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            {% include 'pages/pager.html' %}
+        </div>
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
+
+ADMIN_ORDER_DETAIL_TEMPLATE = HEADER + STYLES_TAG + '''
+{% set status_colors = {'pending': '#FFC107', 'preparing': '#2196F3', 'ready': '#4CAF50', 'completed': '#666', 'cancelled': '#f44336'} %}
+<div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
+    <div class="container">
+        <h1 class="hero-title"><i class="fas fa-receipt"></i> Order #{{ order.id }}</h1>
+        <p class="hero-subtitle">{{ order.first_name }} {{ order.last_name }} &middot; {{ order.created_at }}</p>
+    </div>
+</div>
+
+<div class="container">
+    <div class="admin-container">
+        <div style="margin-bottom: 30px;">
+            <a href="/admin/orders" class="btn" style="background: var(--text-light);">
+                <i class="fas fa-arrow-left"></i> Back to Orders
+            </a>
+        </div>
+        
+        <div class="auth-card" style="margin-bottom: 30px;">
+            <p><strong>Customer:</strong> {{ order.first_name }} {{ order.last_name }} ({{ order.email }})</p>
+            <p><strong>Contact:</strong> {{ order.contact_number }}</p>
+            <p><strong>Status:</strong>
+                <span style="padding: 5px 12px; background: {{ status_colors.get(order.status, '#666') }};
+                      color: white; border-radius: 20px; font-size: 12px;">
+                    {{ order.status|title }}
+                </span>
+            </p>
+            <table class="admin-table" style="margin-top: 20px;">
+                <thead>
+                    <tr>
+                        <th>Coffee</th>
+                        <th>Quantity</th>
+                        <th>Price</th>
+                        <th>Subtotal</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {% for item in order['items'] %}
+                    <tr>
+                        <td>{{ item.name }}</td>
+                        <td>{{ item.quantity }}</td>
+                        <td>${{ "%.2f"|format(item.price) }}</td>
+                        <td>${{ "%.2f"|format(item.price * item.quantity) }}</td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            <p style="text-align: right; margin-top: 15px; font-weight: bold; color: var(--coffee-dark);">
+                Total: ${{ "%.2f"|format(order.total_amount) }}
+            </p>
+        </div>
+        
+        {% if history %}
+        <div class="auth-card" style="margin-bottom: 30px;">
+            <h3 style="color: var(--coffee-dark); margin-bottom: 15px;">History</h3>
+            <table class="admin-table">
+                <tbody>
+                    {% for event in history %}
+                    <tr>
+                        <td>{{ event.created_at }}</td>
+                        <td>
+                            {% if event.type == 'created' %}Placed ({{ event.status|title }})
+                            {% else %}{{ event.previous_status|title }} &rarr; {{ event.status|title }}{% endif %}
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+        </div>
+        {% endif %}
+        
+        {% if next_statuses %}
+        <div class="auth-card">
+            <form method="POST" action="/admin/orders/{{ order.id }}/status">
+                <input type="hidden" name="version" value="{{ order.version }}">
+                <div class="form-group">
+                    <label class="form-label">Move order to</label>
+                    <select name="status" class="form-control" required>
+                        {% for status in next_statuses %}
+                        <option value="{{ status }}">{{ status|title }}</option>
+                        {% endfor %}
+                    </select>
+                </div>
+                <button type="submit" class="btn btn-primary">
+                    <i class="fas fa-save"></i> Update Status
+                </button>
+            </form>
+        </div>
+        {% endif %}
+    </div>
+</div>
+''' + FOOTER + SCRIPT_TAGS
+
+# Shared "first / next page" links for keyset-paginated listings
+PAGER_TEMPLATE = '''
+{% if next_cursor or request.args.get('cursor') %}
+<div style="display: flex; justify-content: space-between; align-items: center; margin-top: 30px; gap: 15px;">
+    {% if request.args.get('cursor') %}
+    <a href="{{ request.path }}?limit={{ limit }}" class="btn" style="background: var(--text-light);">
+        <i class="fas fa-angle-double-left"></i> First Page
+    </a>
+    {% else %}
+    <span></span>
+    {% endif %}
+    {% if next_cursor %}
+    <a href="{{ request.path }}?cursor={{ next_cursor }}&limit={{ limit }}" class="btn btn-primary">
+        Next Page <i class="fas fa-angle-right"></i>
+    </a>
+    {% endif %}
+</div>
+{% endif %}
+'''
+
+# ============ TEMPLATE REGISTRY ============
+templates = TemplateRegistry(app)
+templates.register('pages/pager.html', PAGER_TEMPLATE)
+templates.register('pages/home.html', HOME_TEMPLATE)
+templates.register('pages/about.html', ABOUT_TEMPLATE)
+templates.register('pages/menu.html', MENU_TEMPLATE)
+templates.register('pages/login.html', LOGIN_TEMPLATE)
+templates.register('pages/register.html', REGISTER_TEMPLATE)
+templates.register('pages/contact.html', CONTACT_TEMPLATE)
+templates.register('pages/admin/dashboard.html', ADMIN_DASHBOARD_TEMPLATE)
+templates.register('pages/admin/coffees.html', ADMIN_COFFEES_TEMPLATE)
+templates.register('pages/admin/add_coffee.html', ADD_COFFEE_TEMPLATE)
+templates.register('pages/admin/edit_coffee.html', EDIT_COFFEE_TEMPLATE)
+templates.register('pages/cart.html', CART_TEMPLATE)
+templates.register('pages/checkout.html', CHECKOUT_TEMPLATE)
+templates.register('pages/orders.html', ORDERS_TEMPLATE)
+templates.register('pages/profile.html', PROFILE_TEMPLATE)
+templates.register('pages/admin/users.html', ADMIN_USERS_TEMPLATE)
+templates.register('pages/admin/orders.html', ADMIN_ORDERS_TEMPLATE)
+templates.register('pages/admin/order_detail.html', ADMIN_ORDER_DETAIL_TEMPLATE)
+templates.compile_all()
+
+# ============ DATABASE INITIALIZATION ============
+def init_db():
+    with db_pool.pool.connection() as conn:
+        _init_db(conn)
+
+def _init_db(conn):
+    cursor = conn.cursor()
+    
+    # Create tables
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT,
+        last_name TEXT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        contact_number TEXT,
+        is_admin BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS coffees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        price REAL NOT NULL,
+        category TEXT,
+        is_available BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        total_amount REAL,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS order_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER,
+        coffee_id INTEGER,
+        quantity INTEGER,
+        price REAL,
+        FOREIGN KEY (order_id) REFERENCES orders(id),
+        FOREIGN KEY (coffee_id) REFERENCES coffees(id)
+    )
+    ''')
+    
+    # Add admin if not exists
+    cursor.execute("SELECT * FROM users WHERE email='admin@coffee.com'")
+    if not cursor.fetchone():
+        cursor.execute('''
+        INSERT INTO users (first_name, last_name, email, password, contact_number, is_admin)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', ('Admin', 'User', 'admin@coffee.com', hash_password('admin123'), '1234567890', 1))
+    
+    # Add test user if not exists
+    cursor.execute("SELECT * FROM users WHERE email='user@coffee.com'")
+    if not cursor.fetchone():
+        cursor.execute('''
+        INSERT INTO users (first_name, last_name, email, password, contact_number, is_admin)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', ('John', 'Doe', 'user@coffee.com', hash_password('user123'), '0987654321', 0))
+    
+    # Add sample coffees if none exist
+    cursor.execute("SELECT COUNT(*) FROM coffees")
+    if cursor.fetchone()[0] == 0:
+        coffees = [
+            ('Espresso', 'Strong and concentrated coffee', 3.50, 'Hot', 1),
+            ('Cappuccino', 'Espresso with steamed milk foam', 4.50, 'Hot', 1),
+            ('Latte', 'Espresso with steamed milk', 4.75, 'Hot', 1),
+            ('Americano', 'Espresso with hot water', 3.75, 'Hot', 1),
+            ('Mocha', 'Chocolate-flavored latte', 5.00, 'Hot', 1),
+            ('Macchiato', 'Espresso with a dash of milk', 4.25, 'Hot', 1),
+            ('Iced Coffee', 'Chilled coffee with ice', 4.00, 'Cold', 1),
+            ('Cold Brew', 'Slow-steeped cold coffee', 4.50, 'Cold', 1),
+            ('Flat White', 'Smooth espresso with microfoam', 4.75, 'Hot', 1),
+            ('Turkish Coffee', 'Traditional finely ground coffee', 4.25, 'Hot', 1)
+        ]
+        cursor.executemany('''
+        INSERT INTO coffees (name, description, price, category, is_available)
+        VALUES (?, ?, ?, ?, ?)
+        ''', coffees)
+    
+    conn.commit()
+    migrations.migrate(conn)
+    # The live feed starts at the end of the event log
+    order_feed.position(conn)
+
+# Initialize database
+init_db()
+
+# ============ PAGINATION ============
+USER_PAGE_SELECT = "SELECT id, first_name, last_name, email, contact_number, is_admin, created_at FROM users"
+COFFEE_PAGE_SELECT = "SELECT id, name, description, price, category, is_available, created_at FROM coffees"
+
+def page_args():
+    """Cursor token and clamped page size from the query string"""
+    return request.args.get('cursor') or None, clamp_page_size(request.args.get('limit'))
+
+def row_dicts(rows, columns):
+    return [dict(zip(columns, row)) for row in rows]
+
+# Changes whenever the orders page markup or its asset URLs change
+ORDERS_PAGE_DIGEST = hashlib.sha256(ORDERS_TEMPLATE.encode()).hexdigest()[:12]
+
+def history_validators(user_id, *parts):
+    """Weak ETag and Last-Modified for one view of a customer's order history"""
+    version, updated_at = history_version(get_db(), user_id)
+    key = repr((user_id, version) + parts).encode()
+    etag = hashlib.sha256(key).hexdigest()[:20]
+    last_modified = None
+    if updated_at:
+        last_modified = datetime.strptime(updated_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return etag, last_modified
+
+def not_modified(etag, last_modified):
+    """True if the client's cached copy is still current (If-None-Match wins)"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return bool(last_modified and since and last_modified <= since)
+
+def with_validators(response, etag, last_modified):
+    # no-cache: browsers may keep the page but must revalidate it every time
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# ============ ROUTES ============
+
+@app.before_request
+def start_job_workers():
+    """Start the job workers with the first request, in the process that serves it.
+
+    Not at import: scripts, tests and a pre-forking server's master import
+    this module too. Once started the workers also pick up anything an
+    earlier run left queued.
+    """
+    job_queue.start()
+
+@app.before_request
+def migrate_session_cart():
+    """Move a cart left in the cookie by an older release into the cart store"""
+    if 'cart' in session and 'user_id' in session:
+        carts = CartStore(get_db())
+        carts.merge(session['user_id'], session.pop('cart') or {})
+        session['cart_count'] = carts.count(session['user_id'])
+
+# Public Pages
+@app.route('/')
+def home():
+    return templates.render('pages/home.html')
+
+@app.route('/about')
+def about():
+    return templates.render('pages/about.html')
+
+@app.route('/menu')
+def menu():
+    coffee_by_category = menu_cache.by_category(get_db)
+    
+    return templates.render('pages/menu.html', coffee_by_category=coffee_by_category)
+
+@app.route('/contact', methods=['GET', 'POST'])
+def contact():
+    if request.method == 'POST':
+        flash('Thank you for your message! We will get back to you soon.', 'success')
+        return redirect('/contact')
+    return templates.render('pages/contact.html')
+
+# Authentication
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
         email = request.form.get('email', '').strip()
         password = request.form.get('password', '').strip()
         
-        conn = sqlite3.connect('coffee_shop.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password))
-        user = cursor.fetchone()
-        conn.close()
+        user = verifier.authenticate(get_db(), email, password)
         
         if user:
             session['user_id'] = user[0]
             session['first_name'] = user[1]
             session['email'] = user[3]
             session['is_admin'] = bool(user[6])
+            session['cart_count'] = CartStore(get_db()).count(user[0])
             flash(f'Welcome back, {user[1]}!', 'success')
             
             if session['is_admin']:
@@ -1935,7 +2749,7 @@ def login():
         else:
             flash('Invalid email or password! Please try again.', 'error')
     
-    return render_template_string(LOGIN_TEMPLATE)
+    return templates.render('pages/login.html')
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -1960,14 +2774,13 @@ def register():
             return redirect('/register')
         
         try:
-            conn = sqlite3.connect('coffee_shop.db')
+            conn = get_db()
             cursor = conn.cursor()
             cursor.execute('''
             INSERT INTO users (first_name, last_name, email, contact_number, password)
             VALUES (?, ?, ?, ?, ?)
-            ''', (first_name, last_name, email, contact, password))
+            ''', (first_name, last_name, email, contact, verifier.hash(password)))
             conn.commit()
-            conn.close()
             flash('Registration successful! Please login.', 'success')
             return redirect('/login')
         except sqlite3.IntegrityError:
@@ -1975,7 +2788,7 @@ def register():
         except Exception as e:
             flash('Registration failed. Please try again.', 'error')
     
-    return render_template_string(REGISTER_TEMPLATE)
+    return templates.render('pages/register.html')
 
 @app.route('/logout')
 def logout():
@@ -1989,110 +2802,62 @@ def cart():
         flash('Please login first!', 'error')
         return redirect('/login')
     
-    cart = session.get('cart', {})
-    total = 0
-    cart_items = []
+    cart_items, total = CartStore(get_db()).load(session['user_id'])
     
-    if cart:
-        conn = sqlite3.connect('coffee_shop.db')
-        cursor = conn.cursor()
-        
-        for coffee_id, quantity in cart.items():
-            cursor.execute("SELECT * FROM coffees WHERE id=?", (coffee_id,))
-            coffee = cursor.fetchone()
-            
-            if coffee:
-                item_total = coffee[3] * quantity
-                total += item_total
-                
-                cart_items.append({
-                    'id': coffee[0],
-                    'name': coffee[1],
-                    'price': coffee[3],
-                    'quantity': quantity,
-                    'total': item_total
-                })
-        
-        conn.close()
-    
-    cart_html = HEADER + MAIN_STYLES + '''
-    <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
-        <div class="container">
-            <h1 class="hero-title"><i class="fas fa-shopping-cart"></i> Shopping Cart</h1>
-            <p class="hero-subtitle">Review your order</p>
-        </div>
-    </div>
-    
-    <div class="container">
-        <div class="page-content">
-    '''
-    
-    if cart_items:
-        cart_html += '''
-            <div class="auth-card">
-                <table class="admin-table">
-                    <thead>
-                        <tr>
-                            <th>Coffee</th>
-                            <th>Price</th>
-                            <th>Quantity</th>
-                            <th>Total</th>
-                            <th>Action</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-        '''
-        
-        for item in cart_items:
-            cart_html += f'''
-                        <tr>
-                            <td><strong>{item['name']}</strong></td>
-                            <td>${item['price']:.2f}</td>
-                            <td>{item['quantity']}</td>
-                            <td>${item['total']:.2f}</td>
-                            <td>
-                                <button class="btn-action btn-delete" onclick="removeFromCart({item['id']})">
-                                    <i class="fas fa-trash"></i> Remove
-                                </button>
-                            </td>
-                        </tr>
-            '''
-        
-        cart_html += f'''
-                    </tbody>
-                </table>
-                
-                <div style="margin-top: 30px; text-align: right;">
-                    <h3 style="color: var(--coffee-dark);">Total: ${total:.2f}</h3>
-                    <div style="display: flex; gap: 15px; justify-content: flex-end; margin-top: 20px;">
-                        <a href="/menu" class="btn" style="background: var(--text-light);">
-                            <i class="fas fa-arrow-left"></i> Continue Shopping
-                        </a>
-                        <button class="btn btn-primary" onclick="checkout()">
-                            <i class="fas fa-check"></i> Checkout
-                        </button>
-                    </div>
-                </div>
-            </div>
-        '''
-    else:
-        cart_html += '''
-            <div class="auth-card" style="text-align: center; padding: 60px 20px;">
-                <i class="fas fa-shopping-cart" style="font-size: 64px; color: var(--coffee-light); margin-bottom: 20px;"></i>
-                <h3 style="color: var(--text-light); margin-bottom: 20px;">Your cart is empty</h3>
-                <p>Add some delicious coffee to your cart!</p>
-                <a href="/menu" class="btn btn-primary" style="margin-top: 20px;">
-                    <i class="fas fa-coffee"></i> Browse Menu
-                </a>
-            </div>
-        '''
-    
-    cart_html += '''
-        </div>
-    </div>
-    ''' + FOOTER + MAIN_SCRIPT
+    return templates.render('pages/cart.html', cart_items=cart_items, total=total)
+
+@app.route('/checkout', methods=['GET', 'POST'])
+def checkout():
+    if 'user_id' not in session:
+        if request.method == 'POST' and request.is_json:
+            return jsonify({'success': False, 'message': 'Please login first'})
+        flash('Please login first!', 'error')
+        return redirect('/login')
     
-    return render_template_string(cart_html)
+    if request.method == 'GET':
+        cart_items, total = CartStore(get_db()).load(session['user_id'])
+        if not cart_items:
+            flash('Your cart is empty!', 'error')
+            return redirect('/cart')
+        # A fresh key per rendered form: resubmitting the same form is a retry
+        return templates.render('pages/checkout.html', cart_items=cart_items, total=total,
+                                idempotency_key=uuid.uuid4().hex)
+    
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    key = (request.headers.get('Idempotency-Key') or data.get('idempotency_key') or '').strip()
+    if not key or len(key) > 100:
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'An idempotency key is required'}), 400
+        flash('Your checkout form has expired, please try again.', 'error')
+        return redirect('/checkout')
+    
+    try:
+        order_id, replayed, unavailable = UserOperations(get_db()).checkout(session['user_id'], key)
+    except Exception as e:
+        print(f"✗ Checkout failed: {e}")
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'Checkout failed. Please try again.'}), 500
+        flash('Checkout failed. Please try again.', 'error')
+        return redirect('/cart')
+    
+    session['cart_count'] = 0 if order_id else CartStore(get_db()).count(session['user_id'])
+    # Coffees taken off the menu are left out, and reported as the cart API does
+    left_out = ' Some items are no longer available and were left out.' if unavailable else ''
+    if request.is_json:
+        if order_id is None:
+            return jsonify({'success': False, 'rejected': unavailable,
+                            'message': 'Some items are no longer available' if unavailable
+                            else 'Your cart is empty'}), 409
+        return jsonify({'success': True, 'order_id': order_id, 'replayed': replayed,
+                        'rejected': unavailable, 'message': f'Order #{order_id} placed!{left_out}'})
+    
+    if order_id is None:
+        flash('Some items are no longer available' if unavailable else 'Your cart is empty!', 'error')
+        return redirect('/cart')
+    flash(f'Order #{order_id} placed! We are brewing it now.', 'success')
+    if unavailable:
+        flash(left_out.strip(), 'error')
+    return redirect('/orders')
 
 @app.route('/orders')
 def orders():
@@ -2100,31 +2865,39 @@ def orders():
         flash('Please login first!', 'error')
         return redirect('/login')
     
-    orders_html = HEADER + MAIN_STYLES + '''
-    <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
-        <div class="container">
-            <h1 class="hero-title"><i class="fas fa-history"></i> My Orders</h1>
-            <p class="hero-subtitle">Track your coffee orders</p>
-        </div>
-    </div>
-    
-    <div class="container">
-        <div class="page-content">
-            <div class="auth-card">
-                <p style="text-align: center; color: var(--text-light); padding: 40px;">
-                    You haven't placed any orders yet. Start ordering from our menu!
-                </p>
-                <div style="text-align: center;">
-                    <a href="/menu" class="btn btn-primary">
-                        <i class="fas fa-coffee"></i> Browse Menu
-                    </a>
-                </div>
-            </div>
-        </div>
-    </div>
-    ''' + FOOTER + MAIN_SCRIPT
-    
-    return render_template_string(orders_html)
+    try:
+        cursor, limit = page_args()
+        # The header shows the cart badge and the customer's name
+        etag, last_modified = history_validators(
+            session['user_id'], 'html', ORDERS_PAGE_DIGEST, cursor, limit,
+            session.get('cart_count', 0), session.get('first_name'), session.get('email'))
+        if not_modified(etag, last_modified):
+            return with_validators(app.response_class(status=304), etag, last_modified)
+        page = OrderLoader(get_db()).load_page(user_id=session['user_id'], cursor=cursor, limit=limit)
+    except ValueError:
+        flash('That page link has expired, showing the first page.', 'error')
+        return redirect('/orders')
+    
+    response = app.make_response(templates.render(
+        'pages/orders.html', orders=page.rows, next_cursor=page.next_cursor, limit=limit))
+    return with_validators(response, etag, last_modified)
+
+@app.route('/api/orders')
+def api_orders():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+    
+    try:
+        cursor, limit = page_args()
+        etag, last_modified = history_validators(session['user_id'], 'json', cursor, limit)
+        if not_modified(etag, last_modified):
+            return with_validators(app.response_class(status=304), etag, last_modified)
+        page = OrderLoader(get_db()).load_page(user_id=session['user_id'], cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    response = jsonify({'success': True, 'orders': page.rows, 'next_cursor': page.next_cursor, 'limit': limit})
+    return with_validators(response, etag, last_modified)
 
 @app.route('/profile')
 def profile():
@@ -2132,55 +2905,7 @@ def profile():
         flash('Please login first!', 'error')
         return redirect('/login')
     
-    profile_html = HEADER + MAIN_STYLES + '''
-    <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
-        <div class="container">
-            <h1 class="hero-title"><i class="fas fa-user"></i> My Profile</h1>
-            <p class="hero-subtitle">Manage your account details</p>
-        </div>
-    </div>
-    
-    <div class="container">
-        <div class="page-content">
-            <div class="auth-card">
-                <div style="text-align: center; margin-bottom: 30px;">
-                    <div style="width: 100px; height: 100px; background: var(--coffee-light); 
-                              border-radius: 50%; display: flex; align-items: center; 
-                              justify-content: center; margin: 0 auto 20px; font-size: 40px; color: var(--coffee-dark);">
-                        <i class="fas fa-user-circle"></i>
-                    </div>
-                    <h3 style="color: var(--coffee-dark);">{{ session.first_name }} {{ session.last_name }}</h3>
-                    <p style="color: var(--text-light);">{{ session.email }}</p>
-                </div>
-                
-                <div style="background: var(--coffee-cream); padding: 25px; border-radius: 15px; margin-bottom: 30px;">
-                    <h4 style="color: var(--coffee-dark); margin-bottom: 15px;">Account Information</h4>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px;">
-                        <div>
-                            <label style="font-weight: 500; color: var(--text-light);">First Name</label>
-                            <p style="color: var(--coffee-dark);">{{ session.first_name }}</p>
-                        </div>
-                        <div>
-                            <label style="font-weight: 500; color: var(--text-light);">Last Name</label>
-                            <p style="color: var(--coffee-dark);">{{ session.last_name }}</p>
-                        </div>
-                    </div>
-                </div>
-                
-                <div style="display: flex; gap: 15px; justify-content: center;">
-                    <a href="/menu" class="btn btn-primary">
-                        <i class="fas fa-coffee"></i> Order Coffee
-                    </a>
-                    <a href="/orders" class="btn" style="background: var(--text-light);">
-                        <i class="fas fa-history"></i> View Orders
-                    </a>
-                </div>
-            </div>
-        </div>
-    </div>
-    ''' + FOOTER + MAIN_SCRIPT
-    
-    return render_template_string(profile_html)
+    return templates.render('pages/profile.html')
 
 # Admin Routes
 @app.route('/admin')
@@ -2189,21 +2914,11 @@ def admin_dashboard():
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
+    conn = get_db()
     cursor = conn.cursor()
     
-    # Get statistics
-    cursor.execute("SELECT COUNT(*) FROM users")
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM coffees")
-    total_coffees = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT SUM(total_amount) FROM orders")
-    total_revenue = cursor.fetchone()[0] or 0
-    
-    cursor.execute("SELECT COUNT(*) FROM orders")
-    total_orders = cursor.fetchone()[0]
+    # Totals are kept up to date by triggers (see dashboard_stats.py)
+    stats = read_dashboard(conn)
     
     # Get recent orders
     cursor.execute('''
@@ -2214,16 +2929,7 @@ def admin_dashboard():
     ''')
     recent_orders = cursor.fetchall()
     
-    conn.close()
-    
-    stats = {
-        'total_users': total_users,
-        'total_coffees': total_coffees,
-        'total_revenue': total_revenue,
-        'total_orders': total_orders
-    }
-    
-    return render_template_string(ADMIN_DASHBOARD_TEMPLATE, stats=stats, recent_orders=recent_orders)
+    return templates.render('pages/admin/dashboard.html', stats=stats, recent_orders=recent_orders)
 
 @app.route('/admin/coffees')
 def admin_coffees():
@@ -2231,13 +2937,14 @@ def admin_coffees():
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM coffees ORDER BY id")
-    coffees = cursor.fetchall()
-    conn.close()
+    try:
+        cursor, limit = page_args()
+        page = fetch_page(get_db(), COFFEE_PAGE_SELECT, ('created_at', 'id'), (6, 0), cursor=cursor, limit=limit)
+    except ValueError:
+        flash('That page link has expired, showing the first page.', 'error')
+        return redirect('/admin/coffees')
     
-    return render_template_string(ADMIN_COFFEES_TEMPLATE, coffees=coffees)
+    return templates.render('pages/admin/coffees.html', coffees=page.rows, next_cursor=page.next_cursor, limit=limit)
 
 @app.route('/admin/add-coffee', methods=['GET', 'POST'])
 def add_coffee():
@@ -2254,20 +2961,20 @@ def add_coffee():
         
         try:
             price = float(price)
-            conn = sqlite3.connect('coffee_shop.db')
+            conn = get_db()
             cursor = conn.cursor()
             cursor.execute('''
             INSERT INTO coffees (name, description, price, category, is_available)
             VALUES (?, ?, ?, ?, ?)
             ''', (name, description, price, category, 1 if is_available else 0))
             conn.commit()
-            conn.close()
+            menu_cache.invalidate()
             flash('Coffee added successfully!', 'success')
             return redirect('/admin/coffees')
         except Exception as e:
             flash(f'Error: {str(e)}', 'error')
     
-    return render_template_string(ADD_COFFEE_TEMPLATE)
+    return templates.render('pages/admin/add_coffee.html')
 
 @app.route('/admin/edit-coffee/<int:coffee_id>', methods=['GET', 'POST'])
 def edit_coffee(coffee_id):
@@ -2275,7 +2982,7 @@ def edit_coffee(coffee_id):
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     if request.method == 'POST':
@@ -2293,6 +3000,7 @@ def edit_coffee(coffee_id):
             WHERE id=?
             ''', (name, description, price, category, 1 if is_available else 0, coffee_id))
             conn.commit()
+            menu_cache.invalidate()
             flash('Coffee updated successfully!', 'success')
             return redirect('/admin/coffees')
         except Exception as e:
@@ -2300,13 +3008,12 @@ def edit_coffee(coffee_id):
     
     cursor.execute("SELECT * FROM coffees WHERE id=?", (coffee_id,))
     coffee = cursor.fetchone()
-    conn.close()
     
     if not coffee:
         flash('Coffee not found!', 'error')
         return redirect('/admin/coffees')
     
-    return render_template_string(EDIT_COFFEE_TEMPLATE, coffee=coffee)
+    return templates.render('pages/admin/edit_coffee.html', coffee=coffee)
 
 @app.route('/admin/delete-coffee/<int:coffee_id>')
 def delete_coffee(coffee_id):
@@ -2314,11 +3021,11 @@ def delete_coffee(coffee_id):
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM coffees WHERE id=?", (coffee_id,))
     conn.commit()
-    conn.close()
+    menu_cache.invalidate()
     
     flash('Coffee deleted successfully!', 'success')
     return redirect('/admin/coffees')
@@ -2329,84 +3036,14 @@ def admin_users():
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, first_name, last_name, email, contact_number, is_admin, created_at FROM users ORDER BY created_at DESC")
-    users = cursor.fetchall()
-    conn.close()
-    
-    users_html = HEADER + MAIN_STYLES + '''
-    <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
-        <div class="container">
-            <h1 class="hero-title"><i class="fas fa-users"></i> Manage Users</h1>
-            <p class="hero-subtitle">View and manage user accounts</p>
-        </div>
-    </div>
+    try:
+        cursor, limit = page_args()
+        page = fetch_page(get_db(), USER_PAGE_SELECT, ('created_at', 'id'), (6, 0), cursor=cursor, limit=limit)
+    except ValueError:
+        flash('That page link has expired, showing the first page.', 'error')
+        return redirect('/admin/users')
     
-    <div class="container">
-        <div class="admin-container">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 30px; flex-wrap: wrap; gap: 15px;">
-                <a href="/admin" class="btn" style="background: var(--text-light);">
-                    <i class="fas fa-arrow-left"></i> Back to Dashboard
-                </a>
-                <a href="/admin/add-user" class="btn btn-primary">
-                    <i class="fas fa-user-plus"></i> Add New User
-                </a>
-            </div>
-            
-            <div class="auth-card">
-                <table class="admin-table">
-                    <thead>
-                        <tr>
-                            <th>ID</th>
-                            <th>Name</th>
-                            <th>Email</th>
-                            <th>Contact</th>
-                            <th>Role</th>
-                            <th>Joined</th>
-                            <th>Actions</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    '''
-    
-    for user in users:
-        role = "Admin" if user[5] else "User"
-        users_html += f'''
-                        <tr>
-                            <td>{user[0]}</td>
-                            <td>{user[1]} {user[2]}</td>
-                            <td>{user[3]}</td>
-                            <td>{user[4]}</td>
-                            <td>
-                                <span style="padding: 5px 12px; background: {'#C9A769' if user[5] else '#6F4E37'}; 
-                                      color: white; border-radius: 20px; font-size: 12px;">
-                                    {role}
-                                </span>
-                            </td>
-                            <td>{user[6]}</td>
-                            <td>
-                                <a href="/admin/edit-user/{user[0]}" class="btn-action btn-edit">
-                                    <i class="fas fa-edit"></i>
-                                </a>
-                                <a href="/admin/delete-user/{user[0]}" 
-                                   class="btn-action btn-delete"
-                                   onclick="return confirm('Delete this user?')">
-                                    <i class="fas fa-trash"></i>
-                                </a>
-                            </td>
-                        </tr>
-        '''
-    
-    users_html += '''
-                    </tbody>
-                </table>
-            </div>
-        </div>
-    </div>
-    ''' + FOOTER + MAIN_SCRIPT
-    
-    return render_template_string(users_html)
+    return templates.stream('pages/admin/users.html', users=page.rows, next_cursor=page.next_cursor, limit=limit)
 
 @app.route('/admin/orders')
 def admin_orders():
@@ -2414,114 +3051,343 @@ def admin_orders():
         flash('Admin access required!', 'error')
         return redirect('/login')
     
-    conn = sqlite3.connect('coffee_shop.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-    SELECT o.id, u.email, o.total_amount, o.status, o.created_at
-    FROM orders o
-    JOIN users u ON o.user_id = u.id
-    ORDER BY o.created_at DESC
-    ''')
-    orders = cursor.fetchall()
-    conn.close()
-    
-    orders_html = HEADER + MAIN_STYLES + '''
-    <div class="hero-section" style="background: linear-gradient(135deg, var(--coffee-dark), var(--text-dark));">
-        <div class="container">
-            <h1 class="hero-title"><i class="fas fa-clipboard-list"></i> Manage Orders</h1>
-            <p class="hero-subtitle">View and update order status</p>
-        </div>
-    </div>
+    # Taken before the query so the live feed can only repeat, never skip, a change
+    feed_seq = order_feed.position(get_db())
+    try:
+        cursor, limit = page_args()
+        page = OrderLoader(get_db()).load_page(cursor=cursor, limit=limit, with_items=False)
+    except ValueError:
+        flash('That page link has expired, showing the first page.', 'error')
+        return redirect('/admin/orders')
+    
+    return templates.stream('pages/admin/orders.html', orders=page.rows, next_cursor=page.next_cursor,
+                            limit=limit, feed_seq=feed_seq)
+
+def feed_position(value):
+    """Parse an order_events seq from Last-Event-ID or ?since=, defaulting to now"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    # Not get_db(): a stream keeps the app context, and g.db with it, open until it ends
+    with db_pool.pool.connection() as conn:
+        return order_feed.position(conn)
+
+@app.route('/admin/orders/stream')
+def admin_orders_stream():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
     
-    <div class="container">
-        <div class="admin-container">
-            <div style="margin-bottom: 30px;">
-                <a href="/admin" class="btn" style="background: var(--text-light);">
-                    <i class="fas fa-arrow-left"></i> Back to Dashboard
-                </a>
-            </div>
-            
-            <div class="auth-card">
-                <table class="admin-table">
-                    <thead>
-                        <tr>
-                            <th>Order ID</th>
-                            <th>Customer</th>
-                            <th>Amount</th>
-                            <th>Status</th>
-                            <th>Date</th>
-                            <th>Actions</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    '''
-    
-    for order in orders:
-        status_color = {
-            'pending': '#FFC107',
-            'preparing': '#2196F3',
-            'ready': '#4CAF50',
-            'completed': '#666',
-            'cancelled': '#f44336'
-        }.get(order[3], '#666')
-        
-        orders_html += f'''
-                        <tr>
-                            <td>#{order[0]}</td>
-                            <td>{order[1]}</td>
-                            <td>${order[2]:.2f}</td>
-                            <td>
-                                <span style="padding: 5px 12px; background: {status_color}; 
-                                      color: white; border-radius: 20px; font-size: 12px;">
-                                    {order[3].title()}
-                                </span>
-                            </td>
-                            <td>{order[4]}</td>
-                            <td>
-                                <a href="/admin/edit-order/{order[0]}" class="btn-action btn-edit">
-                                    <i class="fas fa-edit"></i> Update
-                                </a>
-                            </td>
-                        </tr>
-        '''
-    
-    orders_html += '''
-                    </tbody>
-                </table>
-            </div>
-        </div>
-    </div>
-    ''' + FOOTER + MAIN_SCRIPT
+    seq = feed_position(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    events = order_feed.stream(seq, db_pool.pool.connection)
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/admin/orders/changes')
+def api_admin_order_changes():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    seq = feed_position(request.args.get('since'))
+    timeout = min(request.args.get('timeout', LONG_POLL_SECONDS, type=float), LONG_POLL_SECONDS)
+    events = order_feed.since(seq)
+    if events is None:
+        replayed = order_feed.replay(get_db(), seq)
+        if replayed is None:
+            return jsonify({'success': True, 'reset': True, 'events': [], 'seq': order_feed.seq})
+        events, seq = replayed
+    elif not events:
+        events = order_feed.wait(seq, max(0.0, timeout)) or []
+    return jsonify({'success': True, 'reset': False, 'events': events,
+                    'seq': max([seq] + [event['seq'] for event in events])})
+
+@app.route('/api/admin/order-events')
+def api_admin_order_events():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
     
-    return render_template_string(orders_html)
+    since = request.args.get('since', 0, type=int)
+    events = events_since(get_db(), since, clamp_page_size(request.args.get('limit'), EVENTS_PAGE_SIZE))
+    return jsonify({'success': True, 'events': events, 'seq': events[-1]['seq'] if events else since})
 
-# API Routes
-@app.route('/api/cart/add', methods=['POST'])
-def api_add_to_cart():
-    if 'user_id' not in session:
-        return jsonify({'success': False, 'message': 'Please login first'})
+@app.route('/admin/edit-order/<int:order_id>')
+def admin_order_details(order_id):
+    if 'user_id' not in session or not session.get('is_admin'):
+        flash('Admin access required!', 'error')
+        return redirect('/login')
     
-    data = request.get_json()
-    coffee_id = data.get('coffee_id')
+    order = OrderLoader(get_db()).load_order(order_id)
+    if not order:
+        flash('Order not found!', 'error')
+        return redirect('/admin/orders')
     
-    if 'cart' not in session:
-        session['cart'] = {}
+    return templates.render('pages/admin/order_detail.html', order=order, history=history(get_db(), order_id),
+                            next_statuses=next_statuses(order['status']))
+
+@app.route('/admin/orders/<int:order_id>/status', methods=['POST'])
+def update_order_status(order_id):
+    if 'user_id' not in session or not session.get('is_admin'):
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        flash('Admin access required!', 'error')
+        return redirect('/login')
+    
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    try:
+        status = data.get('status')
+        version, state = update_status(get_db(), order_id, status, int(data.get('version')))
+    except (TypeError, ValueError, OverflowError):
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'A valid status and version are required'}), 400
+        flash('Invalid status update!', 'error')
+        return redirect(f'/admin/edit-order/{order_id}')
+    
+    if version is None and state is None:
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'Order not found'}), 404
+        flash('Order not found!', 'error')
+        return redirect('/admin/orders')
+    
+    if version is None:
+        # Either someone else moved the order on, or the move is not allowed from here
+        stale = state[1] != int(data.get('version'))
+        if stale:
+            message = f'Order #{order_id} is now {state[0]}; reload it before changing the status.'
+        else:
+            message = f'Order #{order_id} cannot move from {state[0]} to {status}.'
+        if request.is_json:
+            return jsonify({'success': False, 'message': message,
+                            'order': {'id': order_id, 'status': state[0], 'version': state[1]}}), 409 if stale else 400
+        flash(message, 'error')
+        return redirect(f'/admin/edit-order/{order_id}')
+    
+    if request.is_json:
+        return jsonify({'success': True, 'order': {'id': order_id, 'status': status, 'version': version}})
+    flash(f'Order #{order_id} marked as {status}.', 'success')
+    return redirect('/admin/orders')
+
+@app.route('/admin/orders/bulk-status', methods=['POST'])
+def bulk_update_order_status():
+    if 'user_id' not in session or not session.get('is_admin'):
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        flash('Admin access required!', 'error')
+        return redirect('/login')
     
-    cart = session['cart']
-    if str(coffee_id) not in cart:
-        cart[str(coffee_id)] = 1
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        order_ids = data.get('order_ids')
     else:
-        cart[str(coffee_id)] += 1
+        data = request.form
+        order_ids = request.form.getlist('order_ids', type=int) or None
+    
+    try:
+        updated = bulk_update_status(get_db(), data.get('status'), from_status=data.get('from_status') or None,
+                                     order_ids=order_ids)
+    except (TypeError, ValueError) as e:
+        if request.is_json:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(f'Error: {str(e)}', 'error')
+        return redirect('/admin/orders')
+    
+    if request.is_json:
+        skipped = sorted(set(order_ids) - set(updated)) if order_ids else []
+        return jsonify({'success': True, 'updated': updated, 'skipped': skipped})
+    flash(f'{len(updated)} order(s) marked as {data.get("status")}.', 'success')
+    return redirect('/admin/orders')
+
+@app.route('/admin/db-pool')
+def admin_db_pool():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(db_pool.pool.stats())
+
+@app.route('/admin/menu-cache')
+def admin_menu_cache():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(menu_cache.stats())
+
+@app.route('/admin/order-feed')
+def admin_order_feed():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
     
-    session['cart'] = cart
-    session.modified = True
+    return jsonify(order_feed.stats())
+
+@app.route('/admin/jobs')
+def admin_jobs():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(job_queue.stats(get_db()))
+
+@app.route('/admin/jobs/retry', methods=['POST'])
+def admin_retry_jobs():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
     
+    requeued = retry_failed(get_db())
+    job_queue.wake()
+    return jsonify({'success': True, 'requeued': requeued})
+
+@app.route('/metrics')
+def metrics():
+    token = request_metrics.METRICS_TOKEN
+    scraper = token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not scraper and ('user_id' not in session or not session.get('is_admin')):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return Response(request_metrics.request_metrics.prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/sql-profile')
+def admin_sql_profile():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(profiler.report(limit=min(request.args.get('limit', 50, type=int), 500)))
+
+@app.route('/admin/sql-profile/requests')
+def admin_sql_profile_requests():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(profiler.recent_requests(limit=min(request.args.get('limit', 50, type=int), 200),
+                                            endpoint=request.args.get('endpoint')))
+
+@app.route('/admin/credentials')
+def admin_credentials():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    return jsonify(verifier.stats())
+
+@app.route('/api/admin/stats')
+def api_admin_stats():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    conn = get_db()
     return jsonify({
         'success': True,
-        'cart_count': len(cart),
-        'message': 'Item added to cart'
+        'totals': read_dashboard(conn),
+        'daily': daily(conn, since=request.args.get('since')),
+    })
+
+# Admin JSON API (keyset paginated)
+@app.route('/api/admin/orders')
+def api_admin_orders():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        cursor, limit = page_args()
+        page = OrderLoader(get_db()).load_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({'success': True, 'orders': page.rows, 'next_cursor': page.next_cursor, 'limit': limit})
+
+@app.route('/api/admin/orders/<int:order_id>')
+def api_admin_order(order_id):
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    order = OrderLoader(get_db()).load_order(order_id)
+    if not order:
+        return jsonify({'success': False, 'message': 'Order not found'}), 404
+    return jsonify({'success': True, 'order': order, 'next_statuses': next_statuses(order['status'])})
+
+@app.route('/api/admin/users')
+def api_admin_users():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        cursor, limit = page_args()
+        page = fetch_page(get_db(), USER_PAGE_SELECT, ('created_at', 'id'), (6, 0), cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    users = row_dicts(page.rows, ('id', 'first_name', 'last_name', 'email', 'contact_number', 'is_admin', 'created_at'))
+    return jsonify({'success': True, 'users': users, 'next_cursor': page.next_cursor, 'limit': limit})
+
+@app.route('/api/admin/coffees')
+def api_admin_coffees():
+    if 'user_id' not in session or not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        cursor, limit = page_args()
+        page = fetch_page(get_db(), COFFEE_PAGE_SELECT, ('created_at', 'id'), (6, 0), cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    coffees = row_dicts(page.rows, ('id', 'name', 'description', 'price', 'category', 'is_available', 'created_at'))
+    return jsonify({'success': True, 'coffees': coffees, 'next_cursor': page.next_cursor, 'limit': limit})
+
+# API Routes
+# Cart JSON API: every write returns the recalculated cart
+def cart_response(carts, message, rejected=()):
+    cart_items, total = carts.load(session['user_id'])
+    session['cart_count'] = carts.count(session['user_id'])
+    
+    return jsonify({
+        'success': not rejected,
+        'items': cart_items,
+        'total': round(total, 2),
+        'cart_count': session['cart_count'],
+        'rejected': list(rejected),
+        'message': 'Some items are no longer available' if rejected else message
     })
 
+def apply_cart_operations(operations, message):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'})
+    
+    carts = CartStore(get_db())
+    try:
+        rejected = carts.apply(session['user_id'], operations)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return cart_response(carts, message, rejected)
+
+@app.route('/api/cart')
+def api_get_cart():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'})
+    
+    return cart_response(CartStore(get_db()), 'Cart loaded')
+
+@app.route('/api/cart/add', methods=['POST'])
+def api_add_to_cart():
+    data = request.get_json(silent=True) or {}
+    return apply_cart_operations([{'op': 'add', 'coffee_id': data.get('coffee_id'),
+                                   'quantity': data.get('quantity', 1)}], 'Item added to cart')
+
+@app.route('/api/cart/update', methods=['POST'])
+def api_update_cart():
+    data = request.get_json(silent=True) or {}
+    return apply_cart_operations([{'op': 'update', 'coffee_id': data.get('coffee_id'),
+                                   'quantity': data.get('quantity')}], 'Cart updated')
+
+@app.route('/api/cart/remove/<int:coffee_id>', methods=['POST', 'DELETE'])
+def api_remove_from_cart(coffee_id):
+    return apply_cart_operations([{'op': 'remove', 'coffee_id': coffee_id}], 'Item removed from cart')
+
+@app.route('/api/cart/clear', methods=['POST'])
+def api_clear_cart():
+    return apply_cart_operations([{'op': 'clear'}], 'Cart cleared')
+
+@app.route('/api/cart/batch', methods=['POST'])
+def api_cart_batch():
+    data = request.get_json(silent=True) or {}
+    return apply_cart_operations(data.get('operations'), 'Cart updated')
+
 if __name__ == '__main__':
     print("="*70)
     print("☕ COFFEE SHOP - COMPLETE WORKING EDITION ☕")
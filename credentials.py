@@ -0,0 +1,178 @@
+"""Salted password hashes and the login verification path.
+
+Passwords are stored as pbkdf2_sha256$<iterations>$<salt>$<hash>. The work
+factor comes from COFFEE_SHOP_PASSWORD_ITERATIONS; rows written with a
+different factor, or still holding a plaintext password, are rehashed the
+next time their owner logs in.
+
+The KDF runs in a small thread pool (COFFEE_SHOP_VERIFY_WORKERS, default
+one per CPU) rather than on the request thread, so a burst of logins can
+use at most that many cores while menu and cart requests keep being served.
+hashlib releases the GIL while it hashes. Successful verifications are
+remembered for a few minutes (COFFEE_SHOP_CREDENTIAL_CACHE entries, 0 to
+disable), keyed by the stored hash and an HMAC of the password under a
+per-process key, so repeat logins skip the KDF.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = 'pbkdf2_sha256'
+ITERATIONS = int(os.environ.get('COFFEE_SHOP_PASSWORD_ITERATIONS', 600000))
+VERIFY_WORKERS = int(os.environ.get('COFFEE_SHOP_VERIFY_WORKERS', 0)) or os.cpu_count() or 1
+CACHE_SIZE = int(os.environ.get('COFFEE_SHOP_CREDENTIAL_CACHE', 1024))
+CACHE_TTL = 300
+SALT_BYTES = 16
+
+# Columns returned by authenticate(), in the users-table order of database.py
+USER_COLUMNS = 'id, first_name, last_name, email, contact_number, password, is_admin'
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None):
+    """Hash a password with a fresh random salt"""
+    iterations = iterations or ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + '$')
+
+
+def needs_rehash(stored, iterations=None):
+    """True for plaintext rows and hashes made with a different work factor"""
+    if not is_hashed(stored):
+        return True
+    return int(stored.split('$')[1]) != (iterations or ITERATIONS)
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash (or a legacy plaintext value)"""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, iterations, salt, expected = stored.split('$')
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), _unb64(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
+
+
+class CredentialVerifier:
+    """Runs verify_password in a bounded worker pool with a small success cache"""
+
+    def __init__(self, iterations=ITERATIONS, workers=VERIFY_WORKERS, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.iterations = iterations
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='credentials')
+        self.workers = workers
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.key = secrets.token_bytes(32)
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.verifications = 0
+        self.cache_hits = 0
+        self.rehashes = 0
+        self.verify_time = 0.0
+        self._dummy_hash = None
+
+    @property
+    def dummy_hash(self):
+        """Verified against when the email is unknown, so both paths cost one KDF"""
+        if self._dummy_hash is None:
+            self._dummy_hash = hash_password(secrets.token_hex(8), self.iterations)
+        return self._dummy_hash
+
+    def _cache_key(self, password, stored):
+        return stored, hmac.new(self.key, password.encode(), hashlib.sha256).digest()
+
+    def _cached(self, key):
+        if not self.cache_size:
+            return False
+        with self.lock:
+            expires = self.cache.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self.cache[key]
+                return False
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return True
+
+    def _remember(self, key):
+        if not self.cache_size:
+            return
+        with self.lock:
+            self.cache[key] = time.monotonic() + self.ttl
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def verify(self, password, stored):
+        """Verify on a pool thread and wait for the answer"""
+        key = self._cache_key(password, stored or '')
+        if self._cached(key):
+            return True
+
+        start = time.perf_counter()
+        ok = self.executor.submit(verify_password, password, stored or self.dummy_hash).result()
+        with self.lock:
+            self.verifications += 1
+            self.verify_time += time.perf_counter() - start
+        if ok and stored:
+            self._remember(key)
+        return ok and bool(stored)
+
+    def hash(self, password):
+        """hash_password on a pool thread"""
+        return self.executor.submit(hash_password, password, self.iterations).result()
+
+    def authenticate(self, conn, email, password):
+        """Return the user row for a correct login, upgrading its hash if needed"""
+        row = conn.execute(f"SELECT {USER_COLUMNS} FROM users WHERE email = ?", (email,)).fetchone()
+        stored = row[5] if row else None
+        if not self.verify(password, stored):
+            return None
+
+        if needs_rehash(stored, self.iterations):
+            # Guard on the old value so a concurrent password change wins
+            cursor = conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                                  (self.hash(password), row[0], stored))
+            conn.commit()
+            if cursor.rowcount:
+                with self.lock:
+                    self.rehashes += 1
+        return row
+
+    def stats(self):
+        with self.lock:
+            return {
+                'iterations': self.iterations,
+                'workers': self.workers,
+                'verifications': self.verifications,
+                'verify_time_mean': self.verify_time / self.verifications if self.verifications else 0.0,
+                'cache_hits': self.cache_hits,
+                'cache_size': len(self.cache),
+                'rehashes': self.rehashes,
+            }
+
+
+verifier = CredentialVerifier()
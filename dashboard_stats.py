@@ -0,0 +1,209 @@
+"""Incrementally maintained counters for the admin dashboard.
+
+Triggers on users, coffees and orders keep running totals in
+stats_counters and per-day, per-status order counts and revenue in
+stats_daily, inside the same transaction as the write that changed them.
+The dashboard reads a handful of rows instead of scanning the tables.
+
+    python dashboard_stats.py verify    compare counters with the raw tables
+    python dashboard_stats.py rebuild   recompute counters from the raw tables
+"""
+import sqlite3
+import sys
+
+from database import DATABASE, transaction
+
+COUNTERS = ('users', 'coffees', 'orders', 'revenue')
+
+# Money is stored as REAL, so allow for float rounding when reconciling
+REVENUE_TOLERANCE = 0.005
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        status TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, status)
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'users';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_coffees_insert AFTER INSERT ON coffees BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'coffees';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_coffees_delete AFTER DELETE ON coffees BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'coffees';
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_insert AFTER INSERT ON orders BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'orders';
+        UPDATE stats_counters SET value = value + COALESCE(NEW.total_amount, 0) WHERE name = 'revenue';
+        INSERT INTO stats_daily (day, status, orders, revenue)
+        VALUES (date(NEW.created_at), COALESCE(NEW.status, 'pending'), 1, COALESCE(NEW.total_amount, 0))
+        ON CONFLICT (day, status) DO UPDATE SET
+            orders = orders + 1,
+            revenue = revenue + excluded.revenue;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_delete AFTER DELETE ON orders BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'orders';
+        UPDATE stats_counters SET value = value - COALESCE(OLD.total_amount, 0) WHERE name = 'revenue';
+        UPDATE stats_daily SET
+            orders = orders - 1,
+            revenue = revenue - COALESCE(OLD.total_amount, 0)
+        WHERE day = date(OLD.created_at) AND status = COALESCE(OLD.status, 'pending');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_update
+    AFTER UPDATE OF status, total_amount, created_at ON orders BEGIN
+        UPDATE stats_counters
+        SET value = value + COALESCE(NEW.total_amount, 0) - COALESCE(OLD.total_amount, 0)
+        WHERE name = 'revenue';
+        UPDATE stats_daily SET
+            orders = orders - 1,
+            revenue = revenue - COALESCE(OLD.total_amount, 0)
+        WHERE day = date(OLD.created_at) AND status = COALESCE(OLD.status, 'pending');
+        INSERT INTO stats_daily (day, status, orders, revenue)
+        VALUES (date(NEW.created_at), COALESCE(NEW.status, 'pending'), 1, COALESCE(NEW.total_amount, 0))
+        ON CONFLICT (day, status) DO UPDATE SET
+            orders = orders + 1,
+            revenue = revenue + excluded.revenue;
+    END
+    ''',
+]
+
+
+def install(conn):
+    """Create the stats tables and triggers and backfill them (migration step)"""
+    for statement in SCHEMA:
+        conn.execute(statement)
+    rebuild(conn)
+
+
+def _actual(conn):
+    """Recompute every counter from the raw tables (full scans)"""
+    return {
+        'users': conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+        'coffees': conn.execute("SELECT COUNT(*) FROM coffees").fetchone()[0],
+        'orders': conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0],
+        'revenue': conn.execute("SELECT COALESCE(SUM(total_amount), 0) FROM orders").fetchone()[0],
+    }
+
+
+def _actual_daily(conn):
+    rows = conn.execute('''
+    SELECT date(created_at), COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(total_amount), 0)
+    FROM orders
+    GROUP BY 1, 2
+    ''').fetchall()
+    return {(day, status): (orders, revenue) for day, status, orders, revenue in rows}
+
+
+def rebuild(conn):
+    """Replace all counters with values recomputed from the raw tables.
+
+    Runs inside the caller's transaction; the CLI wraps it in one.
+    """
+    conn.execute("DELETE FROM stats_counters")
+    conn.executemany("INSERT INTO stats_counters (name, value) VALUES (?, ?)", _actual(conn).items())
+    conn.execute("DELETE FROM stats_daily")
+    conn.executemany(
+        "INSERT INTO stats_daily (day, status, orders, revenue) VALUES (?, ?, ?, ?)",
+        ((day, status, orders, revenue) for (day, status), (orders, revenue) in _actual_daily(conn).items()))
+
+
+def verify(conn):
+    """Return (name, counter value, actual value) for every counter that drifted"""
+    counters = dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+    mismatches = []
+
+    for name, actual in _actual(conn).items():
+        stored = counters.get(name)
+        tolerance = REVENUE_TOLERANCE if name == 'revenue' else 0
+        if stored is None or abs(stored - actual) > tolerance:
+            mismatches.append((name, stored, actual))
+
+    stored_daily = {(day, status): (orders, revenue) for day, status, orders, revenue in conn.execute(
+        "SELECT day, status, orders, revenue FROM stats_daily WHERE orders != 0").fetchall()}
+    actual_daily = _actual_daily(conn)
+    for key in sorted(set(stored_daily) | set(actual_daily)):
+        stored = stored_daily.get(key, (0, 0))
+        actual = actual_daily.get(key, (0, 0))
+        if stored[0] != actual[0] or abs(stored[1] - actual[1]) > REVENUE_TOLERANCE:
+            mismatches.append((f"daily {key[0]} {key[1]}", stored, actual))
+
+    return mismatches
+
+
+def read_dashboard(conn):
+    """The dashboard totals, read from the counters in O(1)"""
+    counters = dict(conn.execute(
+        "SELECT name, value FROM stats_counters WHERE name IN (?, ?, ?, ?)", COUNTERS).fetchall())
+    return {
+        'total_users': int(counters.get('users', 0)),
+        'total_coffees': int(counters.get('coffees', 0)),
+        'total_revenue': counters.get('revenue', 0) or 0,
+        'total_orders': int(counters.get('orders', 0)),
+    }
+
+
+def daily(conn, since=None):
+    """Orders and revenue per day and status, newest day first"""
+    sql = "SELECT day, status, orders, revenue FROM stats_daily WHERE orders != 0"
+    params = ()
+    if since:
+        sql += " AND day >= ?"
+        params = (since,)
+    rows = conn.execute(sql + " ORDER BY day DESC, status", params).fetchall()
+    return [{'day': day, 'status': status, 'orders': orders, 'revenue': revenue}
+            for day, status, orders, revenue in rows]
+
+
+def main(argv):
+    command = argv[0] if argv else 'verify'
+    if command not in ('verify', 'rebuild'):
+        print(__doc__)
+        return 2
+
+    conn = sqlite3.connect(DATABASE)
+    try:
+        if command == 'rebuild':
+            with transaction(conn):
+                rebuild(conn)
+            print("✓ Dashboard counters rebuilt from the raw tables")
+
+        mismatches = verify(conn)
+        for name, stored, actual in mismatches:
+            print(f"✗ {name}: counter {stored}, actual {actual}")
+        if mismatches:
+            return 1
+        print("✓ Dashboard counters match the raw tables")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,13 +1,80 @@
 import sqlite3
 from sqlite3 import Error
+from contextlib import contextmanager
 import os
 
-def create_connection():
+from credentials import hash_password
+
+DATABASE = os.environ.get('COFFEE_SHOP_DB', 'coffee_shop.db')
+
+# Named PRAGMA presets for the storage engine.
+#   legacy     - SQLite defaults (rollback journal), kept for comparison
+#   durable    - WAL, fsync on every commit
+#   throughput - WAL, fsync at checkpoints only, bigger cache and mmap
+STORAGE_PROFILES = {
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+    },
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+    },
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = os.environ.get('COFFEE_SHOP_STORAGE_PROFILE', 'throughput')
+
+def apply_storage_profile(conn, profile=None):
+    """Apply a named PRAGMA preset to a connection"""
+    name = profile or DEFAULT_STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{name}' (choose from {', '.join(STORAGE_PROFILES)})")
+    
+    settings = STORAGE_PROFILES[name]
+    # busy_timeout first so switching journal mode can wait out other writers
+    conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    return name
+
+@contextmanager
+def transaction(conn, mode='IMMEDIATE'):
+    """Run a block inside one explicit BEGIN ... COMMIT, rolling back on error"""
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+def create_connection(database=DATABASE, profile=None):
     """Create a database connection to SQLite database"""
     conn = None
     try:
-        conn = sqlite3.connect('coffee_shop.db', check_same_thread=False)
+        conn = sqlite3.connect(database, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        apply_storage_profile(conn, profile)
         print(f"SQLite connection established (version {sqlite3.sqlite_version})")
         return conn
     except Error as e:
@@ -85,8 +152,7 @@ def create_default_admin(conn):
         # Check if admin exists
         cursor.execute("SELECT * FROM users WHERE email = 'admin@coffee.com'")
         if not cursor.fetchone():
-            # Using plain password for testing (admin123)
-            admin_password = "admin123"
+            admin_password = hash_password("admin123")
             cursor.execute('''
             INSERT INTO users (first_name, last_name, email, contact_number, password, is_admin)
             VALUES (?, ?, ?, ?, ?, ?)
@@ -138,6 +204,8 @@ def add_sample_coffees(conn):
 
 def init_database():
     """Initialize database with all required data"""
+    import migrations
+    
     print("\n" + "="*50)
     print("Initializing Coffee Shop Database")
     print("="*50)
@@ -151,6 +219,9 @@ def init_database():
     if conn:
         try:
             create_tables(conn)
+            applied = migrations.migrate(conn)
+            if applied:
+                print(f"✓ Schema migrated to version {applied[-1]}")
             create_default_admin(conn)
             add_sample_coffees(conn)
             print("\n✓ Database initialization complete!")
@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g
+
+from database import DATABASE, apply_storage_profile
+from request_metrics import TimedConnection
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time"""
+
+
+class ConnectionPool:
+    """A small thread-safe pool of warm SQLite connections.
+
+    Connections are kept open between requests so the schema, the page
+    cache and the prepared-statement cache survive from one request to
+    the next. Idle connections are reused newest-first so the warmest
+    one is handed out.
+    """
+
+    def __init__(self, database=DATABASE, max_size=8, timeout=5.0,
+                 cached_statements=256, max_lifetime=3600, profile=None):
+        self.database = database
+        self.profile = profile
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Condition()
+        self._idle = []
+        self._opened_at = {}
+        self._size = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            'acquired': 0,
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'created': 0,
+            'closed': 0,
+            'lifetime_total': 0.0,
+            'lifetime_max': 0.0,
+        }
+
+    def _connect(self):
+        """Open a connection (lock not held: the storage profile may wait on busy_timeout)"""
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.cached_statements, factory=TimedConnection)
+        try:
+            apply_storage_profile(conn, self.profile)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and record how long it lived (lock held)"""
+        opened_at = self._opened_at.pop(id(conn), None)
+        if opened_at is not None:
+            lifetime = time.monotonic() - opened_at
+            self._stats['lifetime_total'] += lifetime
+            self._stats['lifetime_max'] = max(self._stats['lifetime_max'], lifetime)
+        self._stats['closed'] += 1
+        self._size -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        """Take a connection from the pool, opening one if there is room"""
+        start = time.perf_counter()
+        waited = False
+        conn = None
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats['hits'] += 1
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot; the connection is opened below, outside the lock
+                    self._size += 1
+                    self._stats['misses'] += 1
+                    break
+
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                waited = True
+                self._lock.wait(remaining)
+
+            self._stats['acquired'] += 1
+            if waited:
+                wait_time = time.perf_counter() - start
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._opened_at[id(conn)] = time.monotonic()
+                self._stats['created'] += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back anything left open"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+
+        with self._lock:
+            opened_at = self._opened_at.get(id(conn), 0)
+            expired = time.monotonic() - opened_at > self.max_lifetime
+            if healthy and not expired:
+                self._idle.append(conn)
+            else:
+                self._discard(conn)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside of a request (scripts, startup)"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def stats(self):
+        """Snapshot of pool counters for sizing under load"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+
+        acquired = stats['acquired']
+        stats['hit_rate'] = stats['hits'] / acquired if acquired else 0.0
+        stats['wait_time_mean'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+        stats['lifetime_mean'] = stats['lifetime_total'] / stats['closed'] if stats['closed'] else 0.0
+        return stats
+
+
+pool = ConnectionPool()
+
+
+def get_db():
+    """Get the connection bound to the current app context"""
+    if 'db' not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    """Hand the app context's connection back to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    """Register the pool's teardown hook on a Flask app"""
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,318 @@
+"""Durable background jobs for work that should not hold up a request.
+
+Jobs are rows in the jobs table, an outbox: a write that needs follow-up
+work enqueues its jobs inside its own transaction, so they exist exactly
+when the write committed and survive a restart. A small pool of worker
+threads (COFFEE_SHOP_JOB_WORKERS, default 2) claims due jobs one at a time
+with a single UPDATE ... RETURNING, runs the handler registered for the
+job's kind and marks it done. A failing job is retried with exponential
+backoff and parked as failed after MAX_ATTEMPTS tries.
+
+A claim is a lease: a job whose worker died, or whose process restarted,
+mid-run becomes due again after LEASE_SECONDS, so handlers must tolerate
+running twice. Lost leases count as attempts too: a job that has used all
+MAX_ATTEMPTS is parked as failed when its last lease runs out. Workers are woken as soon as the enqueueing transaction
+commits and otherwise poll every POLL_SECONDS, which also picks up jobs
+queued by another process. Each worker keeps its own connection, so jobs
+never compete with requests for the connection pool.
+
+    python job_queue.py status    queue depth by kind and status
+    python job_queue.py run       run due jobs in the foreground until none are left
+    python job_queue.py retry     requeue failed jobs
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+from database import DATABASE, apply_storage_profile
+from kitchen_tickets import print_ticket
+
+JOB_WORKERS = int(os.environ.get('COFFEE_SHOP_JOB_WORKERS', 2))
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 300
+LEASE_SECONDS = 60
+POLL_SECONDS = 1.0
+# Finished jobs are kept this long for inspection, then purged by the workers
+RETAIN_DONE_HOURS = 24
+PURGE_INTERVAL_SECONDS = 600
+LATENCY_SAMPLES = 1000
+
+# What each kind of job runs: handler(conn, payload)
+HANDLERS = {
+    'kitchen_ticket': print_ticket,
+}
+
+# Jobs queued for every new order, in the transaction that places it
+AFTER_ORDER = ('kitchen_ticket',)
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL, -- JSON
+        status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_after REAL NOT NULL, -- unix time the job is due; lease expiry while running
+        enqueued_at REAL NOT NULL,
+        finished_at REAL,
+        last_error TEXT
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (run_after) WHERE status IN ('queued', 'running')",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_done ON jobs (finished_at) WHERE status = 'done'",
+]
+
+
+def install(conn):
+    """Create the jobs table (migration step)"""
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def enqueue(conn, kind, payloads):
+    """Queue one job of `kind` per payload, inside the caller's transaction.
+
+    Call job_queue.wake() once the transaction has committed.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    now = time.time()
+    conn.executemany('''
+    INSERT INTO jobs (kind, payload, run_after, enqueued_at)
+    VALUES (?, ?, ?, ?)
+    ''', [(kind, json.dumps(payload), now, now) for payload in payloads])
+
+
+def enqueue_after_order(conn, order_ids):
+    """Queue the after-order jobs of newly inserted orders"""
+    for kind in AFTER_ORDER:
+        enqueue(conn, kind, [{'order_id': order_id} for order_id in order_ids])
+
+
+def claim(conn, lease=LEASE_SECONDS):
+    """Lease the next due job: (id, kind, payload, attempts, enqueued_at) or None.
+
+    A due job with no attempts left - its lease ran out after the last one
+    because the worker died every time - is parked as failed instead.
+    """
+    now = time.time()
+    conn.execute('''
+    UPDATE jobs SET status = 'failed', finished_at = ?, last_error = 'Lease expired on the last attempt'
+    WHERE status IN ('queued', 'running') AND run_after <= ? AND attempts >= ?
+    ''', (now, now, MAX_ATTEMPTS))
+    row = conn.execute('''
+    UPDATE jobs SET status = 'running', attempts = attempts + 1, run_after = ?
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status IN ('queued', 'running') AND run_after <= ? AND attempts < ?
+        ORDER BY run_after
+        LIMIT 1
+    )
+    RETURNING id, kind, payload, attempts, enqueued_at
+    ''', (now + lease, now, MAX_ATTEMPTS)).fetchone()
+    conn.commit()
+    return row
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def depth(conn):
+    """{status: number of jobs}"""
+    return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def purge(conn, hours=RETAIN_DONE_HOURS):
+    """Delete jobs that finished more than `hours` ago; returns how many"""
+    cursor = conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?",
+                          (time.time() - hours * 3600,))
+    conn.commit()
+    return cursor.rowcount
+
+
+def retry_failed(conn):
+    """Give every failed job a fresh set of attempts; returns how many"""
+    cursor = conn.execute('''
+    UPDATE jobs SET status = 'queued', attempts = 0, run_after = ?, finished_at = NULL
+    WHERE status = 'failed'
+    ''', (time.time(),))
+    conn.commit()
+    return cursor.rowcount
+
+
+def connect():
+    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    apply_storage_profile(conn)
+    return conn
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JobQueue:
+    """Worker threads that run jobs from the jobs table"""
+
+    def __init__(self, workers=JOB_WORKERS, connect=connect, poll=POLL_SECONDS):
+        self.workers = workers
+        self._connect = connect
+        self.poll = poll
+        self._condition = threading.Condition()
+        self._threads = []
+        self._due = False
+        self._stopping = False
+        self._purged_at = 0.0
+        self.completed = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_times = deque(maxlen=LATENCY_SAMPLES)
+        self.run_times = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the worker threads (once)"""
+        if self._threads:
+            return
+        with self._condition:
+            if self._threads or not self.workers:
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._work, name=f'jobs-{n}', daemon=True)
+                             for n in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=None):
+        """Let running jobs finish and stop the workers"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def wake(self):
+        """Tell the workers new jobs were committed, starting them if needed"""
+        self.start()
+        with self._condition:
+            self._due = True
+            self._condition.notify_all()
+
+    def _work(self):
+        conn = self._connect()
+        try:
+            while True:
+                try:
+                    while not self._stopping and self.run_next(conn):
+                        pass
+                    if time.monotonic() - self._purged_at > PURGE_INTERVAL_SECONDS:
+                        self._purged_at = time.monotonic()
+                        purge(conn)
+                except Exception as e:
+                    print(f"✗ Job worker error: {e}")
+                with self._condition:
+                    self._condition.wait_for(lambda: self._due or self._stopping, self.poll)
+                    if self._stopping:
+                        return
+                    self._due = False
+        finally:
+            conn.close()
+
+    def run_next(self, conn):
+        """Claim and run one due job; False when there is none"""
+        job = claim(conn)
+        if job is None:
+            return False
+
+        job_id, kind, payload, attempts, enqueued_at = job
+        started = time.time()
+        try:
+            HANDLERS[kind](conn, json.loads(payload))
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            print(f"✗ Job #{job_id} ({kind}) failed on attempt {attempts}: {e}")
+            self._fail(conn, job_id, attempts, f"{type(e).__name__}: {e}")
+            return True
+
+        finished = time.time()
+        conn.execute("UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ?", (finished, job_id))
+        conn.commit()
+        with self._condition:
+            self.completed += 1
+            self.wait_times.append(started - enqueued_at)
+            self.run_times.append(finished - started)
+        return True
+
+    def _fail(self, conn, job_id, attempts, error):
+        if attempts >= MAX_ATTEMPTS:
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ? WHERE id = ?",
+                         (time.time(), error, job_id))
+        else:
+            conn.execute("UPDATE jobs SET status = 'queued', run_after = ?, last_error = ? WHERE id = ?",
+                         (time.time() + retry_delay(attempts), error, job_id))
+        conn.commit()
+        with self._condition:
+            if attempts >= MAX_ATTEMPTS:
+                self.failures += 1
+            else:
+                self.retries += 1
+
+    def stats(self, conn):
+        counts = depth(conn)
+        with self._condition:
+            wait_times, run_times = list(self.wait_times), list(self.run_times)
+            return {
+                'workers': len(self._threads),
+                'queued': counts.get('queued', 0),
+                'running': counts.get('running', 0),
+                'failed': counts.get('failed', 0),
+                'completed': self.completed,
+                'retries': self.retries,
+                'failures': self.failures,
+                'wait_p50': _percentile(wait_times, 0.5),
+                'wait_p95': _percentile(wait_times, 0.95),
+                'run_time_mean': sum(run_times) / len(run_times) if run_times else 0.0,
+            }
+
+
+job_queue = JobQueue()
+
+
+def main(argv):
+    command = argv[0] if argv else 'status'
+    if command not in ('status', 'run', 'retry'):
+        print(__doc__)
+        return 2
+
+    conn = sqlite3.connect(DATABASE)
+    try:
+        if command == 'retry':
+            print(f"✓ Requeued {retry_failed(conn):,} failed jobs")
+        elif command == 'run':
+            queue = JobQueue(workers=0)
+            start = time.perf_counter()
+            while queue.run_next(conn):
+                pass
+            print(f"✓ Ran {queue.completed + queue.retries + queue.failures:,} jobs "
+                  f"({queue.retries:,} to retry, {queue.failures:,} failed) "
+                  f"in {time.perf_counter() - start:.2f}s")
+        rows = conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status")
+        for kind, status, count in rows:
+            print(f"{kind:<20}{status:<10}{count:>10,}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
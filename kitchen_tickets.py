@@ -0,0 +1,42 @@
+"""Kitchen tickets for new orders, printed by a background job.
+
+Tickets go to the file named by COFFEE_SHOP_TICKET_PRINTER (a printer
+device or a spool file) or, when that is not set, to stdout.
+"""
+import os
+
+from order_loader import OrderLoader
+
+TICKET_PRINTER = os.environ.get('COFFEE_SHOP_TICKET_PRINTER')
+TICKET_WIDTH = 32
+
+
+def format_ticket(order):
+    customer = ' '.join(part for part in (order['first_name'], order['last_name']) if part)
+    lines = [
+        "=" * TICKET_WIDTH,
+        f"ORDER #{order['id']}".center(TICKET_WIDTH),
+        str(order['created_at']).center(TICKET_WIDTH),
+        "-" * TICKET_WIDTH,
+    ]
+    for item in order['items']:
+        lines.append(f"{item['quantity']:>3} x {item['name']}"[:TICKET_WIDTH])
+    lines.append("-" * TICKET_WIDTH)
+    lines.append(f"For: {customer or order['email'] or 'walk-in'}"[:TICKET_WIDTH])
+    lines.append("=" * TICKET_WIDTH)
+    return "\n".join(lines) + "\n"
+
+
+def print_ticket(conn, payload):
+    """Job handler: print the ticket of payload['order_id']"""
+    order = OrderLoader(conn).load_order(payload['order_id'])
+    if order is None:
+        print(f"✗ No ticket for order #{payload['order_id']}: it no longer exists")
+        return
+
+    ticket = format_ticket(order)
+    if TICKET_PRINTER:
+        with open(TICKET_PRINTER, 'a') as printer:
+            printer.write(ticket + "\n")
+    else:
+        print(ticket)
@@ -0,0 +1,85 @@
+import threading
+
+
+class MenuCache:
+    """Process-wide copy of the coffees table.
+
+    The menu changes a few times a day, so it is loaded once and served
+    from memory until an admin write path calls invalidate(). Every
+    invalidation bumps the version; a load that raced with a write is
+    not installed. Readers pass a callable that returns a connection,
+    which is only called on a miss.
+
+    Writes made by another process (e.g. the CLI) are not seen until
+    this process invalidates or restarts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coffees = None
+        self._by_category = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _load(self, get_conn):
+        with self._lock:
+            if self._coffees is not None:
+                self.hits += 1
+                return self._coffees, self._by_category
+            self.misses += 1
+            version = self.version
+
+        rows = get_conn().execute("SELECT * FROM coffees ORDER BY id").fetchall()
+        coffees = {row[0]: tuple(row) for row in rows}
+
+        by_category = {}
+        available = sorted((row for row in coffees.values() if row[5]),
+                           key=lambda row: (row[4] or '', row[1]))
+        for row in available:
+            by_category.setdefault(row[4], []).append(row)
+
+        with self._lock:
+            if version == self.version:
+                self._coffees = coffees
+                self._by_category = by_category
+        return coffees, by_category
+
+    def by_category(self, get_conn):
+        """Available coffees grouped by category, as the /menu page shows them"""
+        return self._load(get_conn)[1]
+
+    def available(self, get_conn):
+        """Available coffees ordered by category and name"""
+        return [row for rows in self.by_category(get_conn).values() for row in rows]
+
+    def all_coffees(self, get_conn):
+        """Every coffee, available or not, ordered by id"""
+        return list(self._load(get_conn)[0].values())
+
+    def coffee(self, get_conn, coffee_id):
+        """A single coffee row by id, or None"""
+        return self._load(get_conn)[0].get(int(coffee_id))
+
+    def invalidate(self):
+        """Drop the cached menu after a write to the coffees table"""
+        with self._lock:
+            self._coffees = None
+            self._by_category = None
+            self.version += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'loaded': self._coffees is not None,
+                'size': len(self._coffees) if self._coffees is not None else 0,
+            }
+
+
+menu_cache = MenuCache()
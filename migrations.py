@@ -0,0 +1,276 @@
+"""Versioned schema migrations for coffee_shop.db.
+
+Each migration is a (version, description, steps) entry; a step is either
+an SQL string or a callable taking the connection. Applied versions are
+recorded in the schema_migrations table and mirrored in PRAGMA user_version.
+
+    python migrations.py           apply pending migrations
+    python migrations.py --check   fail if a hot query falls back to a table scan
+"""
+import sqlite3
+import sys
+
+import dashboard_stats
+import job_queue
+import order_events
+import order_history
+from database import DATABASE
+
+MIGRATIONS = [
+    (1, 'Index orders, order_items and the menu for hot lookups', [
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status)",
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)",
+        "CREATE INDEX IF NOT EXISTS idx_coffees_available_category ON coffees (is_available, category, name)",
+    ]),
+    (2, 'Index users and coffees by creation time for keyset pagination', [
+        "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_coffees_created_at ON coffees (created_at)",
+    ]),
+    (3, 'Trigger-maintained dashboard counters and daily order buckets', [
+        dashboard_stats.install,
+    ]),
+    (4, 'Server-side cart store keyed by user', [
+        '''
+        CREATE TABLE IF NOT EXISTS cart_items (
+            user_id INTEGER NOT NULL,
+            coffee_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, coffee_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (coffee_id) REFERENCES coffees (id)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    (5, 'Idempotency keys for checkout', [
+        '''
+        CREATE TABLE IF NOT EXISTS checkout_requests (
+            user_id INTEGER NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            order_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, idempotency_key),
+            FOREIGN KEY (order_id) REFERENCES orders (id)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_checkout_requests_created_at ON checkout_requests (created_at)",
+    ]),
+    (6, 'Per-customer order history versions for ETag / Last-Modified', [
+        order_history.install,
+    ]),
+    (7, 'Order versions for compare-and-set status updates', [
+        "ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (8, 'Append-only order event log', [
+        order_events.install,
+    ]),
+    (9, 'Outbox table for background jobs', [
+        job_queue.install,
+    ]),
+]
+
+# Queries that run on every page view; none of them may scan a whole table.
+HOT_QUERIES = {
+    'user_order_history': (
+        "SELECT * FROM orders WHERE user_id = ? ORDER BY created_at DESC", (1,)),
+    'order_line_items': ('''
+        SELECT c.name, oi.quantity, oi.price
+        FROM order_items oi
+        JOIN coffees c ON oi.coffee_id = c.id
+        WHERE oi.order_id = ?''', (1,)),
+    'all_orders': ('''
+        SELECT o.*, u.first_name, u.last_name, u.email
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        ORDER BY o.created_at DESC''', ()),
+    'dashboard_recent_orders': ('''
+        SELECT o.id, u.email, o.total_amount, o.status, o.created_at
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        ORDER BY o.created_at DESC LIMIT 5''', ()),
+    'order_page': ('''
+        SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at,
+               u.first_name, u.last_name, u.email, o.version
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        WHERE (o.created_at, o.id) < (?, ?)
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT ?''', ('9999-12-31', 0, 50)),
+    'user_order_page': ('''
+        SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at,
+               u.first_name, u.last_name, u.email, o.version
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        WHERE o.user_id = ? AND (o.created_at, o.id) < (?, ?)
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT ?''', (1, '9999-12-31', 0, 50)),
+    'orders_by_id': ('''
+        SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at,
+               u.first_name, u.last_name, u.email, o.version
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        WHERE o.id IN (?, ?, ?)''', (1, 2, 3)),
+    'order_items_batch': ('''
+        SELECT oi.order_id, oi.coffee_id, c.name, oi.quantity, oi.price
+        FROM order_items oi
+        JOIN coffees c ON oi.coffee_id = c.id
+        WHERE oi.order_id IN (?, ?, ?)
+        ORDER BY oi.order_id, oi.id''', (1, 2, 3)),
+    'user_page': ('''
+        SELECT id, first_name, last_name, email, contact_number, is_admin, created_at
+        FROM users
+        WHERE (created_at, id) < (?, ?)
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?''', ('9999-12-31', 0, 50)),
+    'coffee_page': ('''
+        SELECT id, name, description, price, category, is_available, created_at
+        FROM coffees
+        WHERE (created_at, id) < (?, ?)
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?''', ('9999-12-31', 0, 50)),
+    'dashboard_counters': (
+        "SELECT name, value FROM stats_counters WHERE name IN (?, ?, ?, ?)", dashboard_stats.COUNTERS),
+    'cart_load': ('''
+        SELECT c.id, c.name, c.price, ci.quantity
+        FROM cart_items ci
+        JOIN coffees c ON c.id = ci.coffee_id
+        WHERE ci.user_id = ? AND c.is_available = 1
+        ORDER BY ci.coffee_id''', (1,)),
+    'cart_count': ('''
+        SELECT COUNT(*)
+        FROM cart_items ci
+        JOIN coffees c ON c.id = ci.coffee_id
+        WHERE ci.user_id = ? AND c.is_available = 1''', (1,)),
+    'checkout_replay': (
+        "SELECT order_id FROM checkout_requests WHERE user_id = ? AND idempotency_key = ?", (1, 'key')),
+    'checkout_prune': (
+        "DELETE FROM checkout_requests WHERE created_at < datetime('now', ?)", ('-24 hours',)),
+    'order_history_version': (
+        "SELECT version, updated_at FROM order_history_versions WHERE user_id = ?", (1,)),
+    'order_detail': ('''
+        SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at, o.version,
+               u.first_name, u.last_name, u.email, u.contact_number,
+               oi.coffee_id, c.name, c.description, oi.quantity, oi.price
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        LEFT JOIN order_items oi ON oi.order_id = o.id
+        LEFT JOIN coffees c ON oi.coffee_id = c.id
+        WHERE o.id = ?
+        ORDER BY oi.id''', (1,)),
+    'order_status_update': (
+        "UPDATE orders SET status = ?, version = version + 1 WHERE id = ? AND version = ? AND status IN (?)",
+        ('ready', 1, 0, 'preparing')),
+    'order_events_since': (
+        "SELECT seq, order_id, type, status, previous_status, version, created_at FROM order_events "
+        "WHERE seq > ? ORDER BY seq LIMIT ?", (0, 500)),
+    'order_event_history': (
+        "SELECT seq, order_id, type, status, previous_status, version, created_at FROM order_events "
+        "WHERE order_id = ? ORDER BY seq", (1,)),
+    'job_claim': (
+        "UPDATE jobs SET status = 'running', attempts = attempts + 1, run_after = ? WHERE id = ("
+        "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND run_after <= ? AND attempts < ? "
+        "ORDER BY run_after LIMIT 1)", (0, 0, 5)),
+    'job_expire': (
+        "UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ? "
+        "WHERE status IN ('queued', 'running') AND run_after <= ? AND attempts >= ?", (0, '', 0, 5)),
+    'job_purge': (
+        "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (0,)),
+    'orders_by_status': (
+        "SELECT id FROM orders WHERE status = ?", ('pending',)),
+    'menu': (
+        "SELECT * FROM coffees WHERE is_available=1 ORDER BY category, name", ()),
+}
+
+
+def _ensure_migrations_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.commit()
+
+
+def current_version(conn):
+    """Return the highest migration version applied to the database"""
+    _ensure_migrations_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, target=None):
+    """Apply every pending migration up to target, one transaction each"""
+    version = current_version(conn)
+    applied = []
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                         (number, description))
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(number)
+
+    return applied
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def is_table_scan(detail):
+    """A plan step that reads a whole table or sorts it in a temp b-tree"""
+    if detail.startswith('SCAN ') and 'USING' not in detail:
+        return True
+    return 'USE TEMP B-TREE' in detail
+
+
+def check_query_plans(conn, queries=None):
+    """Return (name, detail) for every hot query step that scans a table"""
+    problems = []
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        for detail in explain(conn, sql, params):
+            if is_table_scan(detail):
+                problems.append((name, detail))
+    return problems
+
+
+def main(argv):
+    conn = sqlite3.connect(DATABASE)
+    try:
+        applied = migrate(conn)
+        if applied:
+            print(f"✓ Applied migrations: {', '.join(str(v) for v in applied)}")
+        print(f"✓ Schema version: {current_version(conn)}")
+
+        if '--check' in argv:
+            problems = check_query_plans(conn)
+            for name, detail in problems:
+                print(f"✗ {name}: {detail}")
+            if problems:
+                return 1
+            print(f"✓ All {len(HOT_QUERIES)} hot queries use an index")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,161 @@
+"""Append-only log of order creation and status transitions.
+
+Triggers on orders append to order_events in the same transaction as the
+change itself, so the log can never disagree with the orders table. seq is
+an AUTOINCREMENT key: it only grows and is never reused, even after
+compaction, which makes "everything after seq N" a primary-key range scan
+that dashboards, the live order feed and exports can tail.
+
+Compaction keeps the full history for the last few days and, before that,
+only each order's latest event, so replaying the log from the start still
+ends at the current state of every order.
+
+    python order_events.py tail [since]      print events after a sequence number
+    python order_events.py compact [days]    compact events older than days (default 7)
+"""
+import sqlite3
+import sys
+import time
+
+from database import DATABASE, transaction
+
+EVENT_COLUMNS = ('seq', 'order_id', 'type', 'status', 'previous_status', 'version', 'created_at')
+EVENTS_PAGE_SIZE = 500
+RETENTION_DAYS = 7
+# Sequence numbers compacted per transaction, so writers are never blocked for long
+COMPACT_BATCH = 10000
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS order_events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER NOT NULL,
+        type TEXT NOT NULL, -- created, status
+        status TEXT,
+        previous_status TEXT,
+        version INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_order_events_order_seq ON order_events (order_id, seq)",
+    "CREATE INDEX IF NOT EXISTS idx_order_events_created_at ON order_events (created_at)",
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_order_events_insert AFTER INSERT ON orders BEGIN
+        INSERT INTO order_events (order_id, type, status, version)
+        VALUES (NEW.id, 'created', NEW.status, NEW.version);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_order_events_status
+    AFTER UPDATE OF status ON orders WHEN OLD.status IS NOT NEW.status BEGIN
+        INSERT INTO order_events (order_id, type, status, previous_status, version)
+        VALUES (NEW.id, 'status', NEW.status, OLD.status, NEW.version);
+    END
+    ''',
+]
+
+
+def install(conn):
+    """Create the log and its triggers and record existing orders (migration step)"""
+    for statement in SCHEMA:
+        conn.execute(statement)
+    backfill(conn)
+
+
+def backfill(conn, first_order_id=0):
+    """Log a 'created' event for orders from first_order_id on, e.g. after a bulk load.
+
+    Runs inside the caller's transaction.
+    """
+    conn.execute('''
+    INSERT INTO order_events (order_id, type, status, version, created_at)
+    SELECT id, 'created', status, version, created_at FROM orders
+    WHERE id >= ?
+    ORDER BY id
+    ''', (first_order_id,))
+
+
+def last_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM order_events").fetchone()[0]
+
+
+def events_since(conn, seq, limit=EVENTS_PAGE_SIZE):
+    """Up to limit events after seq, oldest first"""
+    rows = conn.execute(f'''
+    SELECT {', '.join(EVENT_COLUMNS)} FROM order_events
+    WHERE seq > ?
+    ORDER BY seq
+    LIMIT ?
+    ''', (seq, limit)).fetchall()
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
+
+
+def history(conn, order_id):
+    """Every retained event of one order, oldest first"""
+    rows = conn.execute(f'''
+    SELECT {', '.join(EVENT_COLUMNS)} FROM order_events
+    WHERE order_id = ?
+    ORDER BY seq
+    ''', (order_id,)).fetchall()
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
+
+
+def compaction_horizon(conn, days=RETENTION_DAYS):
+    """First seq that is recent enough to keep in full"""
+    row = conn.execute("SELECT MIN(seq) FROM order_events WHERE created_at >= datetime('now', ?)",
+                       (f'-{days} days',)).fetchone()
+    return row[0] if row[0] is not None else last_seq(conn) + 1
+
+
+def compact(conn, days=RETENTION_DAYS, batch=COMPACT_BATCH):
+    """Drop events before the horizon that a later event of the same order supersedes.
+
+    Works through the old part of the log in seq ranges of `batch`, one
+    short transaction each. Returns the number of events removed.
+    """
+    horizon = compaction_horizon(conn, days)
+    first = conn.execute("SELECT COALESCE(MIN(seq), 0) FROM order_events").fetchone()[0]
+    removed = 0
+    for low in range(first, horizon, batch):
+        with transaction(conn):
+            cursor = conn.execute('''
+            DELETE FROM order_events
+            WHERE seq >= ? AND seq < ? AND EXISTS (
+                SELECT 1 FROM order_events later
+                WHERE later.order_id = order_events.order_id AND later.seq > order_events.seq
+            )
+            ''', (low, min(low + batch, horizon)))
+            removed += cursor.rowcount
+    return removed
+
+
+def main(argv):
+    command = argv[0] if argv else 'tail'
+    if command not in ('tail', 'compact'):
+        print(__doc__)
+        return 2
+
+    conn = sqlite3.connect(DATABASE)
+    try:
+        if command == 'compact':
+            days = int(argv[1]) if len(argv) > 1 else RETENTION_DAYS
+            start = time.perf_counter()
+            removed = compact(conn, days)
+            print(f"✓ Compacted {removed:,} events older than {days} days in {time.perf_counter() - start:.2f}s")
+            return 0
+
+        seq = int(argv[1]) if len(argv) > 1 else 0
+        while True:
+            events = events_since(conn, seq)
+            for event in events:
+                print(f"{event['seq']:>10} {event['created_at']} order #{event['order_id']} "
+                      f"{event['type']}: {event['previous_status'] or '-'} -> {event['status']}")
+            if len(events) < EVENTS_PAGE_SIZE:
+                return 0
+            seq = events[-1]['seq']
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,201 @@
+"""In-process change feed behind the live order queue.
+
+The feed mirrors the tail of the order_events log (see order_events.py),
+numbered by its seq. After committing, order placement and status updates
+call refresh(), which reads the new log entries once and wakes every
+waiting screen. Barista screens follow the feed over server-sent events
+(/admin/orders/stream) or long polling (/api/admin/orders/changes). Both
+wait on a condition variable and read from memory, so open screens cost no
+database queries however many there are. A client that has fallen behind
+the in-memory window (or reconnects with an old Last-Event-ID) is replayed
+from the log; only one that is further behind than MAX_REPLAY events is
+told to reload.
+
+Writes made by another process reach this feed on the next local refresh.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from order_events import EVENTS_PAGE_SIZE, events_since, last_seq
+from order_loader import OrderLoader
+
+FEED_SIZE = 1000
+MAX_REPLAY = 5000
+KEEPALIVE_SECONDS = 15
+# Streams end after this long; EventSource reconnects with Last-Event-ID
+MAX_STREAM_SECONDS = 300
+LONG_POLL_SECONDS = 30
+
+
+def order_payloads(conn, events):
+    """What screens receive: full order rows for new orders, the new state for status changes"""
+    created = OrderLoader(conn).load_orders(
+        [event['order_id'] for event in events if event['type'] == 'created'])
+    feed_events = []
+    for event in events:
+        if event['type'] == 'created':
+            order = created.get(event['order_id'])
+            if order is None:
+                continue
+        else:
+            order = {'id': event['order_id'], 'status': event['status'],
+                     'previous_status': event['previous_status'], 'version': event['version']}
+        feed_events.append({'seq': event['seq'], 'type': event['type'], 'order': order})
+    return feed_events
+
+
+def batched(events):
+    """Group runs of same-type events: (type, last seq, [orders])"""
+    batches = []
+    for event in events:
+        if batches and batches[-1][0] == event['type']:
+            batches[-1][1] = event['seq']
+            batches[-1][2].append(event['order'])
+        else:
+            batches.append([event['type'], event['seq'], [event['order']]])
+    return batches
+
+
+class OrderFeed:
+    """Window of recent order events with blocking reads"""
+
+    def __init__(self, size=FEED_SIZE):
+        self._condition = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._events = deque(maxlen=size)
+        self.seq = None
+        # Every event after this seq is in the window
+        self._floor = None
+        self.refreshes = 0
+        self.replays = 0
+        self.listeners = 0
+        self.resets = 0
+
+    def position(self, conn):
+        """Latest seq the feed has seen, starting from the end of the log"""
+        if self.seq is None:
+            with self._condition:
+                if self.seq is None:
+                    self.seq = self._floor = last_seq(conn)
+        return self.seq
+
+    def refresh(self, conn):
+        """Pull log entries committed since the last refresh and wake the readers"""
+        with self._refresh_lock:
+            # After a bulk load only the newest events go into the window;
+            # anyone further behind is replayed from the log
+            seq = self.position(conn)
+            skip_to = last_seq(conn) - self._events.maxlen
+            if skip_to > seq:
+                with self._condition:
+                    self._events.clear()
+                    self._floor = seq = skip_to
+            events = []
+            while True:
+                page = events_since(conn, seq)
+                events.extend(order_payloads(conn, page))
+                if len(page) < EVENTS_PAGE_SIZE:
+                    break
+                seq = page[-1]['seq']
+            with self._condition:
+                self.refreshes += 1
+                if events:
+                    self._events.extend(events)
+                    if len(self._events) == self._events.maxlen:
+                        self._floor = max(self._floor, self._events[0]['seq'] - 1)
+                    self.seq = events[-1]['seq']
+                if self.seq < seq:
+                    self.seq = seq
+                self._condition.notify_all()
+            return len(events)
+
+    def _since(self, seq):
+        if seq == self.seq:
+            return []
+        if seq > self.seq or seq < self._floor:
+            return None
+        return [event for event in self._events if event['seq'] > seq]
+
+    def since(self, seq):
+        """Events after seq from memory, or None if the client must be replayed"""
+        with self._condition:
+            return self._since(seq)
+
+    def replay(self, conn, seq):
+        """(events after seq from the log, seq they bring the client to).
+
+        None when seq is unknown or too far behind to be worth replaying.
+        """
+        # Stop where the feed is, so the client carries on from memory
+        until = self.position(conn)
+        if seq > until:
+            self.resets += 1
+            return None
+        events = []
+        while len(events) < MAX_REPLAY:
+            page = [event for event in events_since(conn, seq) if event['seq'] <= until]
+            events.extend(page)
+            if len(page) < EVENTS_PAGE_SIZE:
+                self.replays += 1
+                return order_payloads(conn, events), until
+            seq = page[-1]['seq']
+        self.resets += 1
+        return None
+
+    def wait(self, seq, timeout):
+        """Block until there is something after seq or timeout seconds pass"""
+        with self._condition:
+            self.listeners += 1
+            try:
+                self._condition.wait_for(lambda: self.seq != seq, timeout)
+                return self._since(seq)
+            finally:
+                self.listeners -= 1
+
+    def stream(self, seq, connect, keepalive=KEEPALIVE_SECONDS, duration=MAX_STREAM_SECONDS):
+        """Server-sent events from seq on, with keepalive comments.
+
+        connect() is a context manager yielding a connection; it is only
+        entered to replay a client that is behind the window.
+        """
+        deadline = time.monotonic() + duration
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            events = self.since(seq)
+            if events is None:
+                with connect() as conn:
+                    replayed = self.replay(conn, seq)
+                if replayed is None:
+                    seq = self.seq
+                    yield f"id: {seq}\nevent: reset\ndata: {{}}\n\n"
+                    continue
+                events, seq = replayed
+                for kind, last, orders in batched(events):
+                    yield f"id: {last}\nevent: {kind}\ndata: {json.dumps(orders)}\n\n"
+                continue
+
+            if not events:
+                events = self.wait(seq, min(keepalive, max(0.0, deadline - time.monotonic())))
+                if events == []:
+                    yield ": keepalive\n\n"
+                if not events:
+                    continue
+            for kind, last, orders in batched(events):
+                seq = last
+                yield f"id: {seq}\nevent: {kind}\ndata: {json.dumps(orders)}\n\n"
+
+    def stats(self):
+        with self._condition:
+            return {
+                'seq': self.seq,
+                'window': len(self._events),
+                'refreshes': self.refreshes,
+                'replays': self.replays,
+                'listeners': self.listeners,
+                'resets': self.resets,
+            }
+
+
+order_feed = OrderFeed()
@@ -0,0 +1,135 @@
+from pagination import DEFAULT_PAGE_SIZE, fetch_page
+
+ORDER_SELECT = '''
+SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at,
+       u.first_name, u.last_name, u.email, o.version
+FROM orders o
+JOIN users u ON o.user_id = u.id'''
+
+# One order, its customer and its line items in a single statement
+ORDER_DETAIL_SELECT = '''
+SELECT o.id, o.user_id, o.total_amount, o.status, o.created_at, o.version,
+       u.first_name, u.last_name, u.email, u.contact_number,
+       oi.coffee_id, c.name, c.description, oi.quantity, oi.price
+FROM orders o
+JOIN users u ON o.user_id = u.id
+LEFT JOIN order_items oi ON oi.order_id = o.id
+LEFT JOIN coffees c ON oi.coffee_id = c.id
+WHERE o.id = ?
+ORDER BY oi.id'''
+
+def order_dict(row):
+    """An ORDER_SELECT row as a dict, items still to be attached"""
+    return {
+        'id': row[0],
+        'user_id': row[1],
+        'total_amount': row[2],
+        'status': row[3],
+        'created_at': row[4],
+        'first_name': row[5],
+        'last_name': row[6],
+        'email': row[7],
+        'version': row[8],
+        'items': [],
+    }
+
+class OrderLoader:
+    """Loads orders together with their line items in two set-based queries.
+
+    One query fetches a page of orders (newest first, keyed on
+    (created_at, id)), a second fetches the line items of every order on
+    the page, which are then grouped by order_id in memory.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def load_page(self, user_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE, with_items=True):
+        """Load one page of orders, optionally for a single customer"""
+        where, params = ("o.user_id = ?", (user_id,)) if user_id is not None else (None, ())
+        page = fetch_page(self.conn, ORDER_SELECT, ('o.created_at', 'o.id'), (4, 0),
+                          cursor=cursor, limit=limit, where=where, params=params)
+
+        orders = [order_dict(row) for row in page.rows]
+        if with_items:
+            self._attach_items(orders)
+
+        page.rows = orders
+        return page
+
+    def load_orders(self, order_ids):
+        """Many orders by id with their line items, as {order_id: order}"""
+        if not order_ids:
+            return {}
+
+        placeholders = ', '.join('?' for _ in order_ids)
+        rows = self.conn.execute(f"{ORDER_SELECT}\nWHERE o.id IN ({placeholders})", list(order_ids)).fetchall()
+        orders = [order_dict(row) for row in rows]
+        self._attach_items(orders)
+        return {order['id']: order for order in orders}
+
+    def _attach_items(self, orders):
+        items = self.load_items([order['id'] for order in orders])
+        for order in orders:
+            order['items'] = items.get(order['id'], [])
+
+    def load_order(self, order_id):
+        """One order with its customer details and line items, or None"""
+        rows = self.conn.execute(ORDER_DETAIL_SELECT, (order_id,)).fetchall()
+        if not rows:
+            return None
+
+        first = rows[0]
+        return {
+            'id': first[0],
+            'user_id': first[1],
+            'total_amount': first[2],
+            'status': first[3],
+            'created_at': first[4],
+            'version': first[5],
+            'first_name': first[6],
+            'last_name': first[7],
+            'email': first[8],
+            'contact_number': first[9],
+            'items': [{
+                'coffee_id': coffee_id,
+                'name': name,
+                'description': description,
+                'quantity': quantity,
+                'price': price,
+            } for *_, coffee_id, name, description, quantity, price in rows if coffee_id is not None],
+        }
+
+    def load_items(self, order_ids):
+        """Fetch the line items of many orders at once, grouped by order_id"""
+        grouped = {}
+        if not order_ids:
+            return grouped
+
+        placeholders = ', '.join('?' for _ in order_ids)
+        rows = self.conn.execute(f'''
+        SELECT oi.order_id, oi.coffee_id, c.name, oi.quantity, oi.price
+        FROM order_items oi
+        JOIN coffees c ON oi.coffee_id = c.id
+        WHERE oi.order_id IN ({placeholders})
+        ORDER BY oi.order_id, oi.id
+        ''', list(order_ids)).fetchall()
+
+        for order_id, coffee_id, name, quantity, price in rows:
+            grouped.setdefault(order_id, []).append({
+                'coffee_id': coffee_id,
+                'name': name,
+                'quantity': quantity,
+                'price': price,
+            })
+        return grouped
+
+    def iter_orders(self, user_id=None, page_size=DEFAULT_PAGE_SIZE):
+        """Walk the whole history page by page without loading it at once"""
+        cursor = None
+        while True:
+            page = self.load_page(user_id=user_id, cursor=cursor, limit=page_size)
+            yield from page.rows
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
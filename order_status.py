@@ -0,0 +1,100 @@
+"""Order status transitions with optimistic concurrency.
+
+Every order carries a version that each status change increments. A
+change is a single compare-and-set UPDATE that only matches if the order
+still has the version the barista was looking at and its current status
+may move to the new one, so two baristas working the same queue never
+overwrite each other and nobody holds a lock while deciding. A miss is
+reported back with the order's current status and version. Each change
+is logged to order_events by trigger and pushed to the live order feed.
+"""
+from order_feed import order_feed
+
+ORDER_STATUSES = ('pending', 'preparing', 'ready', 'completed', 'cancelled')
+
+# Where each status may move next; completed and cancelled are final
+TRANSITIONS = {
+    'pending': ('preparing', 'ready', 'cancelled'),
+    'preparing': ('ready', 'cancelled'),
+    'ready': ('completed', 'cancelled'),
+    'completed': (),
+    'cancelled': (),
+}
+
+# Largest explicit id list a bulk update accepts in one request
+MAX_BULK_ORDERS = 500
+# SQLite INTEGER is 64-bit; larger Python ints overflow when bound
+MAX_ORDER_ID = 2 ** 63 - 1
+
+
+def next_statuses(status):
+    return TRANSITIONS.get(status, ())
+
+
+def sources(status):
+    """Statuses an order may move to `status` from"""
+    if status not in ORDER_STATUSES:
+        raise ValueError(f"Unknown order status: {status!r}")
+    return [current for current, targets in TRANSITIONS.items() if status in targets]
+
+
+def current_state(conn, order_id):
+    """(status, version) of an order, or None if it does not exist"""
+    return conn.execute("SELECT status, version FROM orders WHERE id = ?", (order_id,)).fetchone()
+
+
+def update_status(conn, order_id, status, expected_version):
+    """Compare-and-set one order's status.
+
+    Returns (new_version, None) on success, or (None, (status, version))
+    with the order's current state when the version moved on or the
+    transition is not allowed; the state is None for an unknown order.
+    """
+    allowed = sources(status)
+    placeholders = ', '.join('?' for _ in allowed)
+    row = conn.execute(f'''
+    UPDATE orders SET status = ?, version = version + 1
+    WHERE id = ? AND version = ? AND status IN ({placeholders})
+    RETURNING version
+    ''', [status, order_id, expected_version] + allowed).fetchone()
+    conn.commit()
+    if row:
+        order_feed.refresh(conn)
+        return row[0], None
+    return None, current_state(conn, order_id)
+
+
+def bulk_update_status(conn, status, from_status=None, order_ids=None):
+    """Move every order in from_status (and/or in order_ids) to status in one UPDATE.
+
+    Orders whose current status cannot move to `status` are left alone.
+    Returns the ids that were updated.
+    """
+    allowed = sources(status)
+    if from_status is not None:
+        if from_status not in allowed:
+            raise ValueError(f"Orders cannot move from {from_status!r} to {status!r}")
+        allowed = [from_status]
+    if order_ids is not None and (not isinstance(order_ids, (list, tuple)) or not order_ids
+                                  or len(order_ids) > MAX_BULK_ORDERS):
+        raise ValueError(f"order_ids must list between 1 and {MAX_BULK_ORDERS} orders")
+    if order_ids is not None and not all(type(order_id) is int and 0 < order_id <= MAX_ORDER_ID
+                                         for order_id in order_ids):
+        raise ValueError("order_ids must be integers")
+    if from_status is None and order_ids is None:
+        raise ValueError("Pass from_status, order_ids or both")
+
+    conditions = [f"status IN ({', '.join('?' for _ in allowed)})"]
+    params = [status] + allowed
+    if order_ids is not None:
+        conditions.append(f"id IN ({', '.join('?' for _ in order_ids)})")
+        params.extend(order_ids)
+
+    rows = conn.execute(f'''
+    UPDATE orders SET status = ?, version = version + 1
+    WHERE {' AND '.join(conditions)}
+    RETURNING id
+    ''', params).fetchall()
+    conn.commit()
+    order_feed.refresh(conn)
+    return sorted(row[0] for row in rows)
@@ -0,0 +1,80 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(*values):
+    """Turn the sort key of the last row on a page into an opaque token"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, arity=2):
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+    if (not isinstance(values, list) or len(values) != arity
+            or not all(isinstance(v, (str, int, float)) for v in values)):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return values
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a requested page size, keeping it between 1 and MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class Page:
+    def __init__(self, rows, next_cursor=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def fetch_page(conn, select, key_columns, key_positions, cursor=None,
+               limit=DEFAULT_PAGE_SIZE, where=None, params=()):
+    """Run a keyset (seek) paginated query, newest first.
+
+    select is the SELECT ... FROM ... part of the statement; key_columns
+    are the sort columns, e.g. ('o.created_at', 'o.id'), and key_positions
+    their positions in each result row. Instead of OFFSET the page starts
+    right after the cursor's key, so page 10,000 costs the same index seek
+    as page one.
+    """
+    limit = clamp_page_size(limit)
+    conditions = [where] if where else []
+    args = list(params)
+
+    if cursor:
+        values = decode_cursor(cursor, len(key_columns))
+        placeholders = ', '.join('?' for _ in key_columns)
+        conditions.append(f"({', '.join(key_columns)}) < ({placeholders})")
+        args.extend(values)
+
+    sql = select
+    if conditions:
+        sql += f"\nWHERE {' AND '.join(conditions)}"
+    sql += f"\nORDER BY {', '.join(f'{column} DESC' for column in key_columns)}\nLIMIT ?"
+
+    rows = conn.execute(sql, args + [limit + 1]).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(last[position] for position in key_positions))
+    return Page(rows, next_cursor)
@@ -0,0 +1,236 @@
+"""Per-statement SQL profile with a slow-query log and N+1 detection.
+
+Pooled connections (TimedConnection in request_metrics.py) report every
+statement they run during a request here. Statements are normalised -
+literals become ?, IN and VALUES lists fold to (?...), whitespace and
+comments collapse - so one query with different values or list lengths is
+counted once wherever in the code it is issued.
+
+While a request runs its counts go to a per-thread dict; when it ends
+they are merged into the process-wide totals (executions, total, mean and
+max time per statement), checked for N+1 patterns (one statement run at
+least N_PLUS_ONE_MIN times in a single request) and kept in a ring of
+recent requests; requests that ran no SQL are skipped. Time spent
+fetching rows is added to the statement that produced them. A statement
+slower than COFFEE_SHOP_SLOW_QUERY_MS (default 100) goes to the slow-query
+log together with its EXPLAIN QUERY PLAN, taken on the same connection
+with the same parameters the first time that statement is slow and reused
+after that. Statements run outside a request (startup, scripts) are timed
+but not profiled.
+
+The first slow run and the first N+1 finding of each statement are also
+logged as warnings on the "coffee_shop.sql" logger; raise its level to
+silence them.
+
+/admin/sql-profile shows the totals, slow log and N+1 findings, and
+/admin/sql-profile/requests the recent requests one by one.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from migrations import is_table_scan
+
+SLOW_QUERY_MS = float(os.environ.get('COFFEE_SHOP_SLOW_QUERY_MS', 100))
+N_PLUS_ONE_MIN = int(os.environ.get('COFFEE_SHOP_N_PLUS_ONE_MIN', 10))
+SLOW_LOG_SIZE = 200
+RECENT_REQUESTS = 200
+
+log = logging.getLogger('coffee_shop.sql')
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(sql):
+    """The statement's shape, without literal values or list lengths"""
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(?...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN detail lines, run past the profiler"""
+    try:
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    return [row[-1] for row in rows]
+
+
+class ActiveRequest(threading.local):
+    """Statements of the request running on this thread: normalised -> [count, ns, max ns]"""
+    statements = None
+    path = None
+
+
+active = ActiveRequest()
+
+
+def observe(sql, elapsed, conn, parameters):
+    """Count one statement run in the current request; returns its entry or None"""
+    statements = active.statements
+    if statements is None:
+        return None
+    key = normalize(sql)
+    entry = statements.get(key)
+    if entry is None:
+        entry = statements[key] = [0, 0, 0]
+    entry[0] += 1
+    entry[1] += elapsed
+    if elapsed > entry[2]:
+        entry[2] = elapsed
+        # Only a new worst time for the statement in this request is logged
+        if elapsed > SLOW_QUERY_MS * 1e6:
+            profiler.log_slow(key, sql, elapsed, conn, parameters)
+    return entry
+
+
+class QueryProfiler:
+    """Statement totals, slow-query log, N+1 findings and recent requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # normalised -> [executions, ns, max ns, requests]
+        self.statements = {}
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        # normalised -> (plan, scans) of statements that have been slow
+        self.plans = {}
+        # (endpoint, normalised) -> [requests, most runs in one request]
+        self.n_plus_one = {}
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self.requests = 0
+
+    def begin(self, path):
+        active.statements = {}
+        active.path = path
+
+    def end(self, endpoint, status, total):
+        """Merge the finished request's statements; total in nanoseconds"""
+        statements, active.statements = active.statements, None
+        if not statements:
+            return
+        flagged = [(key, entry[0]) for key, entry in statements.items() if entry[0] >= N_PLUS_ONE_MIN]
+        with self._lock:
+            self.requests += 1
+            request_id = self.requests
+            for key, (count, elapsed, longest) in statements.items():
+                totals = self.statements.get(key)
+                if totals is None:
+                    self.statements[key] = [count, elapsed, longest, 1]
+                else:
+                    totals[0] += count
+                    totals[1] += elapsed
+                    totals[3] += 1
+                    if longest > totals[2]:
+                        totals[2] = longest
+            first_seen = []
+            for key, count in flagged:
+                finding = self.n_plus_one.get((endpoint, key))
+                if finding is None:
+                    self.n_plus_one[(endpoint, key)] = [1, count]
+                    first_seen.append((key, count))
+                else:
+                    finding[0] += 1
+                    finding[1] = max(finding[1], count)
+            self.recent.append((request_id, time.time(), endpoint, active.path, status, total, statements))
+        for key, count in first_seen:
+            log.warning("Possible N+1 in %s: ran %d times in one request: %s", endpoint, count, key)
+
+    def log_slow(self, key, sql, elapsed, conn, parameters):
+        known = self.plans.get(key)
+        first = known is None
+        if first:
+            # parameters is None for executemany, whose statements are not planned
+            plan = explain(conn, sql, parameters) if parameters is not None else []
+            known = (plan, any(is_table_scan(detail) for detail in plan))
+        plan, scans = known
+        entry = {
+            'at': time.time(),
+            'path': active.path,
+            'statement': key,
+            'ms': elapsed / 1e6,
+            'plan': plan,
+            'scans': scans,
+        }
+        with self._lock:
+            self.slow_log.append(entry)
+            if first:
+                # Two requests may plan the same statement at once; one of them logs it
+                first = self.plans.setdefault(key, known) is known
+        if first:
+            log.warning("Slow query (%.1f ms%s): %s", entry['ms'], ', table scan' if scans else '', key)
+
+    def report(self, limit=50):
+        """Process-wide totals, heaviest statements first"""
+        with self._lock:
+            statements = [(key, *totals) for key, totals in self.statements.items()]
+            slow_log = list(self.slow_log)
+            n_plus_one = [(endpoint, key, *finding) for (endpoint, key), finding in self.n_plus_one.items()]
+            requests = self.requests
+        db_total = sum(elapsed for _, _, elapsed, _, _ in statements) or 1
+        statements.sort(key=lambda row: row[2], reverse=True)
+        return {
+            'requests': requests,
+            'statements': [{
+                'statement': key,
+                'executions': count,
+                'requests': seen_in,
+                'per_request': count / seen_in,
+                'total_ms': elapsed / 1e6,
+                'mean_ms': elapsed / count / 1e6,
+                'max_ms': longest / 1e6,
+                'share': elapsed / db_total,
+            } for key, count, elapsed, longest, seen_in in statements[:limit]],
+            'slow_queries': slow_log[::-1],
+            'n_plus_one': [{
+                'endpoint': endpoint,
+                'statement': key,
+                'requests': flagged,
+                'max_per_request': most,
+            } for endpoint, key, flagged, most in sorted(n_plus_one, key=lambda row: row[2], reverse=True)],
+        }
+
+    def recent_requests(self, limit=50, endpoint=None):
+        """The last requests, newest first, each with its statements heaviest first"""
+        with self._lock:
+            recent = list(self.recent)
+        requests = []
+        for request_id, at, request_endpoint, path, status, total, statements in reversed(recent):
+            if endpoint and request_endpoint != endpoint:
+                continue
+            ordered = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)
+            requests.append({
+                'id': request_id,
+                'at': at,
+                'endpoint': request_endpoint,
+                'path': path,
+                'status': status,
+                'ms': total / 1e6,
+                'queries': sum(entry[0] for entry in statements.values()),
+                'db_ms': sum(entry[1] for entry in statements.values()) / 1e6,
+                'statements': [{
+                    'statement': key,
+                    'executions': count,
+                    'total_ms': elapsed / 1e6,
+                    'max_ms': longest / 1e6,
+                    'n_plus_one': count >= N_PLUS_ONE_MIN,
+                } for key, (count, elapsed, longest) in ordered],
+            })
+            if len(requests) >= limit:
+                break
+        return requests
+
+
+profiler = QueryProfiler()
@@ -0,0 +1,349 @@
+"""Per-endpoint request latency, split into database, template and other time.
+
+RequestTimer wraps the WSGI app and times each request from the moment it
+arrives until the app returns its response, or, for streamed responses,
+until the server closes the body, so streamed pages count in full. A last
+after_request hook tags the response with its endpoint and status; only
+streamed bodies are wrapped, everything else is recorded on the spot.
+While the request runs, pooled connections (TimedConnection) add the time
+spent in execute, executemany, fetchmany, fetchall and commit to a
+per-thread clock and TemplateRegistry adds rendering time; whatever is left
+is "other" (routing, sessions, view code, serialisation). fetchone and
+iterating a cursor are not timed separately - the first row is already
+read by execute - and count as template or other time. Every statement is
+also handed to query_profiler for per-statement totals.
+
+Each endpoint keeps an HDR-style histogram of request time: log-linear
+buckets over microseconds with SUB_BUCKETS linear steps per power of two,
+so any recorded value is off by at most 1/SUB_BUCKETS (about 6%) however
+skewed the distribution, plus running totals of db, template and other
+time. Recording is a bit_length, a list increment and a few additions
+under one lock. On a single-core VM bench_metrics.py measures the
+middleware, hook included, at about 3 us per request and a query, timed
+and counted by query_profiler, at 1-2 us over a plain one; pages here
+take 1-10 ms, so that stays below 0.5%. /metrics exports everything in
+the Prometheus text format.
+"""
+import os
+import sqlite3
+import threading
+from time import perf_counter_ns
+
+from flask import request
+
+from query_profiler import observe, profiler
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Longest duration kept apart; anything slower lands in the last bucket
+MAX_MICROSECONDS = 60 * 1000 * 1000
+PHASES = ('db', 'template', 'other')
+# Bucket bounds in seconds for the exported Prometheus histograms
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = 'unmatched'
+# environ key holding (endpoint, status, streamed), set by tag_response
+RESPONSE_KEY = 'coffee_shop.response'
+# A response the hook never saw: Flask failed while finishing it
+UNTAGGED = (UNMATCHED, 500, True)
+# Lets a Prometheus scraper read /metrics with "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('COFFEE_SHOP_METRICS_TOKEN')
+
+
+def bucket_index(microseconds):
+    """Exact below 2 * SUB_BUCKETS, then SUB_BUCKETS buckets per power of two"""
+    shift = microseconds.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return microseconds
+    return (shift << SUB_BUCKET_BITS) + (microseconds >> shift)
+
+
+def bucket_upper(index):
+    """Smallest value (in microseconds) above bucket `index`"""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    power, step = divmod(index, SUB_BUCKETS)
+    return (SUB_BUCKETS + step + 1) << (power - 1)
+
+
+BUCKET_COUNT = bucket_index(MAX_MICROSECONDS) + 1
+
+
+class EndpointStats:
+    """Latency histogram, phase totals (in nanoseconds) and responses by status of one endpoint"""
+
+    __slots__ = ('counts', 'count', 'total', 'db', 'template', 'statuses')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.db = 0
+        self.template = 0
+        self.statuses = {}
+
+    def percentile(self, fraction):
+        """Upper bound, in seconds, of the bucket holding the given fraction of requests"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket_upper(index) / 1e6
+        return MAX_MICROSECONDS / 1e6
+
+    def cumulative(self, bounds=EXPORT_BUCKETS):
+        """[(bound, requests no slower than bound)] for bounds in seconds"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            limit = bound * 1e6
+            while index < BUCKET_COUNT and bucket_upper(index) <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append((bound, seen))
+        return result
+
+    def phases(self):
+        """Seconds spent in each of PHASES over all requests"""
+        return self.db / 1e9, self.template / 1e9, max(0, self.total - self.db - self.template) / 1e9
+
+
+class RequestClock(threading.local):
+    """Database and template nanoseconds of the request running on this thread"""
+    db = 0
+    template = 0
+
+
+request_clock = RequestClock()
+
+# Unbound C methods, called directly to keep the per-query overhead down
+_cursor = sqlite3.Connection.cursor
+_commit = sqlite3.Connection.commit
+_execute = sqlite3.Cursor.execute
+_executemany = sqlite3.Cursor.executemany
+_fetchmany = sqlite3.Cursor.fetchmany
+_fetchall = sqlite3.Cursor.fetchall
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Profile entry of the last statement, which its fetch time is added to
+    statement = None
+
+    def execute(self, sql, parameters=()):
+        start = perf_counter_ns()
+        try:
+            return _execute(self, sql, parameters)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            self.statement = observe(sql, elapsed, self.connection, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = perf_counter_ns()
+        try:
+            return _executemany(self, sql, seq_of_parameters)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            self.statement = observe(sql, elapsed, self.connection, None)
+
+    def fetchmany(self, size=None):
+        start = perf_counter_ns()
+        try:
+            return _fetchmany(self, self.arraysize if size is None else size)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            if self.statement is not None:
+                self.statement[1] += elapsed
+
+    def fetchall(self):
+        start = perf_counter_ns()
+        try:
+            return _fetchall(self)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            if self.statement is not None:
+                self.statement[1] += elapsed
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that adds its query time to request_clock.db"""
+
+    def cursor(self, factory=TimedCursor):
+        return _cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        cursor = _cursor(self, TimedCursor)
+        start = perf_counter_ns()
+        try:
+            return _execute(cursor, sql, parameters)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            cursor.statement = observe(sql, elapsed, self, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        cursor = _cursor(self, TimedCursor)
+        start = perf_counter_ns()
+        try:
+            return _executemany(cursor, sql, seq_of_parameters)
+        finally:
+            elapsed = perf_counter_ns() - start
+            request_clock.db += elapsed
+            cursor.statement = observe(sql, elapsed, self, None)
+
+    def commit(self):
+        start = perf_counter_ns()
+        try:
+            _commit(self)
+        finally:
+            request_clock.db += perf_counter_ns() - start
+
+
+class RequestMetrics:
+    """Latency histograms, phase totals and response counts per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, status, total, db, template):
+        """Count one request; durations in nanoseconds"""
+        microseconds = total // 1000
+        if microseconds > MAX_MICROSECONDS:
+            microseconds = MAX_MICROSECONDS
+        index = bucket_index(microseconds)
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.counts[index] += 1
+            stats.count += 1
+            stats.total += total
+            stats.db += db
+            stats.template += template
+            statuses = stats.statuses
+            statuses[status] = statuses.get(status, 0) + 1
+
+    def summary(self):
+        """{endpoint: {'count', 'p50', 'p95', 'p99', and mean seconds per phase}}"""
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': stats.count,
+                    'p50': stats.percentile(0.5),
+                    'p95': stats.percentile(0.95),
+                    'p99': stats.percentile(0.99),
+                    **{f'{phase}_mean': seconds / stats.count for phase, seconds in zip(PHASES, stats.phases())},
+                }
+                for endpoint, stats in self.endpoints.items()
+            }
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format"""
+        lines = [
+            "# HELP coffee_shop_requests_total Responses sent, by endpoint and status code.",
+            "# TYPE coffee_shop_requests_total counter",
+        ]
+        with self._lock:
+            endpoints = sorted((_label(endpoint), stats) for endpoint, stats in self.endpoints.items())
+            for endpoint, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'coffee_shop_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            name = 'coffee_shop_request_duration_seconds'
+            lines.append(f"# HELP {name} Time from request to response body closed.")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint, stats in endpoints:
+                for bound, count in stats.cumulative():
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound:g}"}} {count}')
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {stats.count}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {stats.total / 1e9:.6f}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {stats.count}')
+
+            name = 'coffee_shop_request_phase_seconds_total'
+            lines.append(f"# HELP {name} Request time spent in the database, rendering templates and the rest.")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, stats in endpoints:
+                for phase, seconds in zip(PHASES, stats.phases()):
+                    lines.append(f'{name}{{endpoint="{endpoint}",phase="{phase}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TimedResponse:
+    """Streamed response body that records its request when the server closes it"""
+
+    __slots__ = ('body', 'timer', 'environ', 'start')
+
+    def __init__(self, body, timer, environ, start):
+        self.body = body
+        self.timer = timer
+        self.environ = environ
+        self.start = start
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.timer.finish(self.environ.get(RESPONSE_KEY, UNTAGGED), self.start)
+
+
+class RequestTimer:
+    """WSGI middleware that records every request in a RequestMetrics"""
+
+    def __init__(self, wsgi_app, metrics):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        request_clock.db = request_clock.template = 0
+        profiler.begin(environ.get('PATH_INFO'))
+        start = perf_counter_ns()
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except Exception:
+            self.finish(UNTAGGED, start)
+            raise
+        tag = environ.get(RESPONSE_KEY, UNTAGGED)
+        if tag[2]:
+            return TimedResponse(body, self, environ, start)
+        self.finish(tag, start)
+        return body
+
+    def finish(self, tag, start):
+        total = perf_counter_ns() - start
+        endpoint, status, _ = tag
+        self.metrics.record(endpoint, status, total, request_clock.db, request_clock.template)
+        profiler.end(endpoint, status, total)
+
+
+def tag_response(response):
+    # Flask drops the request from the environ before a streamed body is sent.
+    # One proxy lookup: each access through `request` costs about a microsecond
+    current = request._get_current_object()
+    current.environ[RESPONSE_KEY] = (current.endpoint or UNMATCHED, response.status_code, response.is_streamed)
+    return response
+
+
+request_metrics = RequestMetrics()
+
+
+def init_app(app, metrics=request_metrics):
+    """Time every request the app serves"""
+    app.wsgi_app = RequestTimer(app.wsgi_app, metrics)
+    # after_request hooks run last-registered first, so this one sees the final response
+    app.after_request_funcs.setdefault(None, []).insert(0, tag_response)
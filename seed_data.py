@@ -0,0 +1,220 @@
+"""Bulk data seeder for production-sized databases.
+
+Generates users, coffees, orders and order_items from a fixed random seed,
+so the same arguments always produce the same rows. Rows are written with
+executemany in large batches inside one transaction; secondary indexes and
+the dashboard triggers are dropped for the load and rebuilt once at the
+end, which is far cheaper than maintaining them row by row. Usage:
+
+    python seed_data.py [--users 100000] [--orders 1000000] [--items 3] [--coffees 50]
+                        [--days 365] [--seed 7] [--batch 20000] [--database coffee_shop.db]
+"""
+import argparse
+import random
+import sqlite3
+import time
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+
+import dashboard_stats
+import migrations
+import order_events
+import order_history
+from credentials import hash_password
+from database import DATABASE, apply_storage_profile, create_tables, transaction
+
+SEED_DOMAIN = 'seed.example'
+SEED_PASSWORD = 'seed123'
+SEEDED_TABLES = ('users', 'coffees', 'orders', 'order_items')
+STATUSES = ('pending', 'preparing', 'ready', 'completed', 'cancelled')
+STATUS_WEIGHTS = (5, 3, 2, 80, 10)
+CATEGORIES = ('Hot', 'Cold', 'Specialty')
+BATCH_SIZE = 20000
+
+
+def user_email(user_id):
+    """Login of a seeded user"""
+    return f'user{user_id}@{SEED_DOMAIN}'
+
+
+def _next_id(conn, table):
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def deferred_indexes(conn, tables=SEEDED_TABLES):
+    """Drop the secondary indexes and triggers on tables, recreate them on exit"""
+    placeholders = ', '.join('?' for _ in tables)
+    objects = conn.execute(f'''
+    SELECT type, name, sql FROM sqlite_master
+    WHERE type IN ('index', 'trigger') AND tbl_name IN ({placeholders}) AND sql IS NOT NULL
+    ORDER BY type, name
+    ''', tables).fetchall()
+
+    for kind, name, _ in objects:
+        conn.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+    try:
+        yield objects
+    finally:
+        for _, _, sql in objects:
+            conn.execute(sql)
+
+
+def _insert(conn, sql, rows, batch):
+    count = 0
+    for chunk in _batches(rows, batch):
+        conn.executemany(sql, chunk)
+        count += len(chunk)
+    return count
+
+
+def seed(conn, users=0, orders=0, coffees=0, items=3, days=365, seed=7, batch=BATCH_SIZE):
+    """Append generated rows; return per-step (rows, seconds) and the new user ids.
+
+    Orders are spread evenly over the last `days` days in id order, each
+    with 1 to 2*items-1 line items whose prices add up to the order total.
+    """
+    rng = random.Random(seed)
+    report = {}
+    # One KDF run for the whole load; every seeded user shares the hash
+    password_hash = hash_password(SEED_PASSWORD)
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_counters'").fetchone()
+    has_history = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_history_versions'").fetchone()
+    has_events = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_events'").fetchone()
+
+    with transaction(conn):
+        with deferred_indexes(conn) as deferred:
+            first_user = _next_id(conn, 'users')
+            start = time.perf_counter()
+            rows = _insert(conn, '''
+            INSERT INTO users (id, first_name, last_name, email, contact_number, password, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, datetime('now', ?))
+            ''', ((user_id, f'First{user_id}', f'Last{user_id}', user_email(user_id),
+                   f'555{user_id:07d}'[-10:], password_hash, f'-{rng.randint(0, days * 86400)} seconds')
+                  for user_id in range(first_user, first_user + users)), batch)
+            report['users'] = (rows, time.perf_counter() - start)
+
+            first_coffee = _next_id(conn, 'coffees')
+            start = time.perf_counter()
+            rows = _insert(conn, '''
+            INSERT INTO coffees (id, name, description, price, category)
+            VALUES (?, ?, ?, ?, ?)
+            ''', ((coffee_id, f'Blend {coffee_id}', 'Seeded coffee', round(rng.uniform(2, 8), 2),
+                   rng.choice(CATEGORIES)) for coffee_id in range(first_coffee, first_coffee + coffees)), batch)
+            report['coffees'] = (rows, time.perf_counter() - start)
+
+            user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+            menu = conn.execute("SELECT id, price FROM coffees").fetchall()
+            first_order = _next_id(conn, 'orders')
+            now = int(time.time())
+            span = days * 86400
+            order_rows = item_rows = 0
+            start = time.perf_counter()
+            if orders and user_ids and menu:
+                for offset in range(0, orders, batch):
+                    order_batch = []
+                    item_batch = []
+                    for number in range(offset, min(offset + batch, orders)):
+                        order_id = first_order + number
+                        total = 0
+                        for _ in range(rng.randint(1, max(1, 2 * items - 1)) if items else 0):
+                            coffee_id, price = rng.choice(menu)
+                            quantity = rng.randint(1, 3)
+                            total += price * quantity
+                            item_batch.append((order_id, coffee_id, quantity, price))
+                        order_batch.append((order_id, rng.choice(user_ids), round(total, 2),
+                                            rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                                            now - span + span * number // orders))
+                    conn.executemany('''
+                    INSERT INTO orders (id, user_id, total_amount, status, created_at)
+                    VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))
+                    ''', order_batch)
+                    conn.executemany('''
+                    INSERT INTO order_items (order_id, coffee_id, quantity, price)
+                    VALUES (?, ?, ?, ?)
+                    ''', item_batch)
+                    order_rows += len(order_batch)
+                    item_rows += len(item_batch)
+            report['orders + items'] = (order_rows + item_rows, time.perf_counter() - start)
+
+            start = time.perf_counter()
+        report['rebuild indexes'] = (len(deferred), time.perf_counter() - start)
+
+        if has_stats:
+            start = time.perf_counter()
+            dashboard_stats.rebuild(conn)
+            report['rebuild counters'] = (len(dashboard_stats.COUNTERS), time.perf_counter() - start)
+
+        if has_history and orders:
+            start = time.perf_counter()
+            order_history.rebuild(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM order_history_versions").fetchone()[0]
+            report['rebuild history'] = (rows, time.perf_counter() - start)
+
+        if has_events and orders:
+            start = time.perf_counter()
+            order_events.backfill(conn, first_order)
+            report['order events'] = (order_rows, time.perf_counter() - start)
+
+    return report, range(first_user, first_user + users)
+
+
+def print_report(report):
+    print("="*56)
+    print(f"{'step':<20}{'rows':>12}{'seconds':>10}{'rows/s':>14}")
+    print("="*56)
+    for step, (rows, seconds) in report.items():
+        rate = f"{rows / seconds:,.0f}" if seconds and not step.startswith('rebuild') else '-'
+        print(f"{step:<20}{rows:>12,}{seconds:>10.2f}{rate:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=DATABASE)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--items', type=int, default=3, help='average line items per order')
+    parser.add_argument('--coffees', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE)
+    parser.add_argument('--profile', default='throughput', help='storage profile for the load')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        apply_storage_profile(conn, args.profile)
+        with redirect_stdout(StringIO()):
+            create_tables(conn)
+        migrations.migrate(conn)
+
+        start = time.perf_counter()
+        report, user_ids = seed(conn, users=args.users, orders=args.orders, coffees=args.coffees, items=args.items,
+                      days=args.days, seed=args.seed, batch=args.batch)
+        elapsed = time.perf_counter() - start
+        print_report(report)
+
+        total = sum(rows for step, (rows, _) in report.items() if not step.startswith('rebuild'))
+        print(f"✓ Seeded {total:,} rows into {args.database} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+        if user_ids:
+            print(f"  Seeded users log in as {user_email(user_ids.start)} / {SEED_PASSWORD}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -131,72 +131,97 @@ async function addToCart(coffeeId, quantity) {
     }
 }
 
-async function updateCartItem(coffeeId, quantity) {
-    try {
-        const response = await fetch('/api/cart/update', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ coffee_id: coffeeId, quantity: quantity })
-        });
-        
-        const data = await response.json();
-        
-        if (data.success) {
-            // Update cart count and total
-            const cartCount = document.querySelector('.cart-count');
-            if (cartCount) {
-                cartCount.textContent = data.cart_count;
-            }
-            
-            const cartTotal = document.querySelector('.cart-total h3');
-            if (cartTotal) {
-                cartTotal.textContent = `Total: ${data.total}`;
-            }
-            
-            // If quantity is 0, remove the item from DOM
-            if (quantity <= 0) {
-                const cartItem = document.querySelector(`[data-coffee-id="${coffeeId}"]`).closest('.cart-item');
-                if (cartItem) {
-                    cartItem.remove();
-                }
-            }
+// Quantity changes are collected per coffee and sent as one /api/cart/batch
+// request once the clicks stop for CART_FLUSH_DELAY ms, so rapid +/- clicks
+// cost a single round trip. Batches go out one at a time, in order.
+const CART_FLUSH_DELAY = 250;
+const pendingCartChanges = new Map();
+let cartFlushTimer = null;
+let cartInflight = Promise.resolve();
+
+function queueCartChange(coffeeId, change) {
+    pendingCartChanges.set(String(coffeeId), change);
+    clearTimeout(cartFlushTimer);
+    cartFlushTimer = setTimeout(flushCartChanges, CART_FLUSH_DELAY);
+}
+
+function flushCartChanges() {
+    const operations = [];
+    pendingCartChanges.forEach((change, coffeeId) => {
+        operations.push(Object.assign({ coffee_id: coffeeId }, change));
+    });
+    pendingCartChanges.clear();
+    
+    cartInflight = cartInflight.then(async () => {
+        try {
+            const response = await fetch('/api/cart/batch', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ operations: operations })
+            });
+            renderCart(await response.json());
+        } catch (error) {
+            console.error('Error updating cart:', error);
+            showNotification('Failed to update cart', 'error');
         }
-    } catch (error) {
-        console.error('Error updating cart:', error);
-        showNotification('Failed to update cart', 'error');
-    }
+    });
 }
 
-async function removeFromCart(coffeeId) {
-    try {
-        const response = await fetch(`/api/cart/remove/${coffeeId}`, {
-            method: 'DELETE'
-        });
-        
-        const data = await response.json();
-        
-        if (data.success) {
-            // Update cart count in navbar
-            const cartCount = document.querySelector('.cart-count');
-            if (cartCount) {
-                cartCount.textContent = data.cart_count;
-            }
-            
-            // Remove item from DOM
-            const cartItem = document.querySelector(`[data-coffee-id="${coffeeId}"]`).closest('.cart-item');
-            if (cartItem) {
-                cartItem.remove();
-            }
-            
-            // Show success message
-            showNotification(data.message, 'success');
+function renderCart(data) {
+    if (typeof data.cart_count !== 'number') {
+        showNotification(data.message || 'Failed to update cart', 'error');
+        return;
+    }
+    
+    // Update cart count in navbar
+    const cartCount = document.querySelector('.cart-count');
+    if (cartCount) {
+        cartCount.textContent = data.cart_count;
+    }
+    
+    const cartTotal = document.querySelector('.cart-total h3');
+    if (cartTotal) {
+        cartTotal.textContent = `Total: $${data.total.toFixed(2)}`;
+    }
+    
+    // Drop rows the server no longer has and refresh the rest
+    const items = new Map(data.items.map(item => [String(item.id), item]));
+    document.querySelectorAll('.cart-item').forEach(row => {
+        const item = items.get(row.dataset.coffeeId);
+        if (!item) {
+            row.remove();
+            return;
         }
-    } catch (error) {
-        console.error('Error removing from cart:', error);
-        showNotification('Failed to remove item from cart', 'error');
+        const input = row.querySelector('.quantity-input');
+        if (input && document.activeElement !== input) {
+            input.value = item.quantity;
+        }
+        const itemTotal = row.querySelector('.item-total');
+        if (itemTotal) {
+            itemTotal.textContent = `$${item.total.toFixed(2)}`;
+        }
+    });
+    
+    if (!data.success) {
+        showNotification(data.message, 'error');
+    }
+}
+
+function updateCartItem(coffeeId, quantity) {
+    queueCartChange(coffeeId, { op: 'update', quantity: quantity });
+}
+
+function removeFromCart(coffeeId) {
+    queueCartChange(coffeeId, { op: 'remove' });
+    
+    // Remove item from DOM
+    const cartItem = document.querySelector(`.cart-item[data-coffee-id="${coffeeId}"]`);
+    if (cartItem) {
+        cartItem.remove();
     }
+    showNotification('Item removed from cart', 'success');
 }
 
 // Notification system
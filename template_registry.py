@@ -0,0 +1,104 @@
+import os
+from time import perf_counter_ns
+
+from flask import Response, current_app, render_template, stream_with_context
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache
+
+from request_metrics import request_clock
+
+TEMPLATE_CACHE_DIR = os.environ.get('COFFEE_SHOP_TEMPLATE_CACHE')
+STREAM_CHUNK_BYTES = int(os.environ.get('COFFEE_SHOP_STREAM_CHUNK_BYTES', 16384))
+
+
+def chunked(fragments, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Coalesce many small template fragments into chunks of about chunk_bytes"""
+    buffer = []
+    size = 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_bytes:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def timed(chunks):
+    """Add the time spent producing each chunk to the request's template time"""
+    chunks = iter(chunks)
+    while True:
+        start, db = perf_counter_ns(), request_clock.db
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            # Queries run by the template while rendering count as database time
+            request_clock.template += perf_counter_ns() - start - (request_clock.db - db)
+        yield chunk
+
+
+class TemplateRegistry:
+    """Page templates compiled once instead of on every request.
+
+    Sources are registered by name and served through a DictLoader placed
+    in front of the app's own loader, so the Jinja environment compiles
+    each page a single time. With a bytecode cache directory the compiled
+    code is also written to disk and reused across restarts.
+    """
+
+    def __init__(self, app=None, bytecode_cache_dir=TEMPLATE_CACHE_DIR):
+        self.sources = {}
+        self.compiled = {}
+        self.bytecode_cache_dir = bytecode_cache_dir
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        env = app.jinja_env
+        env.loader = ChoiceLoader([DictLoader(self.sources), env.loader])
+        if self.bytecode_cache_dir:
+            os.makedirs(self.bytecode_cache_dir, exist_ok=True)
+            env.bytecode_cache = FileSystemBytecodeCache(self.bytecode_cache_dir)
+
+    def register(self, name, source):
+        """Add a page template; names should end in .html to keep autoescaping"""
+        self.sources[name] = source
+        self.compiled.pop(name, None)
+
+    def compile_all(self):
+        """Compile every registered template up front"""
+        for name in self.sources:
+            self.get(name)
+
+    def get(self, name):
+        template = self.compiled.get(name)
+        if template is None:
+            template = self.app.jinja_env.get_template(name)
+            self.compiled[name] = template
+        return template
+
+    def render(self, name, **context):
+        """Render a registered template in the current request context"""
+        start, db = perf_counter_ns(), request_clock.db
+        try:
+            return render_template(self.get(name), **context)
+        finally:
+            request_clock.template += perf_counter_ns() - start - (request_clock.db - db)
+
+    def stream(self, name, chunk_bytes=STREAM_CHUNK_BYTES, **context):
+        """Render a registered template as a streamed response.
+
+        Iterables in the context (e.g. a database cursor) are consumed
+        lazily while the response is written and output is flushed every
+        chunk_bytes, so server memory stays bounded by one chunk rather
+        than the whole result set. The request context, and with it the
+        pooled connection, is held until the last chunk is sent.
+        """
+        current_app.update_template_context(context)
+        fragments = self.get(name).generate(context)
+        return Response(stream_with_context(timed(chunked(fragments, chunk_bytes))), mimetype='text/html')
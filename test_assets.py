@@ -0,0 +1,59 @@
+"""Content negotiation and revalidation of fingerprinted assets.
+
+    python -m pytest -q test_assets.py
+"""
+import gzip
+import tempfile
+
+import pytest
+from flask import Flask
+
+from assets import AssetPipeline
+
+
+@pytest.fixture
+def served():
+    app = Flask(__name__)
+    pipeline = AssetPipeline(app, output_dir=tempfile.mkdtemp())
+    url = pipeline.add('main.css', 'body {\n    color: #333;\n}\n')
+    digest = pipeline.files[pipeline.manifest['main.css']]['digest']
+    return app.test_client(), url, digest
+
+
+def test_each_encoding_has_its_own_etag(served):
+    client, url, digest = served
+    plain = client.get(url)
+    gzipped = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert plain.headers['ETag'] == f'"{digest}"'
+    assert 'Content-Encoding' not in plain.headers
+    assert gzipped.headers['ETag'] == f'"{digest}-gz"'
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.get_data()) == plain.get_data()
+
+
+@pytest.mark.parametrize('if_none_match, accept, status', [
+    ('"{d}"', '', 304),
+    ('"other", W/"{d}"', '', 304),
+    ('*', 'gzip', 304),
+    ('"{d}-gz"', 'gzip', 304),
+    # A cached plain copy does not validate the gzip variant, nor the other way round
+    ('"{d}"', 'gzip', 200),
+    ('"{d}-gz"', '', 200),
+    # Tags are compared whole, not as substrings
+    ('"{d}x"', '', 200),
+    ('"{d}-gz"', 'identity', 200),
+])
+def test_if_none_match_is_parsed_per_tag(served, if_none_match, accept, status):
+    client, url, digest = served
+    response = client.get(url, headers={'If-None-Match': if_none_match.format(d=digest),
+                                        'Accept-Encoding': accept})
+    assert response.status_code == status
+    if status == 304:
+        assert response.get_data() == b''
+        assert 'Content-Encoding' not in response.headers
+
+
+def test_unknown_asset_is_404(served):
+    client, _, _ = served
+    assert client.get('/assets/main.000000000000.css').status_code == 404
@@ -0,0 +1,142 @@
+"""The cart JSON API: batch validation, quantity bounds and unavailable coffees.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB) and drives
+/api/cart* through the test client as a freshly registered customer.
+
+    python -m pytest -q test_cart.py
+"""
+import itertools
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('COFFEE_SHOP_PASSWORD_ITERATIONS', '1000')
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+from cart_store import MAX_BATCH_OPERATIONS, MAX_QUANTITY, CartStore  # noqa: E402
+from database import DATABASE  # noqa: E402
+
+_emails = itertools.count()
+
+
+def register(client):
+    """Sign up and log in a new customer; returns their user id"""
+    email = f'cart{os.getpid()}-{next(_emails)}@example.com'
+    form = {'first_name': 'Cart', 'last_name': 'Test', 'email': email, 'contact': '0123456789',
+            'password': 'secret123', 'confirm_password': 'secret123'}
+    client.post('/register', data=form).close()
+    client.post('/login', data={'email': email, 'password': 'secret123'}).close()
+    with client.session_transaction() as session:
+        return session['user_id']
+
+
+@pytest.fixture
+def customer():
+    client = coffee_shop.app.test_client()
+    register(client)
+    return client
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(DATABASE)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def unavailable_coffee(db):
+    coffee_id = db.execute("INSERT INTO coffees (name, description, price, category, is_available) "
+                           "VALUES ('Retired Blend', 'Off the menu', 4.0, 'Test', 0)").lastrowid
+    db.commit()
+    return coffee_id
+
+
+def batch(client, operations):
+    response = client.post('/api/cart/batch', json={'operations': operations})
+    return response.status_code, response.get_json()
+
+
+def test_batch_applies_every_operation_at_once(customer):
+    status, cart = batch(customer, [
+        {'op': 'add', 'coffee_id': 1, 'quantity': 2},
+        {'op': 'add', 'coffee_id': 2},
+        {'op': 'add', 'coffee_id': 1, 'quantity': 1},
+        {'op': 'update', 'coffee_id': 2, 'quantity': 5},
+    ])
+    assert status == 200 and cart['success']
+    assert {item['id']: item['quantity'] for item in cart['items']} == {1: 3, 2: 5}
+    assert cart['cart_count'] == 2
+    assert cart['total'] == round(sum(item['total'] for item in cart['items']), 2)
+
+
+@pytest.mark.parametrize('operations', [
+    'not a list',
+    [{'op': 'drop', 'coffee_id': 1}],
+    [{'op': 'add', 'coffee_id': 'espresso'}],
+    [{'op': 'add', 'coffee_id': 0}],
+    [{'op': 'add', 'coffee_id': 2 ** 63}],
+    [{'op': 'add', 'coffee_id': 1, 'quantity': MAX_QUANTITY + 1}],
+    [{'op': 'update', 'coffee_id': 1, 'quantity': -MAX_QUANTITY - 1}],
+    [{'op': 'clear'}] * (MAX_BATCH_OPERATIONS + 1),
+])
+def test_malformed_batch_is_rejected_whole(customer, operations):
+    batch(customer, [{'op': 'add', 'coffee_id': 3, 'quantity': 1}])
+    if isinstance(operations, list):
+        operations = [{'op': 'add', 'coffee_id': 3, 'quantity': 4}] + operations
+    status, cart = batch(customer, operations)
+    assert status == 400 and not cart['success']
+    # Nothing from the batch was applied
+    assert customer.get('/api/cart').get_json()['items'][0]['quantity'] == 1
+
+
+def test_quantity_is_capped(customer):
+    for _ in range(3):
+        status, cart = batch(customer, [{'op': 'add', 'coffee_id': 1, 'quantity': MAX_QUANTITY}])
+        assert status == 200
+    assert cart['items'][0]['quantity'] == MAX_QUANTITY
+
+
+def test_unavailable_coffee_is_reported_not_added(customer, unavailable_coffee):
+    status, cart = batch(customer, [
+        {'op': 'add', 'coffee_id': 1},
+        {'op': 'add', 'coffee_id': unavailable_coffee},
+    ])
+    assert status == 200
+    assert not cart['success']
+    assert cart['rejected'] == [unavailable_coffee]
+    assert [item['id'] for item in cart['items']] == [1]
+    assert cart['cart_count'] == 1
+
+
+def test_coffee_withdrawn_after_adding_drops_out_of_the_count(customer, db):
+    coffee_id = db.execute("INSERT INTO coffees (name, description, price, category, is_available) "
+                           "VALUES ('Seasonal', 'Soon gone', 5.0, 'Test', 1)").lastrowid
+    db.commit()
+    batch(customer, [{'op': 'add', 'coffee_id': 1}, {'op': 'add', 'coffee_id': coffee_id}])
+
+    db.execute("UPDATE coffees SET is_available = 0 WHERE id = ?", (coffee_id,))
+    db.commit()
+    cart = customer.get('/api/cart').get_json()
+    assert [item['id'] for item in cart['items']] == [1]
+    assert cart['cart_count'] == 1
+
+
+def test_merge_caps_quantity_and_skips_bad_lines(customer, db, unavailable_coffee):
+    with customer.session_transaction() as session:
+        user_id = session['user_id']
+    carts = CartStore(db)
+    carts.merge(user_id, {1: MAX_QUANTITY - 1, 2: 0, unavailable_coffee: 1})
+    carts.merge(user_id, {'1': 5, 2 ** 63: 1})
+    assert carts.quantities(user_id) == {1: MAX_QUANTITY}
+
+
+def test_cart_requires_login():
+    client = coffee_shop.app.test_client()
+    status, cart = batch(client, [{'op': 'add', 'coffee_id': 1}])
+    assert not cart['success'] and cart['message'] == 'Please login first'
@@ -0,0 +1,143 @@
+"""Idempotent /checkout: one order per key, and what is left out of it.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB) and checks
+out as a freshly registered customer through the test client.
+
+    python -m pytest -q test_checkout.py
+"""
+import itertools
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('COFFEE_SHOP_PASSWORD_ITERATIONS', '1000')
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+from database import DATABASE  # noqa: E402
+
+_emails = itertools.count()
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(DATABASE)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def customer():
+    """(test client, user id) of a new customer who is logged in"""
+    client = coffee_shop.app.test_client()
+    email = f'checkout{os.getpid()}-{next(_emails)}@example.com'
+    form = {'first_name': 'Checkout', 'last_name': 'Test', 'email': email, 'contact': '0123456789',
+            'password': 'secret123', 'confirm_password': 'secret123'}
+    client.post('/register', data=form).close()
+    client.post('/login', data={'email': email, 'password': 'secret123'}).close()
+    with client.session_transaction() as session:
+        return client, session['user_id']
+
+
+def fill_cart(client, quantities):
+    operations = [{'op': 'add', 'coffee_id': coffee_id, 'quantity': quantity}
+                  for coffee_id, quantity in quantities.items()]
+    assert client.post('/api/cart/batch', json={'operations': operations}).status_code == 200
+
+
+def checkout(client, key):
+    response = client.post('/checkout', json={}, headers={'Idempotency-Key': key})
+    return response.status_code, response.get_json()
+
+
+def test_same_key_places_one_order(customer, db):
+    client, user_id = customer
+    fill_cart(client, {1: 2, 3: 1})
+
+    status, first = checkout(client, 'key-1')
+    assert status == 200 and first['success'] and not first['replayed']
+    assert first['rejected'] == []
+
+    status, retry = checkout(client, 'key-1')
+    assert status == 200 and retry['replayed']
+    assert retry['order_id'] == first['order_id']
+
+    assert db.execute("SELECT COUNT(*) FROM orders WHERE user_id = ?", (user_id,)).fetchone()[0] == 1
+    assert db.execute("SELECT COUNT(*) FROM order_items WHERE order_id = ?",
+                      (first['order_id'],)).fetchone()[0] == 2
+    assert db.execute("SELECT COUNT(*) FROM checkout_requests WHERE user_id = ?", (user_id,)).fetchone()[0] == 1
+    assert db.execute("SELECT COUNT(*) FROM cart_items WHERE user_id = ?", (user_id,)).fetchone()[0] == 0
+
+
+def test_new_key_after_checkout_finds_an_empty_cart(customer):
+    client, _ = customer
+    fill_cart(client, {1: 1})
+    assert checkout(client, 'first')[0] == 200
+
+    status, data = checkout(client, 'second')
+    assert status == 409
+    assert not data['success'] and data['message'] == 'Your cart is empty'
+
+
+def test_empty_cart_is_409(customer):
+    client, _ = customer
+    status, data = checkout(client, 'empty')
+    assert status == 409 and data['rejected'] == []
+
+
+def test_key_is_required(customer):
+    client, _ = customer
+    fill_cart(client, {1: 1})
+    response = client.post('/checkout', json={})
+    assert response.status_code == 400
+
+
+def test_withdrawn_coffees_are_reported(customer, db):
+    client, user_id = customer
+    coffee_id = db.execute("INSERT INTO coffees (name, description, price, category, is_available) "
+                           "VALUES ('Limited', 'Nearly gone', 6.0, 'Test', 1)").lastrowid
+    db.commit()
+    fill_cart(client, {1: 1, coffee_id: 2})
+    db.execute("UPDATE coffees SET is_available = 0 WHERE id = ?", (coffee_id,))
+    db.commit()
+
+    status, data = checkout(client, 'withdrawn')
+    assert status == 200 and data['success']
+    assert data['rejected'] == [coffee_id]
+    assert 'no longer available' in data['message']
+    items = db.execute("SELECT coffee_id FROM order_items WHERE order_id = ?", (data['order_id'],)).fetchall()
+    assert items == [(1,)]
+
+
+def test_cart_of_only_withdrawn_coffees_is_409(customer, db):
+    client, _ = customer
+    coffee_id = db.execute("INSERT INTO coffees (name, description, price, category, is_available) "
+                           "VALUES ('Last Batch', 'Gone', 6.0, 'Test', 1)").lastrowid
+    db.commit()
+    fill_cart(client, {coffee_id: 1})
+    db.execute("UPDATE coffees SET is_available = 0 WHERE id = ?", (coffee_id,))
+    db.commit()
+
+    status, data = checkout(client, 'only-withdrawn')
+    assert status == 409
+    assert data['rejected'] == [coffee_id]
+
+
+def test_form_checkout_flashes_what_was_left_out(customer, db):
+    client, _ = customer
+    coffee_id = db.execute("INSERT INTO coffees (name, description, price, category, is_available) "
+                           "VALUES ('Pop-up', 'Briefly', 6.0, 'Test', 1)").lastrowid
+    db.commit()
+    fill_cart(client, {2: 1, coffee_id: 1})
+    db.execute("UPDATE coffees SET is_available = 0 WHERE id = ?", (coffee_id,))
+    db.commit()
+
+    response = client.post('/checkout', data={'idempotency_key': 'form-key'})
+    assert response.status_code == 302 and response.headers['Location'].endswith('/orders')
+    with client.session_transaction() as session:
+        flashes = session.get('_flashes', [])
+    assert ('error', 'Some items are no longer available and were left out.') in flashes
@@ -0,0 +1,46 @@
+"""ConnectionPool slot accounting around connection opens.
+
+    python -m pytest -q test_db_pool.py
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool
+
+
+def test_failed_open_gives_the_slot_back():
+    pool = ConnectionPool(database=os.path.join(tempfile.mkdtemp(), 'missing', 'x.db'), max_size=1, timeout=0.1)
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+    assert pool.stats()['size'] == 0
+
+
+def test_slow_open_does_not_block_release():
+    pool = ConnectionPool(database=os.path.join(tempfile.mkdtemp(), 'pool.db'), max_size=2)
+    first = pool.acquire()
+    opening, proceed = threading.Event(), threading.Event()
+    connect = pool._connect
+
+    def slow_connect():
+        opening.set()
+        proceed.wait(5)
+        return connect()
+
+    pool._connect = slow_connect
+    opener = threading.Thread(target=pool.acquire)
+    opener.start()
+    assert opening.wait(5)
+    # The lock is free while the second connection opens
+    releaser = threading.Thread(target=pool.release, args=(first,))
+    releaser.start()
+    releaser.join(1)
+    assert not releaser.is_alive()
+    assert pool.acquire() is first
+    proceed.set()
+    opener.join(5)
+    assert pool.stats()['size'] == 2
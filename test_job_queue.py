@@ -0,0 +1,89 @@
+"""Job leases, retries and the attempt limit.
+
+    python -m pytest -q test_job_queue.py
+"""
+import sqlite3
+import time
+
+import pytest
+
+import job_queue
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    for statement in job_queue.SCHEMA:
+        conn.execute(statement)
+    yield conn
+    conn.close()
+
+
+def enqueue(conn):
+    job_queue.enqueue(conn, 'kitchen_ticket', [{'order_id': 1}])
+    conn.commit()
+    return conn.execute("SELECT MAX(id) FROM jobs").fetchone()[0]
+
+
+def expire_lease(conn, job_id):
+    conn.execute("UPDATE jobs SET run_after = ? WHERE id = ?", (time.time() - 1, job_id))
+    conn.commit()
+
+
+def state(conn, job_id):
+    return conn.execute("SELECT status, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def test_claim_leases_a_due_job_once(conn):
+    job_id = enqueue(conn)
+    assert job_queue.claim(conn)[:4] == (job_id, 'kitchen_ticket', '{"order_id": 1}', 1)
+    assert job_queue.claim(conn) is None
+    assert state(conn, job_id) == ('running', 1)
+
+
+def test_expired_lease_is_claimed_again(conn):
+    job_id = enqueue(conn)
+    job_queue.claim(conn)
+    expire_lease(conn, job_id)
+    assert job_queue.claim(conn)[0] == job_id
+    assert state(conn, job_id) == ('running', 2)
+
+
+def test_lost_leases_stop_at_max_attempts(conn):
+    job_id = enqueue(conn)
+    for attempt in range(1, job_queue.MAX_ATTEMPTS + 1):
+        assert job_queue.claim(conn)[3] == attempt
+        expire_lease(conn, job_id)
+
+    assert job_queue.claim(conn) is None
+    assert state(conn, job_id) == ('failed', job_queue.MAX_ATTEMPTS)
+
+    assert job_queue.retry_failed(conn) == 1
+    assert job_queue.claim(conn)[3] == 1
+
+
+def test_exhausted_job_does_not_block_the_next(conn):
+    stuck = enqueue(conn)
+    conn.execute("UPDATE jobs SET status = 'running', attempts = ?, run_after = ? WHERE id = ?",
+                 (job_queue.MAX_ATTEMPTS, time.time() - 10, stuck))
+    conn.commit()
+    fresh = enqueue(conn)
+    expire_lease(conn, fresh)
+
+    assert job_queue.claim(conn)[0] == fresh
+    assert state(conn, stuck)[0] == 'failed'
+
+
+def test_failing_handler_is_retried_then_parked(conn, monkeypatch):
+    def broken(conn, payload):
+        raise RuntimeError("printer jammed")
+
+    monkeypatch.setitem(job_queue.HANDLERS, 'kitchen_ticket', broken)
+    queue = job_queue.JobQueue(workers=0)
+    job_id = enqueue(conn)
+    for _ in range(job_queue.MAX_ATTEMPTS):
+        expire_lease(conn, job_id)
+        assert queue.run_next(conn)
+
+    assert state(conn, job_id) == ('failed', job_queue.MAX_ATTEMPTS)
+    assert (queue.retries, queue.failures) == (job_queue.MAX_ATTEMPTS - 1, 1)
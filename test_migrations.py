@@ -0,0 +1,47 @@
+"""Schema migrations and the hot-query plan check.
+
+Builds a scratch database the way database.py does, migrates it and fails
+if any query in migrations.HOT_QUERIES falls back to a table scan - the
+same check as `python migrations.py --check`, run with the test suite.
+
+    python -m pytest -q test_migrations.py
+"""
+import os
+import sqlite3
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import migrations
+from database import create_tables
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), 'migrations.db'))
+    with redirect_stdout(StringIO()):
+        create_tables(conn)
+    yield conn
+    conn.close()
+
+
+def test_migrate_applies_every_version_once(conn):
+    assert migrations.migrate(conn) == [number for number, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(conn) == migrations.MIGRATIONS[-1][0]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == migrations.MIGRATIONS[-1][0]
+    assert migrations.migrate(conn) == []
+
+
+def test_hot_queries_use_an_index(conn):
+    migrations.migrate(conn)
+    assert migrations.check_query_plans(conn) == []
+
+
+def test_plan_check_reports_a_table_scan(conn):
+    migrations.migrate(conn)
+    problems = migrations.check_query_plans(conn, {
+        'unindexed': ("SELECT * FROM orders WHERE total_amount > ?", (10,)),
+    })
+    assert [name for name, _ in problems] == ['unindexed']
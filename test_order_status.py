@@ -0,0 +1,138 @@
+"""Admin order status changes: compare-and-set updates and bulk moves.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB) and drives
+/admin/orders/<id>/status and /admin/orders/bulk-status as the admin.
+
+    python -m pytest -q test_order_status.py
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('COFFEE_SHOP_PASSWORD_ITERATIONS', '1000')
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+from database import DATABASE  # noqa: E402
+
+
+@pytest.fixture
+def admin():
+    client = coffee_shop.app.test_client()
+    client.post('/login', data={'email': 'admin@coffee.com', 'password': 'admin123'}).close()
+    return client
+
+
+@pytest.fixture
+def new_order():
+    """Insert orders (version 0); returns a function giving each new order's id"""
+    conn = sqlite3.connect(DATABASE)
+
+    def create(status='pending'):
+        order_id = conn.execute("INSERT INTO orders (user_id, total_amount, status) VALUES (1, 3.5, ?)",
+                                (status,)).lastrowid
+        conn.commit()
+        return order_id
+
+    yield create
+    conn.close()
+
+
+def set_status(client, order_id, status, version):
+    response = client.post(f'/admin/orders/{order_id}/status', json={'status': status, 'version': version})
+    return response.status_code, response.get_json()
+
+
+def bulk(client, **body):
+    response = client.post('/admin/orders/bulk-status', json=body)
+    return response.status_code, response.get_json()
+
+
+def test_status_update_bumps_the_version(admin, new_order):
+    order_id = new_order()
+    status, data = set_status(admin, order_id, 'preparing', 0)
+    assert status == 200 and data['order'] == {'id': order_id, 'status': 'preparing', 'version': 1}
+
+    status, data = set_status(admin, order_id, 'ready', 1)
+    assert status == 200 and data['order']['version'] == 2
+
+
+def test_stale_version_is_409_with_current_state(admin, new_order):
+    order_id = new_order()
+    assert set_status(admin, order_id, 'preparing', 0)[0] == 200
+
+    status, data = set_status(admin, order_id, 'cancelled', 0)
+    assert status == 409 and not data['success']
+    assert data['order'] == {'id': order_id, 'status': 'preparing', 'version': 1}
+
+
+def test_disallowed_transition_is_400(admin, new_order):
+    order_id = new_order()
+    status, data = set_status(admin, order_id, 'completed', 0)
+    assert status == 400
+    assert data['order'] == {'id': order_id, 'status': 'pending', 'version': 0}
+
+
+@pytest.mark.parametrize('status_name, version', [
+    ('brewing', 0),
+    ('preparing', 'one'),
+    ('preparing', None),
+    ('preparing', 2 ** 64),
+])
+def test_malformed_status_update_is_400(admin, new_order, status_name, version):
+    order_id = new_order()
+    assert set_status(admin, order_id, status_name, version)[0] == 400
+
+
+def test_unknown_order_is_404(admin):
+    assert set_status(admin, 2 ** 62, 'preparing', 0)[0] == 404
+
+
+def test_bulk_status_by_ids_skips_orders_that_cannot_move(admin, new_order):
+    pending, ready, completed = new_order(), new_order('ready'), new_order('completed')
+    status, data = bulk(admin, status='cancelled', order_ids=[pending, ready, completed])
+    assert status == 200 and data['success']
+    assert data['updated'] == sorted([pending, ready])
+    assert data['skipped'] == [completed]
+
+
+def test_bulk_status_from_status(admin, new_order):
+    first, second, other = new_order(), new_order(), new_order('ready')
+    status, data = bulk(admin, status='preparing', from_status='pending')
+    assert status == 200
+    assert {first, second} <= set(data['updated']) and other not in data['updated']
+
+    status, data = bulk(admin, status='preparing', from_status='completed')
+    assert status == 400
+
+
+@pytest.mark.parametrize('order_ids', [
+    ['12'],
+    [1.5],
+    [True],
+    [0],
+    [-3],
+    [2 ** 63],
+    [None],
+])
+def test_bulk_status_rejects_ids_that_are_not_order_ids(admin, new_order, order_ids):
+    status, data = bulk(admin, status='cancelled', order_ids=[new_order()] + order_ids)
+    assert status == 400
+    assert data == {'success': False, 'message': 'order_ids must be integers'}
+
+
+def test_bulk_status_rejects_bad_id_lists(admin):
+    for order_ids in ([], 'all', list(range(1, 502))):
+        assert bulk(admin, status='cancelled', order_ids=order_ids)[0] == 400
+    assert bulk(admin, status='cancelled')[0] == 400
+
+
+def test_status_changes_require_admin(new_order):
+    client = coffee_shop.app.test_client()
+    order_id = new_order()
+    assert set_status(client, order_id, 'preparing', 0)[0] == 403
+    assert bulk(client, status='preparing', order_ids=[order_id])[0] == 403
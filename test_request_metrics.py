@@ -0,0 +1,141 @@
+"""End-to-end checks of request timing (/metrics) and the SQL profile.
+
+Imports coffee_shop against a scratch database (COFFEE_SHOP_DB), drives
+requests through the test client and closes every response, as a WSGI
+server does once the body has been sent. Run with:
+
+    python -m pytest -q test_request_metrics.py
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+os.environ.setdefault('COFFEE_SHOP_DB', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('COFFEE_SHOP_PASSWORD_ITERATIONS', '1000')
+os.environ.setdefault('COFFEE_SHOP_JOB_WORKERS', '0')
+os.environ.setdefault('COFFEE_SHOP_TICKET_PRINTER', os.devnull)
+
+import coffee_shop  # noqa: E402
+import query_profiler  # noqa: E402
+from request_metrics import request_metrics  # noqa: E402
+
+
+@pytest.fixture
+def admin():
+    client = coffee_shop.app.test_client()
+    client.post('/login', data={'email': 'admin@coffee.com', 'password': 'admin123'}).close()
+    return client
+
+
+def get(client, path):
+    """GET path, read the whole body and close the response"""
+    response = client.get(path)
+    response.get_data()
+    response.close()
+    return response
+
+
+def samples(client):
+    """{'name{labels}': value} of every sample /metrics exports"""
+    response = get(client, '/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    values = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+def test_metrics_count_buffered_and_streamed_requests(admin):
+    before = samples(admin)
+    get(admin, '/admin')
+    get(admin, '/admin')
+    get(admin, '/admin/orders')
+    after = samples(admin)
+
+    def added(name):
+        return after[name] - before.get(name, 0)
+
+    assert added('coffee_shop_requests_total{endpoint="admin_dashboard",status="200"}') == 2
+    assert added('coffee_shop_request_duration_seconds_count{endpoint="admin_dashboard"}') == 2
+    assert added('coffee_shop_request_duration_seconds_bucket{endpoint="admin_dashboard",le="+Inf"}') == 2
+    assert added('coffee_shop_requests_total{endpoint="admin_orders",status="200"}') == 1
+    assert added('coffee_shop_request_phase_seconds_total{endpoint="admin_dashboard",phase="db"}') > 0
+    assert added('coffee_shop_request_phase_seconds_total{endpoint="admin_orders",phase="template"}') > 0
+
+
+def test_streamed_response_is_recorded_when_closed(admin):
+    get(admin, '/admin/orders')
+    count = request_metrics.endpoints['admin_orders'].count
+
+    response = admin.get('/admin/orders')
+    assert response.is_streamed
+    response.get_data()
+    assert request_metrics.endpoints['admin_orders'].count == count
+    response.close()
+    assert request_metrics.endpoints['admin_orders'].count == count + 1
+
+
+def test_metrics_require_admin():
+    client = coffee_shop.app.test_client()
+    assert get(client, '/metrics').status_code == 403
+    assert get(client, '/admin/sql-profile').status_code == 403
+
+
+def test_sql_profile_reports_statements_and_slow_queries(admin, monkeypatch, caplog):
+    monkeypatch.setattr(query_profiler, 'SLOW_QUERY_MS', 0)
+    with caplog.at_level(logging.WARNING, logger='coffee_shop.sql'):
+        get(admin, '/admin')
+        get(admin, '/admin')
+
+    report = get(admin, '/admin/sql-profile?limit=500').get_json()
+    assert report['requests'] > 0
+    counters = [row for row in report['statements'] if 'FROM stats_counters' in row['statement']]
+    assert counters and counters[0]['executions'] >= 2 and counters[0]['total_ms'] > 0
+
+    slow = [entry for entry in report['slow_queries'] if 'FROM stats_counters' in entry['statement']]
+    assert len(slow) >= 2
+    assert slow[0]['path'] == '/admin' and slow[0]['plan'] and not slow[0]['scans']
+    # Planned and logged once per statement, however often it is slow
+    logged = [record for record in caplog.records if 'FROM stats_counters' in record.getMessage()]
+    assert len(logged) == 1
+
+    recent = get(admin, '/admin/sql-profile/requests?endpoint=admin_dashboard&limit=1').get_json()
+    assert len(recent) == 1
+    assert recent[0]['path'] == '/admin' and recent[0]['status'] == 200
+    assert recent[0]['queries'] == sum(row['executions'] for row in recent[0]['statements']) > 0
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one():
+    profiler = query_profiler.QueryProfiler()
+    conn = sqlite3.connect(':memory:')
+    profiler.begin('/orders')
+    for order_id in range(query_profiler.N_PLUS_ONE_MIN):
+        query_profiler.observe(f"SELECT * FROM order_items WHERE order_id = {order_id}", 1000, conn, ())
+    query_profiler.observe("SELECT * FROM orders WHERE id IN (1, 2, 3)", 1000, conn, ())
+    profiler.end('orders', 200, 50000)
+
+    report = profiler.report()
+    assert report['n_plus_one'] == [{
+        'endpoint': 'orders',
+        'statement': 'SELECT * FROM order_items WHERE order_id = ?',
+        'requests': 1,
+        'max_per_request': query_profiler.N_PLUS_ONE_MIN,
+    }]
+    assert {row['statement'] for row in report['statements']} == {
+        'SELECT * FROM order_items WHERE order_id = ?',
+        'SELECT * FROM orders WHERE id IN (?...)',
+    }
+
+
+def test_requests_without_sql_are_not_profiled():
+    profiler = query_profiler.QueryProfiler()
+    profiler.begin('/static/app.css')
+    profiler.end('static', 200, 1000)
+    assert profiler.report()['requests'] == 0
+    assert profiler.recent_requests() == []
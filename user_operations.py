@@ -1,5 +1,13 @@
 import sqlite3
+from database import transaction
+from job_queue import enqueue_after_order, job_queue
+from menu_cache import menu_cache
 from models import Coffee, Order, OrderItem
+from order_feed import order_feed
+from order_loader import OrderLoader
+
+# How long a checkout idempotency key keeps deduplicating retries
+IDEMPOTENCY_KEY_TTL_HOURS = 24
 
 class UserOperations:
     def __init__(self, conn):
@@ -8,9 +16,7 @@ class UserOperations:
     def view_available_coffees(self):
         """View available coffees"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM coffees WHERE is_available = 1 ORDER BY category, name")
-            coffees = [Coffee.from_db_row(row) for row in cursor.fetchall()]
+            coffees = [Coffee.from_db_row(row) for row in menu_cache.available(lambda: self.conn)]
             
             print("\n" + "="*60)
             print("AVAILABLE COFFEES")
@@ -34,106 +40,186 @@ class UserOperations:
             print(f"Error viewing coffees: {e}")
             return []
     
-    def place_order(self, user_id, coffee_quantities):
-        """Place a new order"""
-        try:
-            cursor = self.conn.cursor()
-            
-            # Calculate total amount
-            total_amount = 0
-            order_items = []
-            
-            for coffee_id, quantity in coffee_quantities.items():
-                cursor.execute("SELECT price FROM coffees WHERE id = ? AND is_available = 1", (coffee_id,))
-                result = cursor.fetchone()
-                
-                if result:
-                    price = result[0]
-                    total_amount += price * quantity
-                    order_items.append((coffee_id, quantity, price))
-            
-            if not order_items:
-                print("No valid items in order!")
-                return None
-            
-            # Create order
+    def _fetch_menu_prices(self, coffee_ids):
+        """Look up name and price of many coffees with one IN-list query"""
+        ids = sorted({int(coffee_id) for coffee_id in coffee_ids})
+        if not ids:
+            return {}
+        
+        placeholders = ', '.join('?' for _ in ids)
+        cursor = self.conn.execute(f'''
+        SELECT id, name, price FROM coffees
+        WHERE is_available = 1 AND id IN ({placeholders})
+        ''', ids)
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _price_order(coffee_quantities, menu):
+        """Match requested quantities against the menu, skipping unknown items"""
+        total_amount = 0
+        order_items = []
+        
+        for coffee_id, quantity in coffee_quantities.items():
+            coffee_id, quantity = int(coffee_id), int(quantity)
+            if coffee_id in menu and quantity > 0:
+                name, price = menu[coffee_id]
+                total_amount += price * quantity
+                order_items.append((coffee_id, quantity, price, name))
+        
+        return total_amount, order_items
+    
+    def _insert_orders(self, priced_orders):
+        """Insert (user_id, total, items) orders and all their items in bulk"""
+        cursor = self.conn.cursor()
+        order_ids = []
+        item_rows = []
+        
+        for user_id, total_amount, order_items in priced_orders:
             cursor.execute('''
             INSERT INTO orders (user_id, total_amount, status)
             VALUES (?, ?, ?)
             ''', (user_id, total_amount, 'pending'))
-            
             order_id = cursor.lastrowid
-            
-            # Add order items
-            for coffee_id, quantity, price in order_items:
-                cursor.execute('''
-                INSERT INTO order_items (order_id, coffee_id, quantity, price)
-                VALUES (?, ?, ?, ?)
-                ''', (order_id, coffee_id, quantity, price))
-            
-            self.conn.commit()
-            
-            # Get coffee names for display
-            cursor.execute('''
-            SELECT c.name, oi.quantity, oi.price 
-            FROM order_items oi 
-            JOIN coffees c ON oi.coffee_id = c.id 
-            WHERE oi.order_id = ?
-            ''', (order_id,))
-            
-            items = cursor.fetchall()
-            
-            print("\n" + "="*60)
-            print("ORDER CONFIRMED!")
-            print("="*60)
-            print(f"Order ID: {order_id}")
-            print("\nItems:")
-            for item in items:
-                print(f"  - {item[0]} x{item[1]}: ${item[2]:.2f}")
-            print(f"\nTotal Amount: ${total_amount:.2f}")
-            print("Status: Pending")
-            print("="*60)
+            order_ids.append(order_id)
+            item_rows.extend((order_id, coffee_id, quantity, price)
+                             for coffee_id, quantity, price, _ in order_items)
+        
+        cursor.executemany('''
+        INSERT INTO order_items (order_id, coffee_id, quantity, price)
+        VALUES (?, ?, ?, ?)
+        ''', item_rows)
+        # Tickets and other side work run on the job workers once this commits
+        enqueue_after_order(self.conn, order_ids)
+        return order_ids
+    
+    def _create_order(self, user_id, coffee_quantities):
+        """Price and insert one order inside the caller's transaction"""
+        menu = self._fetch_menu_prices(coffee_quantities.keys())
+        total_amount, order_items = self._price_order(coffee_quantities, menu)
+        if not order_items:
+            return None, total_amount, order_items
+        
+        order_id = self._insert_orders([(user_id, total_amount, order_items)])[0]
+        return order_id, total_amount, order_items
+    
+    def place_order(self, user_id, coffee_quantities):
+        """Place a new order"""
+        try:
+            with transaction(self.conn):
+                order_id, total_amount, order_items = self._create_order(user_id, coffee_quantities)
+                
+                if not order_items:
+                    print("No valid items in order!")
+                    return None
+            order_feed.refresh(self.conn)
+            job_queue.wake()
+            
+            # One write for the whole receipt, not one per line
+            lines = ["", "="*60, "ORDER CONFIRMED!", "="*60, f"Order ID: {order_id}", "", "Items:"]
+            lines.extend(f"  - {name} x{quantity}: ${price:.2f}" for _, quantity, price, name in order_items)
+            lines.extend(["", f"Total Amount: ${total_amount:.2f}", "Status: Pending", "="*60])
+            print("\n".join(lines))
             
             return order_id
         except Exception as e:
             print(f"Error placing order: {e}")
             return None
     
+    def checkout(self, user_id, idempotency_key):
+        """Turn the user's server-side cart into an order, at most once per key.
+        
+        The key lookup, the order insert, emptying the cart and recording the
+        key all happen in one BEGIN IMMEDIATE transaction, so a retried or
+        double-clicked submit waits for the first one and then gets its order
+        back. Returns (order_id, replayed, unavailable): order_id is None when
+        nothing in the cart can be ordered, and unavailable lists the coffee
+        ids left out because they are off the menu (empty on a replay).
+        """
+        with transaction(self.conn):
+            row = self.conn.execute(
+                "SELECT order_id FROM checkout_requests WHERE user_id = ? AND idempotency_key = ?",
+                (user_id, idempotency_key)).fetchone()
+            if row:
+                return row[0], True, []
+            
+            coffee_quantities = dict(self.conn.execute(
+                "SELECT coffee_id, quantity FROM cart_items WHERE user_id = ?", (user_id,)).fetchall())
+            order_id, _, order_items = self._create_order(user_id, coffee_quantities)
+            ordered = {coffee_id for coffee_id, *_ in order_items}
+            unavailable = sorted(coffee_id for coffee_id in coffee_quantities if coffee_id not in ordered)
+            if order_id is None:
+                return None, False, unavailable
+            
+            self.conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,))
+            self.conn.execute(
+                "INSERT INTO checkout_requests (user_id, idempotency_key, order_id) VALUES (?, ?, ?)",
+                (user_id, idempotency_key, order_id))
+            self.conn.execute(
+                "DELETE FROM checkout_requests WHERE created_at < datetime('now', ?)",
+                (f'-{IDEMPOTENCY_KEY_TTL_HOURS} hours',))
+        order_feed.refresh(self.conn)
+        job_queue.wake()
+        return order_id, False, unavailable
+    
+    def place_orders_bulk(self, orders):
+        """Place many (user_id, coffee_quantities) orders in one transaction.
+        
+        Used by kiosks and batch imports. Returns the new order ids in input
+        order, with None for orders that had no valid items.
+        """
+        orders = list(orders)
+        try:
+            with transaction(self.conn):
+                wanted = set()
+                for _, coffee_quantities in orders:
+                    wanted.update(coffee_quantities.keys())
+                menu = self._fetch_menu_prices(wanted)
+                
+                priced = []
+                positions = []
+                for position, (user_id, coffee_quantities) in enumerate(orders):
+                    total_amount, order_items = self._price_order(coffee_quantities, menu)
+                    if order_items:
+                        priced.append((user_id, total_amount, order_items))
+                        positions.append(position)
+                
+                order_ids = [None] * len(orders)
+                for position, order_id in zip(positions, self._insert_orders(priced)):
+                    order_ids[position] = order_id
+            order_feed.refresh(self.conn)
+            job_queue.wake()
+            
+            print(f"✓ {len(priced)} of {len(orders)} orders placed")
+            return order_ids
+        except Exception as e:
+            print(f"Error placing orders: {e}")
+            return [None] * len(orders)
+    
     def view_my_orders(self, user_id):
         """View user's orders"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            SELECT * FROM orders WHERE user_id = ? ORDER BY created_at DESC
-            ''', (user_id,))
-            
-            orders = [Order.from_db_row(row) for row in cursor.fetchall()]
+            loader = OrderLoader(self.conn)
+            orders = []
             
             print("\n" + "="*60)
             print("MY ORDERS")
             print("="*60)
             
-            for order in orders:
+            for row in loader.iter_orders(user_id=user_id):
+                order = Order(row['id'], row['user_id'], row['total_amount'], row['status'], row['created_at'])
+                orders.append(order)
+                
                 print(f"Order ID: {order.id}")
                 print(f"Total: ${order.total_amount:.2f}")
                 print(f"Status: {order.status}")
                 print(f"Date: {order.created_at}")
                 
-                # Get order items
-                cursor.execute('''
-                SELECT c.name, oi.quantity, oi.price 
-                FROM order_items oi 
-                JOIN coffees c ON oi.coffee_id = c.id 
-                WHERE oi.order_id = ?
-                ''', (order.id,))
-                
-                items = cursor.fetchall()
-                for item in items:
-                    print(f"  - {item[0]} x{item[1]}: ${item[2]:.2f}")
+                for item in row['items']:
+                    print(f"  - {item['name']} x{item['quantity']}: ${item['price']:.2f}")
                 
                 print("-" * 40)
             
             return orders
         except Exception as e:
             print(f"Error viewing orders: {e}")
-            return []
\ No newline at end of file
+            return []